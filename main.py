@@ -1,14 +1,93 @@
 import argparse
+import asyncio
 import json
 import os
 import uuid
 from dotenv import load_dotenv
 
 from src.logger import init_logger, LatencyLogger
-from src.voice_client import VoiceClient
 from src import feedback as feedback_module
 
 
+def run_serve(args):
+    from src.session_server import VoiceSessionServer
+    if args.tts_processes:
+        os.environ["TTS_WORKERS"] = str(args.tts_processes)
+    server = VoiceSessionServer(host=args.host, port=args.port, tts_workers=args.tts_workers,
+                                max_sessions=args.max_sessions)
+    asyncio.run(server.serve_forever())
+
+
+def run_callers(args):
+    from src.session_server import load_pcm16_wav, run_callers as simulate
+    utterances = [load_pcm16_wav(p) for p in args.wav]
+    summary = asyncio.run(simulate(args.host, args.port, args.callers, args.persona, utterances,
+                                   realtime=not args.fast))
+    print(json.dumps(summary, indent=2))
+
+
+def run_stats(args):
+    from src.latency_stats import LatencyHistograms, compare
+    current = LatencyHistograms(window=args.window).add_files(args.paths, chunksize=args.chunksize)
+    if args.baseline:
+        # Runs are compared as a whole; time windows would not line up between them
+        base = LatencyHistograms().add_files(args.baseline, chunksize=args.chunksize).report()
+        now = current.report() if not args.window else LatencyHistograms().add_files(args.paths, chunksize=args.chunksize).report()
+        table = compare(base, now, threshold=args.threshold, min_samples=args.min_samples)
+    else:
+        table = current.report()
+    if args.json:
+        print(table.to_json(orient="records", indent=2))
+    else:
+        print(table.to_string(index=False))
+    if args.baseline and table["regression"].any():
+        print(f"\nRegressions (> {args.threshold:.0%} slower):")
+        print(table[table["regression"]][["persona", "stage"]].to_string(index=False))
+        return 1
+    return 0
+
+
+def run_bench(args):
+    from src.replay_bench import format_table, run_benchmark
+    result = run_benchmark(args.wav, personas=args.persona_names, turns=args.bench_turns, speed=args.speed,
+                           asr_latency_ms=args.asr_ms, ttft_ms=args.ttft_ms, tokens_per_sec=args.tokens_per_sec,
+                           tts_rtf=args.tts_rtf, real_tts=args.real_tts, log_path=args.log)
+    print(format_table(result["summary"]))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+def run_load(args):
+    from src.load_test import MockServerProcess, format_report, run_load as ramp
+    from src.replay_bench import synth_utterance
+    from src.session_server import load_pcm16_wav
+    utterances = [load_pcm16_wav(p) for p in args.wav] or [synth_utterance(2.5, seed=i).tobytes() for i in range(args.turns_per_caller)]
+    rates = [float(r) for r in args.rates.split(",")]
+    server = None
+    if args.target:
+        host, port = args.target.rsplit(":", 1)
+        port = int(port)
+    else:
+        if args.tts_processes:
+            # Inherited by the server process
+            os.environ["TTS_WORKERS"] = str(args.tts_processes)
+        server = MockServerProcess(tts_workers=args.tts_workers, asr_ms=args.asr_ms, ttft_ms=args.ttft_ms,
+                                   tokens_per_sec=args.tokens_per_sec, tts_rtf=args.tts_rtf,
+                                   real_tts=args.real_tts)
+        host, port = server.host, server.port
+    try:
+        result = asyncio.run(ramp(host, port, args.persona, utterances, rates, step_secs=args.step_secs,
+                                  server=server))
+    finally:
+        if server is not None:
+            server.close()
+    print(format_report(result))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
 def main():
     load_dotenv()
     init_logger()
@@ -16,7 +95,77 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--persona", choices=["card_lost","transfer_failed","account_locked"], default="card_lost")
     parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--pipeline", choices=["sync","async"], default="sync")
+    sub = parser.add_subparsers(dest="command")
+
+    serve = sub.add_parser("serve", help="host many voice sessions over a local socket")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--tts-workers", type=int, default=1)
+    serve.add_argument("--max-sessions", type=int, default=64)
+    serve.add_argument("--tts-processes", type=int, default=0,
+                       help="run Kokoro in this many worker processes (0 = in-process threads)")
+
+    callers = sub.add_parser("callers", help="drive a running server with simulated callers")
+    callers.add_argument("wav", nargs="+", help="16 kHz mono int16 WAV utterances, spoken in order")
+    callers.add_argument("--host", default="127.0.0.1")
+    callers.add_argument("--port", type=int, default=8765)
+    callers.add_argument("-n", "--callers", type=int, default=4)
+    callers.add_argument("--fast", action="store_true", help="send audio faster than real time")
+
+    bench = sub.add_parser("bench", help="replay recorded utterances through VoiceClient with mocked backends")
+    bench.add_argument("wav", nargs="*", help="16 kHz mono int16 WAV utterances (synthetic speech if omitted)")
+    bench.add_argument("--personas", dest="persona_names", nargs="+", help="persona names (default: all in config/personas)")
+    bench.add_argument("-n", "--bench-turns", type=int, default=5, help="turns per persona")
+    bench.add_argument("--speed", type=float, default=1.0, help="audio device clock multiplier (>1 replays faster)")
+    bench.add_argument("--asr-ms", type=float, default=250.0, help="mock transcription latency")
+    bench.add_argument("--ttft-ms", type=float, default=300.0, help="mock LLM time to first token")
+    bench.add_argument("--tokens-per-sec", type=float, default=150.0, help="mock LLM token rate")
+    bench.add_argument("--tts-rtf", type=float, default=0.3, help="stub TTS real-time factor")
+    bench.add_argument("--real-tts", action="store_true", help="use Kokoro instead of the stub")
+    bench.add_argument("--log", help="also write turns to this latency CSV (readable by `stats`)")
+    bench.add_argument("--json", help="write per-turn results and summary to this file")
+
+    load = sub.add_parser("load", help="ramp simulated callers against the session server")
+    load.add_argument("wav", nargs="*", help="16 kHz mono int16 WAV utterances per caller (synthetic if omitted)")
+    load.add_argument("--rates", default="0.1,0.25,0.5,1,2", help="comma-separated caller arrivals per second, one step each")
+    load.add_argument("--step-secs", type=float, default=30.0)
+    load.add_argument("--turns-per-caller", type=int, default=2, help="synthetic utterances per caller")
+    load.add_argument("--target", help="HOST:PORT of a running server; default runs one in-process with mocks")
+    load.add_argument("--tts-workers", type=int, default=1)
+    load.add_argument("--tts-processes", type=int, default=0, help="Kokoro worker processes (needs --real-tts)")
+    load.add_argument("--real-tts", action="store_true", help="use Kokoro instead of the CPU-bound stub")
+    load.add_argument("--asr-ms", type=float, default=250.0)
+    load.add_argument("--ttft-ms", type=float, default=300.0)
+    load.add_argument("--tokens-per-sec", type=float, default=150.0)
+    load.add_argument("--tts-rtf", type=float, default=0.3)
+    load.add_argument("--json", help="write the full report to this file")
+
+    stats = sub.add_parser("stats", help="percentile report over latency logs")
+    stats.add_argument("paths", nargs="*", default=[os.path.join("logs", "latency_log*.csv")],
+                       help="CSV or Parquet latency logs (globs allowed); defaults to logs/latency_log*.csv")
+    stats.add_argument("--window", default=None, help="group by time window, e.g. 1h or 1D")
+    stats.add_argument("--baseline", nargs="+", help="logs of a previous run to check for regressions")
+    stats.add_argument("--threshold", type=float, default=0.10, help="relative slowdown that counts as a regression")
+    stats.add_argument("--min-samples", type=int, default=20)
+    stats.add_argument("--chunksize", type=int, default=100_000)
+    stats.add_argument("--json", action="store_true")
     args = parser.parse_args()
+    if args.command == "load" and args.tts_processes and not args.real_tts:
+        # Worker processes always load Kokoro, which would silently replace the stub
+        load.error("--tts-processes needs --real-tts")
+
+    if args.command == "serve":
+        return run_serve(args)
+    if args.command == "callers":
+        return run_callers(args)
+    if args.command == "stats":
+        return run_stats(args)
+    if args.command == "bench":
+        return run_bench(args)
+    if args.command == "load":
+        return run_load(args)
+    from src.voice_client import VoiceClient
 
     persona_path = os.path.join("config", "personas", f"{args.persona}.json")
     with open(persona_path, "r") as f:
@@ -24,9 +173,12 @@ def main():
 
     session_id = str(uuid.uuid4())
     vc = VoiceClient(persona=persona, session_id=session_id)
-    logger = LatencyLogger(path=os.path.join("logs", "latency_log.csv"))
-    vc.run(max_turns=args.turns, logger_obj=logger, feedback=feedback_module)
+    logger = LatencyLogger.from_env(path=os.path.join("logs", "latency_log.csv"))
+    if args.pipeline == "async":
+        vc.run_async(max_turns=args.turns, logger_obj=logger, feedback=feedback_module)
+    else:
+        vc.run(max_turns=args.turns, logger_obj=logger, feedback=feedback_module)
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
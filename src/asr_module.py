@@ -1,12 +1,71 @@
 import io
 import os
+import re
+import struct
 import time
 import wave
-from typing import Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Tuple
 
 import webrtcvad
 import sounddevice as sd
-from groq import Groq
+
+from .clients import get_groq_client
+
+
+def wav_header(data_bytes: int, sample_rate: int, channels: int = 1, sampwidth: int = 2) -> bytes:
+    """44-byte RIFF/PCM header for a payload of data_bytes."""
+    byte_rate = sample_rate * channels * sampwidth
+    return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_bytes, b"WAVE", b"fmt ", 16, 1, channels,
+                       sample_rate, byte_rate, channels * sampwidth, sampwidth * 8, b"data", data_bytes)
+
+
+class WavPayload(io.RawIOBase):
+    """Read-only WAV file object made of a header plus a view of existing PCM; the samples are not copied."""
+
+    def __init__(self, pcm, sample_rate: int, name: str = "audio.wav"):
+        self._payload = memoryview(pcm).cast("B")
+        self._header = wav_header(len(self._payload), sample_rate)
+        self._pos = 0
+        self.name = name
+
+    def __len__(self) -> int:
+        return len(self._header) + len(self._payload)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def readinto(self, b) -> int:
+        out = memoryview(b).cast("B")
+        n = 0
+        h = len(self._header)
+        if self._pos < h:
+            k = min(len(out), h - self._pos)
+            out[:k] = self._header[self._pos:self._pos + k]
+            n = k
+        start = self._pos + n - h
+        k = max(0, min(len(out) - n, len(self._payload) - start))
+        if k:
+            out[n:n + k] = self._payload[start:start + k]
+            n += k
+        self._pos += n
+        return n
+
+
+def pcm16_to_wav_file(pcm, sample_rate: int) -> WavPayload:
+    """Zero-copy counterpart of pcm16_to_wav_bytes for bytes, bytearrays, memoryviews or int16 arrays."""
+    return WavPayload(pcm, sample_rate)
 
 
 def pcm16_to_wav_bytes(pcm: bytes, sample_rate: int) -> bytes:
@@ -20,37 +79,186 @@ def pcm16_to_wav_bytes(pcm: bytes, sample_rate: int) -> bytes:
     return bio.read()
 
 
+def _norm_word(w: str) -> str:
+    return re.sub(r"[^\w']", "", w.lower())
+
+
+def _field(obj, name, default=None):
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+class IncrementalTranscriber:
+    """Commits stable transcript prefixes so partials only resend recent audio.
+
+    Each partial transcribes a window starting a little before the committed
+    point. A segment is committed once two consecutive hypotheses agree on it
+    and it ends clear of the window edge; the committed point then advances to
+    its end. Words repeated in the overlap are dropped when merging.
+    """
+
+    def __init__(self, sample_rate: int, overlap_ms: int = 500):
+        self.sample_rate = sample_rate
+        self.overlap = int(sample_rate * overlap_ms / 1000)
+        self.committed: List[str] = []
+        self.commit_sample = 0
+        self._prev: List[Tuple[int, str]] = []
+        self.last_text = ""
+        self.last_end = 0
+
+    def window(self, n_samples: int) -> Tuple[int, int]:
+        return max(0, self.commit_sample - self.overlap), n_samples
+
+    def _merge(self, words: List[str]) -> List[str]:
+        # Drop the longest prefix of words that repeats the committed tail
+        tail = [_norm_word(w) for w in self.committed[-8:]]
+        head = [_norm_word(w) for w in words[:8]]
+        for k in range(min(len(tail), len(head)), 0, -1):
+            if tail[-k:] == head[:k]:
+                return words[k:]
+        return words
+
+    def accept(self, text: str, segments, start: int, end: int) -> str:
+        """Fold one window hypothesis in and return the full current transcript."""
+        if not segments:
+            # Backend gave no timings: nothing can be committed safely
+            tentative = self._merge(text.split())
+            self.last_text = " ".join(self.committed + tentative).strip()
+            self.last_end = end
+            return self.last_text
+
+        segs = []
+        for seg in segments:
+            seg_end = start + int(float(_field(seg, "end", 0.0)) * self.sample_rate)
+            seg_text = (_field(seg, "text", "") or "").strip()
+            if seg_text and seg_end > self.commit_sample:
+                segs.append((seg_end, seg_text))
+
+        edge = end - self.overlap
+        stable = 0
+        for i, (seg_end, seg_text) in enumerate(segs):
+            if i >= len(self._prev) or seg_end >= edge:
+                break
+            prev_end, prev_text = self._prev[i]
+            if _norm_word(prev_text) != _norm_word(seg_text) or abs(prev_end - seg_end) > self.overlap:
+                break
+            stable += 1
+        for seg_end, seg_text in segs[:stable]:
+            self.committed.extend(self._merge(seg_text.split()))
+            self.commit_sample = seg_end
+        self._prev = segs[stable:]
+
+        tentative: List[str] = []
+        for _, seg_text in segs[stable:]:
+            tentative.extend(seg_text.split())
+        tentative = self._merge(tentative)
+        self.last_text = " ".join(self.committed + tentative).strip()
+        self.last_end = end
+        return self.last_text
+
+
 class ASRClient:
-    def __init__(self, model: str | None = None, sample_rate: int = 16000):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    def __init__(self, model: str | None = None, sample_rate: int = 16000, client=None,
+                 incremental: bool | None = None):
+        self.client = client or get_groq_client()
         self.model = model or os.getenv("GROQ_ASR_MODEL", "whisper-large-v3-turbo")
         self.sample_rate = sample_rate
+        if incremental is None:
+            incremental = os.getenv("ASR_INCREMENTAL", "0") == "1"
+        self.incremental = incremental
+        self.overlap_ms = int(os.getenv("ASR_OVERLAP_MS", "500") or 500)
+        self.calls = 0
+        self.bytes_uploaded = 0
+        self.last_utterance_stats: dict = {}
+        # Partials run here so the capture loop never waits on the network
+        self._partial_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="asr-partial")
+
+    def _upload(self, wav_bytes, **kwargs):
+        if isinstance(wav_bytes, WavPayload):
+            bio = wav_bytes
+            bio.seek(0)
+        else:
+            bio = io.BytesIO(wav_bytes)
+            bio.name = "audio.wav"
+        self.calls += 1
+        self.bytes_uploaded += len(wav_bytes)
+        return self.client.audio.transcriptions.create(model=self.model, file=bio, **kwargs)
 
-    def transcribe_wav_bytes(self, wav_bytes: bytes) -> Tuple[str, float]:
+    def transcribe_wav_bytes(self, wav_bytes) -> Tuple[str, float]:
+        """Transcribe WAV bytes or a WavPayload."""
         t0 = time.perf_counter()
-        bio = io.BytesIO(wav_bytes)
-        bio.name = "audio.wav"
-        resp = self.client.audio.transcriptions.create(model=self.model, file=bio)
+        resp = self._upload(wav_bytes)
         latency_ms = (time.perf_counter() - t0) * 1000
         text = getattr(resp, "text", "")
         return text, latency_ms
 
+    def transcribe_segments(self, wav_bytes) -> Tuple[str, list, float]:
+        """Like transcribe_wav_bytes, but also returns segment timings (seconds into the clip)."""
+        t0 = time.perf_counter()
+        resp = self._upload(wav_bytes, response_format="verbose_json")
+        latency_ms = (time.perf_counter() - t0) * 1000
+        return _field(resp, "text", "") or "", _field(resp, "segments", None) or [], latency_ms
+
+    def transcribe_window(self, wav_bytes, start: int) -> Tuple[str, list, float]:
+        """Transcribe one incremental window that begins start samples into the utterance.
+
+        The API only sees the clip; start is there for offline doubles that
+        answer by position (see mock_backends.mock_asr_client).
+        """
+        return self.transcribe_segments(wav_bytes)
+
+    def _transcribe_window(self, buf: bytearray, inc: IncrementalTranscriber) -> Tuple[str, float]:
+        start, end = inc.window(len(buf) // 2)
+        # Only used once capture has stopped, so the window can be sent in place
+        with memoryview(buf) as view:
+            text, segments, ms = self.transcribe_window(pcm16_to_wav_file(view[start * 2:end * 2], self.sample_rate), start)
+        return inc.accept(text, segments, start, end), ms
+
+    def _submit_partial(self, buf: bytearray, inc: IncrementalTranscriber | None):
+        # Partials are copied: the capture loop keeps growing buf while they upload,
+        # and a bytearray cannot be resized while a view of it is exported
+        if inc is not None:
+            start, end = inc.window(len(buf) // 2)
+            wav = pcm16_to_wav_bytes(bytes(buf[start * 2:end * 2]), self.sample_rate)
+            return self._partial_pool.submit(self.transcribe_window, wav, start), (start, end)
+        wav = pcm16_to_wav_bytes(bytes(buf), self.sample_rate)
+        return self._partial_pool.submit(self.transcribe_wav_bytes, wav), None
+
+    def _partial_text(self, fut: Future, span, inc: IncrementalTranscriber | None) -> str:
+        if inc is not None:
+            text, segments, _ = fut.result()
+            return inc.accept(text, segments, *span)
+        return fut.result()[0]
+
     def streaming_listen(self, vad_stream: "VADStream", on_partial=lambda t: None,
                           partial_interval_ms: int = 800,
                           min_speech_ms: int = 200,
-                          max_silence_ms: int = 600) -> Tuple[str, float, float]:
+                          max_silence_ms: int = 600,
+                          endpointer=None, tracer=None) -> Tuple[str, float, float]:
         buf = bytearray()
         started = False
         voiced_ms = 0
         unvoiced_ms = 0
         last_partial_time = time.perf_counter()
         t_listen_start = time.perf_counter()
+        calls0, bytes0 = self.calls, self.bytes_uploaded
+        inc = IncrementalTranscriber(self.sample_rate, self.overlap_ms) if self.incremental else None
+        pending: Future | None = None
+        pending_span = None
+        t_last_voice = None
+        if endpointer is not None:
+            endpointer.reset()
 
         while True:
             data = vad_stream.stream.read(int(vad_stream.frame_bytes / 2))[0].tobytes()
             if len(data) < vad_stream.frame_bytes:
                 continue
             is_speech = vad_stream.vad.is_speech(data, vad_stream.sample_rate)
+            if is_speech:
+                t_last_voice = time.perf_counter_ns()
+            if started and endpointer is not None and endpointer.update(is_speech):
+                break
             if is_speech:
                 buf.extend(data)
                 voiced_ms += 30
@@ -60,28 +268,67 @@ class ASRClient:
             else:
                 if started:
                     unvoiced_ms += 30
-                    if unvoiced_ms >= max_silence_ms:
+                    if endpointer is None and unvoiced_ms >= max_silence_ms:
                         break
                 else:
                     voiced_ms = 0
 
-            # Emit partials at intervals once started and enough audio accumulated
-            if started:
+            # Partials run in the background with at most one call in flight;
+            # an interval that elapses while one is pending is simply skipped
+            if pending is not None and pending.done():
+                try:
+                    text = self._partial_text(pending, pending_span, inc)
+                    if text:
+                        if endpointer is not None:
+                            endpointer.set_context(text)
+                        on_partial(text)
+                except Exception:
+                    pass
+                pending = None
+            if started and pending is None:
                 now = time.perf_counter()
                 if (now - last_partial_time) * 1000 >= partial_interval_ms and len(buf) > int(self.sample_rate * 0.5) * 2:
-                    try:
-                        wav = pcm16_to_wav_bytes(bytes(buf), self.sample_rate)
-                        text, _ = self.transcribe_wav_bytes(wav)
-                        if text:
-                            on_partial(text)
-                    except Exception:
-                        pass
+                    pending, pending_span = self._submit_partial(buf, inc)
                     last_partial_time = now
+                    if tracer is not None:
+                        sp = tracer.start("asr.partial", audio_bytes=len(buf))
+                        pending.add_done_callback(lambda f, sp=sp: sp.end())
+
+        if pending is not None:
+            # Worth waiting for only if it already covers all captured speech
+            if inc is not None and pending_span[1] == len(buf) // 2:
+                try:
+                    self._partial_text(pending, pending_span, inc)
+                except Exception:
+                    pass
+            pending = None
+
+        if tracer is not None and t_last_voice is not None:
+            # The user stopped talking at the last voiced frame; the rest is endpoint delay
+            tracer.add("vad.endpoint", t_last_voice, time.perf_counter_ns())
+            tracer.mark("speech_end", t_last_voice)
+        t_final = time.perf_counter_ns()
 
         # Final transcription
-        wav = pcm16_to_wav_bytes(bytes(buf), self.sample_rate)
-        final_text, final_ms = self.transcribe_wav_bytes(wav)
+        reused = False
+        if inc is not None and inc.last_text and inc.last_end == len(buf) // 2:
+            # No speech arrived since the last partial, so it already is the final
+            final_text, final_ms, reused = inc.last_text, 0.0, True
+        elif inc is not None:
+            final_text, final_ms = self._transcribe_window(buf, inc)
+        else:
+            # Capture has ended, so the buffer can be uploaded in place
+            with memoryview(buf) as view:
+                final_text, final_ms = self.transcribe_wav_bytes(pcm16_to_wav_file(view, self.sample_rate))
         asr_secs = len(buf) / 2 / self.sample_rate
+        if tracer is not None:
+            tracer.add("asr.final", t_final, time.perf_counter_ns(), reused=reused, audio_bytes=len(buf))
+        self.last_utterance_stats = {
+            "calls": self.calls - calls0,
+            "bytes_uploaded": self.bytes_uploaded - bytes0,
+            "audio_bytes": len(buf),
+            "final_reused": reused,
+        }
         return final_text, final_ms, asr_secs
 
 
@@ -106,16 +353,21 @@ class VADStream:
             remaining -= len(block)
         return b"".join(frames)
 
-    def detect_speech_segment(self, max_silence_ms: int = 600, min_speech_ms: int = 200) -> bytes:
+    def detect_speech_segment(self, max_silence_ms: int = 600, min_speech_ms: int = 200,
+                              endpointer=None) -> bytes:
         speech = bytearray()
         voiced = 0
         unvoiced = 0
         started = False
+        if endpointer is not None:
+            endpointer.reset()
         while True:
             data = self.stream.read(int(self.frame_bytes / 2))[0].tobytes()
             if len(data) < self.frame_bytes:
                 continue
             is_speech = self.vad.is_speech(data, self.sample_rate)
+            if started and endpointer is not None and endpointer.update(is_speech):
+                break
             if is_speech:
                 voiced += 1
                 unvoiced = 0
@@ -125,7 +377,7 @@ class VADStream:
             else:
                 if started:
                     unvoiced += 1
-                    if unvoiced * 30 >= max_silence_ms:
+                    if endpointer is None and unvoiced * 30 >= max_silence_ms:
                         break
                 else:
                     voiced = 0
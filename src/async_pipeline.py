@@ -0,0 +1,193 @@
+"""
+asyncio implementation of the VoiceClient turn pipeline.
+Stages (LLM tokens -> sentences -> TTS chunks -> playback) run as tasks
+connected by bounded asyncio.Queues; barge-in cancels all of them.
+"""
+import asyncio
+import re
+import threading
+import time
+from typing import AsyncIterator, Iterator, List
+
+from loguru import logger
+
+from .capture_hub import CaptureStopped
+from .tracing import export_from_env
+
+_END = object()
+_SENTENCE_RE = re.compile(r"([\s\S]*?[\.\!\?])\s")
+
+
+async def aiter_sync(iterator: Iterator, cancel: threading.Event, maxsize: int = 16) -> AsyncIterator:
+    """Drive a blocking iterator on a worker thread and yield its items in the event loop.
+
+    The bounded queue applies backpressure to the worker; setting cancel (or
+    abandoning the async iterator) stops it after the current item.
+    """
+    loop = asyncio.get_running_loop()
+    q: asyncio.Queue = asyncio.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        fut = asyncio.run_coroutine_threadsafe(q.put(item), loop)
+        while True:
+            try:
+                fut.result(timeout=0.1)
+                return True
+            except TimeoutError:
+                if stop.is_set() or cancel.is_set():
+                    fut.cancel()
+                    return False
+
+    def pump():
+        try:
+            for item in iterator:
+                if stop.is_set() or cancel.is_set() or not put(item):
+                    break
+        except Exception as e:
+            put(e)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+            put(_END)
+
+    threading.Thread(target=pump, name="aiter-sync", daemon=True).start()
+    try:
+        while True:
+            item = await q.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+async def asplit_sentences(tokens: AsyncIterator[str], on_partial=None) -> AsyncIterator[str]:
+    buf = ""
+    async for tok in tokens:
+        if on_partial:
+            on_partial(tok)
+        buf += tok
+        while True:
+            m = _SENTENCE_RE.search(buf)
+            if not m:
+                break
+            s = m.group(1)
+            yield s
+            buf = buf[len(s):].lstrip()
+    if buf.strip():
+        yield buf.strip()
+
+
+class AsyncVoicePipeline:
+    """Runs VoiceClient turns with overlapping asyncio stages.
+
+    Audio capture, Groq calls and Kokoro stay blocking and run on worker
+    threads; everything between them is coordinated in the event loop, so
+    several pipelines can share one loop.
+    """
+
+    def __init__(self, client, queue_size: int = 4):
+        self.vc = client
+        self.queue_size = queue_size
+
+    async def run_turn(self, system_prompt: str, turn_idx: int, logger_obj):
+        vc = self.vc
+        vc._begin_listen(turn_idx)
+        user_text, asr_ms, asr_secs = await asyncio.to_thread(vc.listen_once)
+        print(f"You: {user_text}")
+        vc.state.add_turn("user", user_text)
+
+        stream, llm_record, speculative_hit = await asyncio.to_thread(vc._start_llm, user_text)
+        cancel = threading.Event()
+        sentence_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        pcm_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        output_sents: List[str] = []
+        playback = vc.tts.playback
+
+        def stopped():
+            return cancel.is_set() or vc.barge_in_flag.is_set()
+
+        def on_llm_partial(tok: str):
+            print(tok, end="", flush=True)
+            vc.emit("llm_partial", tok)
+
+        async def llm_stage():
+            async for s in asplit_sentences(aiter_sync(stream, cancel), on_partial=on_llm_partial):
+                output_sents.append(s)
+                vc.emit("assistant_sentence", s)
+                await sentence_q.put(s)
+            await sentence_q.put(_END)
+
+        async def tts_stage():
+            while (s := await sentence_q.get()) is not _END:
+                # All chunks of a sentence share one segment, so heard_text() can cut it by word
+                segment = playback.new_segment()
+                with vc.tracer.span("tts.synth", chars=len(s)):
+                    async for pcm in aiter_sync(vc.tts.stream_pcm(s, stopped), cancel):
+                        await pcm_q.put((segment, s, pcm))
+            await pcm_q.put(_END)
+
+        async def playback_stage():
+            while (item := await pcm_q.get()) is not _END:
+                segment, sentence, pcm = item
+                if not await asyncio.to_thread(playback.enqueue, pcm, sentence, segment):
+                    return
+            await asyncio.to_thread(playback.wait_idle)
+
+        playback.reset()
+        playback.open_stream(vc.tts.sample_rate)
+        vc.monitor_barge_in()
+        print("Customer (streaming): ", end="", flush=True)
+        vc.emit("status", "Speaking")
+        t0_tts = time.perf_counter()
+        stages = asyncio.gather(llm_stage(), tts_stage(), playback_stage())
+        watcher = asyncio.ensure_future(asyncio.to_thread(vc.barge_in_flag.wait))
+        try:
+            await asyncio.wait({stages, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            interrupted = vc.barge_in_flag.is_set()
+            if not stages.done():
+                # Barge-in: cancellation propagates into every stage
+                cancel.set()
+                playback.stop()
+                stages.cancel()
+            try:
+                await stages
+            except asyncio.CancelledError:
+                pass
+        finally:
+            cancel.set()
+            print("")
+            vc.stop_barge_in_monitor()
+            await watcher
+        tts_ms = (time.perf_counter() - t0_tts) * 1000
+
+        vc._finish_turn(turn_idx, logger_obj, user_text, asr_ms, asr_secs,
+                        llm_record, tts_ms, output_sents, interrupted, speculative_hit)
+
+    async def run(self, max_turns: int, logger_obj, feedback=None):
+        vc = self.vc
+        await asyncio.to_thread(vc.start)
+        system_prompt = vc.persona.get("system_prompt", "")
+        try:
+            for i in range(1, max_turns + 1):
+                if vc.stop_event.is_set():
+                    break
+                try:
+                    await self.run_turn(system_prompt, i, logger_obj)
+                except CaptureStopped:
+                    # request_stop() closed the microphone mid-listen
+                    if vc.stop_event.is_set():
+                        break
+                    raise
+                except Exception as e:
+                    logger.error(f"Turn {i} failed: {e}")
+                    raise
+        finally:
+            vc.capture.stop()
+            export_from_env(vc.tracer)
+        if feedback:
+            print(feedback.evaluate(vc.state))
@@ -0,0 +1,166 @@
+"""
+One microphone stream shared by several readers.
+
+The hub owns a single callback-driven InputStream that writes each block
+once into a CaptureRing. Every consumer (listen loop, barge-in detector,
+recorder) subscribes with its own read cursor, so each one sees every frame
+exactly once, whatever the others are doing. A reader only loses audio if it
+falls more than buffer_secs behind, and then the loss is counted.
+"""
+import os
+import threading
+import time
+import wave
+from typing import Dict, Optional
+
+import numpy as np
+import sounddevice as sd
+from loguru import logger
+
+from .ring_buffer import CaptureRing
+
+
+class CaptureStopped(Exception):
+    """Raised by Subscription.read() once the hub has been stopped."""
+
+
+class Subscription:
+    """A read cursor into the hub's ring.
+
+    read() matches sounddevice's blocking InputStream.read, so a subscription
+    can stand in for VADStream.stream.
+    """
+
+    def __init__(self, hub: "CaptureHub", name: str, pos: int):
+        self.hub = hub
+        self.name = name
+        self.pos = pos
+        self.frames = 0
+        self.dropped = 0
+        self.closed = False
+
+    def read_frame(self, n: Optional[int] = None, timeout: Optional[float] = None) -> Optional[memoryview]:
+        """Next n samples (one frame by default) as a view into the ring, or None on timeout/stop."""
+        if self.closed:
+            return None
+        view, self.pos, dropped = self.hub.ring.read_at(self.pos, n or self.hub.blocksize, timeout)
+        if dropped:
+            self.dropped += dropped
+            logger.warning(f"Capture reader '{self.name}' fell behind; skipped {dropped} samples")
+        if view is not None:
+            self.frames += 1
+        return view
+
+    def read(self, frames: int):
+        view = self.read_frame(frames)
+        if view is None:
+            raise CaptureStopped(f"capture stopped while '{self.name}' was reading")
+        return np.asarray(view).reshape(-1, 1), False
+
+    def seek(self, pos: int):
+        self.pos = max(0, min(int(pos), self.hub.ring.written))
+
+    def seek_live(self, preroll_samples: int = 0):
+        """Skip to the newest audio, keeping preroll_samples of history."""
+        self.seek(self.hub.ring.written - preroll_samples)
+
+    @property
+    def lag(self) -> int:
+        return self.hub.ring.written - self.pos
+
+    def close(self):
+        self.closed = True
+        self.hub._unsubscribe(self)
+
+    def stats(self) -> dict:
+        return {"frames": self.frames, "dropped_samples": self.dropped, "lag_samples": self.lag}
+
+
+class CaptureHub:
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 30, buffer_secs: Optional[float] = None):
+        if buffer_secs is None:
+            buffer_secs = float(os.getenv("CAPTURE_BUFFER_SECS", "30") or 30)
+        self.sample_rate = sample_rate
+        self.blocksize = int(sample_rate * (frame_ms / 1000.0))
+        self.ring = CaptureRing(int(sample_rate * buffer_secs), block=self.blocksize)
+        self.input_overflows = 0
+        self.stream = None
+        self.subscribers: Dict[str, Subscription] = {}
+        self._lock = threading.Lock()
+        self._recorder: Optional[threading.Thread] = None
+        # (perf_counter_ns, ring position) at the latest callback, to map times to positions
+        self._last_block = (0, 0)
+
+    def _cb(self, indata, frames, time_info, status):
+        if status and getattr(status, "input_overflow", False):
+            self.input_overflows += 1
+        self.ring.write(indata[:, 0])
+        self._last_block = (time.perf_counter_ns(), self.ring.written)
+
+    def position_at(self, t_ns: int) -> int:
+        """Approximate ring position of audio captured at perf_counter_ns time t_ns."""
+        block_ns, pos = self._last_block
+        return max(0, min(self.ring.written, pos - int((block_ns - t_ns) * self.sample_rate / 1e9)))
+
+    def start(self):
+        if self.stream is not None:
+            return
+        self.ring.reset()
+        self.stream = sd.InputStream(samplerate=self.sample_rate, channels=1, dtype="int16",
+                                     blocksize=self.blocksize, callback=self._cb)
+        self.stream.start()
+        record_dir = os.getenv("CAPTURE_RECORD_DIR", "")
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+            self.start_recorder(os.path.join(record_dir, f"capture_{int(time.time())}.wav"))
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        # Wakes every blocked reader; their reads return None from here on
+        self.ring.close()
+        if self._recorder is not None:
+            self._recorder.join(timeout=2.0)
+            self._recorder = None
+
+    def subscribe(self, name: str, from_start: bool = False) -> Subscription:
+        """New cursor at the live edge (or at the oldest retained sample with from_start)."""
+        with self._lock:
+            if name in self.subscribers:
+                self.subscribers[name].closed = True
+            pos = max(0, self.ring.written - self.ring.capacity) if from_start else self.ring.written
+            sub = self.subscribers[name] = Subscription(self, name, pos)
+            return sub
+
+    def _unsubscribe(self, sub: Subscription):
+        with self._lock:
+            if self.subscribers.get(sub.name) is sub:
+                del self.subscribers[sub.name]
+
+    def start_recorder(self, path: str):
+        """Write everything captured from now on to a 16-bit mono WAV, on its own cursor."""
+        sub = self.subscribe("recorder")
+
+        def run():
+            with wave.open(path, "wb") as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(self.sample_rate)
+                while True:
+                    view = sub.read_frame(timeout=0.5)
+                    if view is None:
+                        if self.ring.closed or sub.closed:
+                            break
+                        continue
+                    wf.writeframesraw(view)
+            sub.close()
+        self._recorder = threading.Thread(target=run, name="capture-recorder", daemon=True)
+        self._recorder.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            subs = {name: sub.stats() for name, sub in self.subscribers.items()}
+        return {"captured_samples": self.ring.written, "input_overflows": self.input_overflows,
+                "subscribers": subs}
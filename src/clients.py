@@ -0,0 +1,83 @@
+"""
+Process-wide registry of Groq clients sharing one pooled HTTP transport.
+
+Every ASRClient/LLMClient (and every Streamlit rerun or server session)
+gets the same keep-alive connection pool instead of opening fresh TCP/TLS
+connections. HTTP/2 is used when the optional h2 package is installed.
+"""
+import importlib.util
+import os
+import threading
+
+import httpx
+from groq import Groq
+from loguru import logger
+
+_lock = threading.Lock()
+_http_client: httpx.Client | None = None
+_groq_clients: dict = {}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def get_http_client() -> httpx.Client:
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            limits = httpx.Limits(
+                max_connections=_env_int("GROQ_MAX_CONNECTIONS", 20),
+                max_keepalive_connections=_env_int("GROQ_MAX_KEEPALIVE", 10),
+                keepalive_expiry=_env_int("GROQ_KEEPALIVE_SECS", 120),
+            )
+            http2 = importlib.util.find_spec("h2") is not None and os.getenv("GROQ_HTTP2", "1") == "1"
+            _http_client = httpx.Client(
+                http2=http2,
+                limits=limits,
+                timeout=httpx.Timeout(60.0, connect=5.0),
+            )
+        return _http_client
+
+
+def get_groq_client(api_key: str | None = None, base_url: str | None = None) -> Groq:
+    """Return the shared Groq client for this key/base URL, creating it on first use."""
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    base_url = base_url or os.getenv("GROQ_BASE_URL") or None
+    key = (api_key, base_url)
+    with _lock:
+        client = _groq_clients.get(key)
+    if client is not None:
+        return client
+    client = Groq(api_key=api_key, base_url=base_url, http_client=get_http_client())
+    with _lock:
+        client = _groq_clients.setdefault(key, client)
+    if os.getenv("GROQ_PRECONNECT", "0") == "1":
+        preconnect(client)
+    return client
+
+
+def preconnect(client: Groq, background: bool = True):
+    """Open a pooled connection to the API host so the first turn skips TCP/TLS setup."""
+    def run():
+        try:
+            get_http_client().head(str(client.base_url))
+        except Exception as e:
+            logger.debug(f"Pre-connect failed: {e}")
+
+    if background:
+        threading.Thread(target=run, name="groq-preconnect", daemon=True).start()
+    else:
+        run()
+
+
+def close_clients():
+    global _http_client
+    with _lock:
+        _groq_clients.clear()
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
@@ -0,0 +1,91 @@
+import os
+import re
+from collections import deque
+
+import numpy as np
+
+_TRAILING_CONTINUATION = re.compile(r"(,|\b(and|but|so|or|because|um|uh|like|the|a|to|my|i)\s*)$", re.I)
+
+
+class AdaptiveEndpointer:
+    """Decides end-of-utterance from per-frame VAD with a context-aware silence threshold.
+
+    The base threshold is learned per speaker from the pauses they make inside
+    utterances (those that did not end the turn), then shortened after a
+    partial that ends in a question or full stop and lengthened when the
+    partial trails off mid-sentence.
+    """
+
+    def __init__(self, base_ms: int = 600, min_ms: int = 250, max_ms: int = 1200,
+                 question_ms: int = 350, mid_sentence_ms: int = 900,
+                 frame_ms: int = 30, history: int = 50, margin_ms: int = 120):
+        self.base_ms = base_ms
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.question_ms = question_ms
+        self.mid_sentence_ms = mid_sentence_ms
+        self.frame_ms = frame_ms
+        self.margin_ms = margin_ms
+        self.pauses: deque = deque(maxlen=history)
+        self.decisions: deque = deque(maxlen=history)
+        self.context = ""
+        self.silence_ms = 0
+        self.last_threshold_ms = base_ms
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveEndpointer":
+        def env_int(name, default):
+            try:
+                return int(os.getenv(name, str(default)) or default)
+            except ValueError:
+                return default
+        return cls(base_ms=env_int("ENDPOINT_BASE_MS", 600),
+                   min_ms=env_int("ENDPOINT_MIN_MS", 250),
+                   max_ms=env_int("ENDPOINT_MAX_MS", 1200))
+
+    def reset(self):
+        """Start a new utterance; learned pauses are kept."""
+        self.context = ""
+        self.silence_ms = 0
+
+    def set_context(self, partial_text: str):
+        self.context = partial_text.strip()
+
+    def learned_ms(self) -> float:
+        if len(self.pauses) < 5:
+            return float(self.base_ms)
+        # Wait a little longer than this speaker's usual within-turn pause
+        return float(np.percentile(np.fromiter(self.pauses, dtype=float), 90)) + self.margin_ms
+
+    def threshold_ms(self) -> float:
+        t = self.learned_ms()
+        if self.context.endswith("?"):
+            t = min(t, self.question_ms)
+        elif self.context.endswith((".", "!")):
+            t *= 0.8
+        elif self.context and _TRAILING_CONTINUATION.search(self.context):
+            t = max(t, self.mid_sentence_ms)
+        return min(self.max_ms, max(self.min_ms, t))
+
+    def update(self, is_speech: bool) -> bool:
+        """Feed one frame after speech has started; True when the utterance has ended."""
+        if is_speech:
+            if self.silence_ms >= 2 * self.frame_ms:
+                self.pauses.append(self.silence_ms)
+            self.silence_ms = 0
+            return False
+        self.silence_ms += self.frame_ms
+        self.last_threshold_ms = self.threshold_ms()
+        if self.silence_ms >= self.last_threshold_ms:
+            self.decisions.append(self.silence_ms)
+            return True
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": round(self.last_threshold_ms, 1),
+            "decision_latency_ms": self.decisions[-1] if self.decisions else None,
+            "avg_decision_latency_ms": (sum(self.decisions) / len(self.decisions)) if self.decisions else None,
+            "learned_ms": round(self.learned_ms(), 1),
+            "pauses_observed": len(self.pauses),
+        }
@@ -0,0 +1,127 @@
+"""Percentile reports over latency_log.csv (and its rotated/Parquet siblings).
+
+Files are streamed in chunks and folded into fixed log-spaced histograms per
+(persona, window, stage), so memory stays bounded however long the logs get.
+Percentiles are read off the histograms; bins are 1% wide, which is also the
+worst-case relative error of a reported percentile.
+"""
+import csv
+import glob
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+STAGES = ["asr_ms", "llm_ms", "llm_ttft_ms", "tts_ms", "first_audio_ms", "total_ms"]
+QUANTILES = (0.5, 0.9, 0.99)
+_EDGES = np.geomspace(0.1, 1e7, int(np.log(1e8) / np.log(1.01)) + 1)
+_NBINS = len(_EDGES) - 1
+_ALL = "all"
+
+
+def expand_paths(paths: Iterable[str]) -> List[str]:
+    out = []
+    for p in paths:
+        matches = sorted(glob.glob(p))
+        out.extend(matches or [p])
+    return out
+
+
+def _header(path: str) -> List[str]:
+    with open(path, newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def iter_chunks(path: str, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+    """Yield DataFrames holding ts, persona and whichever stage columns the file has."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path)
+        cols = [c for c in ["ts", "persona"] + STAGES if c in pf.schema_arrow.names]
+        for batch in pf.iter_batches(batch_size=chunksize, columns=cols):
+            yield batch.to_pandas()
+        return
+    cols = [c for c in ["ts", "persona"] + STAGES if c in _header(path)]
+    yield from pd.read_csv(path, usecols=cols, chunksize=chunksize)
+
+
+class LatencyHistograms:
+    """Mergeable per-group, per-stage latency histograms."""
+
+    def __init__(self, window: Optional[str] = None):
+        self.window = window
+        self.counts: Dict[Tuple[str, str, str], np.ndarray] = {}
+        self.sums: Dict[Tuple[str, str, str], float] = {}
+        self.rows = 0
+
+    def add_frame(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        self.rows += len(df)
+        persona = df["persona"].astype(str) if "persona" in df else pd.Series(_ALL, index=df.index)
+        if self.window and "ts" in df:
+            window = pd.to_datetime(df["ts"], unit="ms").dt.floor(self.window).astype(str)
+        else:
+            window = pd.Series(_ALL, index=df.index)
+        codes, groups = pd.MultiIndex.from_arrays([persona, window]).factorize()
+        for stage in STAGES:
+            if stage not in df:
+                continue
+            values = pd.to_numeric(df[stage], errors="coerce").to_numpy(dtype=np.float64)
+            ok = np.isfinite(values)
+            if not ok.any():
+                continue
+            v, c = values[ok], codes[ok]
+            bins = np.clip(np.searchsorted(_EDGES, v, side="right") - 1, 0, _NBINS - 1)
+            hist = np.bincount(c * _NBINS + bins, minlength=len(groups) * _NBINS).reshape(len(groups), _NBINS)
+            sums = np.bincount(c, weights=v, minlength=len(groups))
+            for g in np.flatnonzero(hist.any(axis=1)):
+                key = (groups[g][0], groups[g][1], stage)
+                if key in self.counts:
+                    self.counts[key] += hist[g]
+                    self.sums[key] += sums[g]
+                else:
+                    self.counts[key] = hist[g].copy()
+                    self.sums[key] = float(sums[g])
+
+    def add_files(self, paths: Iterable[str], chunksize: int = 100_000) -> "LatencyHistograms":
+        for path in expand_paths(paths):
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            for chunk in iter_chunks(path, chunksize):
+                self.add_frame(chunk)
+        return self
+
+    def report(self, quantiles=QUANTILES) -> pd.DataFrame:
+        """One row per (persona, window, stage) with n, mean and the requested percentiles."""
+        records = []
+        # Upper edge of each bin, so a percentile never under-reports
+        upper = _EDGES[1:]
+        for (persona, window, stage), hist in sorted(self.counts.items()):
+            n = int(hist.sum())
+            cum = np.cumsum(hist)
+            rec = {"persona": persona, "window": window, "stage": stage, "n": n,
+                   "mean": round(self.sums[(persona, window, stage)] / n, 1)}
+            for q in quantiles:
+                idx = int(np.searchsorted(cum, q * n, side="left"))
+                rec[f"p{int(round(q * 100))}"] = round(float(upper[min(idx, _NBINS - 1)]), 1)
+            records.append(rec)
+        return pd.DataFrame.from_records(records, columns=["persona", "window", "stage", "n", "mean"] +
+                                         [f"p{int(round(q * 100))}" for q in quantiles])
+
+
+def compare(baseline: pd.DataFrame, current: pd.DataFrame, threshold: float = 0.10,
+            min_samples: int = 20) -> pd.DataFrame:
+    """Join two reports and flag percentiles that got worse by more than threshold."""
+    keys = ["persona", "window", "stage"]
+    merged = baseline.merge(current, on=keys, suffixes=("_base", "_cur"))
+    pcols = [c[:-5] for c in merged.columns if c.startswith("p") and c.endswith("_base")]
+    enough = (merged["n_base"] >= min_samples) & (merged["n_cur"] >= min_samples)
+    merged["regression"] = False
+    for p in pcols:
+        change = (merged[f"{p}_cur"] - merged[f"{p}_base"]) / merged[f"{p}_base"].where(merged[f"{p}_base"] > 0)
+        merged[f"{p}_change"] = change.round(3)
+        merged["regression"] |= enough & (change > threshold)
+    return merged[keys + ["n_base", "n_cur"] + [c for p in pcols for c in (f"{p}_base", f"{p}_cur", f"{p}_change")]
+                  + ["regression"]]
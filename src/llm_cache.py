@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+class LLMResponseCache:
+    """Exact-match cache of LLM replies with TTL + LRU eviction and an optional disk tier.
+
+    Replies are stored as their token pieces so a hit can be replayed through
+    the same streaming path as a live response. The disk tier is capped at
+    max_disk_bytes (0 for no cap): expired files and then the least recently
+    used ones (by mtime, which a hit refreshes) are deleted on start and,
+    at most once a minute or when over the cap, after a write.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_s: float = 3600.0, cache_dir: Optional[str] = None,
+                 max_disk_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+        self._disk_bytes = 0
+        self._next_sweep = 0.0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._sweep_disk()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, seed, max_tokens: int, messages: list) -> str:
+        payload = {
+            "model": model,
+            "temperature": round(float(temperature), 4),
+            "seed": seed,
+            "max_tokens": max_tokens,
+            "messages": [{"role": m.get("role"), "content": _normalize(m.get("content", ""))} for m in messages],
+        }
+        raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _disk_files(self):
+        """(path, size, mtime) of every cached file."""
+        out = []
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    out.append((entry.path, st.st_size, st.st_mtime))
+        return out
+
+    def _sweep_disk(self):
+        # A file untouched for ttl_s is older than that too, so it is dropped without being read.
+        # Past the cap, trim to 90% so a full cache does not rescan on every put.
+        now = time.time()
+        files = sorted(self._disk_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_disk_bytes * 0.9) if 0 < self.max_disk_bytes < total else None
+        evicted = 0
+        for path, size, mtime in files:
+            if now - mtime <= self.ttl_s and (target is None or total <= target):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.disk_evictions += evicted
+            self._next_sweep = now + min(self.ttl_s, 60.0)
+
+    def _remember(self, key: str, created: float, tokens: List[str]):
+        self._mem[key] = (created, tokens)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List[str]]:
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl_s:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._mem[key]
+        if self.cache_dir:
+            path = self._path(key)
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+                if now - data["created"] <= self.ttl_s:
+                    try:
+                        # Marks the file as recently used for disk eviction
+                        os.utime(path)
+                    except OSError:
+                        pass
+                    with self._lock:
+                        self._remember(key, data["created"], data["tokens"])
+                        self.hits += 1
+                    return data["tokens"]
+                size = os.path.getsize(path)
+                os.remove(path)
+                with self._lock:
+                    self._disk_bytes -= size
+            except (OSError, ValueError, KeyError):
+                pass
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, tokens: List[str]):
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, list(tokens))
+        if self.cache_dir:
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                old_size = os.path.getsize(path) if os.path.exists(path) else 0
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "w") as f:
+                    json.dump({"created": created, "tokens": list(tokens)}, f)
+                os.replace(tmp, path)
+                size = os.path.getsize(path)
+            except OSError as e:
+                print(f"LLM cache write failed: {e}")
+                return
+            with self._lock:
+                self._disk_bytes += size - old_size
+                sweep = (0 < self.max_disk_bytes < self._disk_bytes) or created >= self._next_sweep
+            if sweep:
+                self._sweep_disk()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": (self.hits / total) if total else 0.0, "entries": len(self._mem),
+                    "disk_bytes": self._disk_bytes, "disk_evictions": self.disk_evictions}
+
+
+def llm_cache_from_env() -> Optional[LLMResponseCache]:
+    if os.getenv("LLM_CACHE", "0") != "1":
+        return None
+    try:
+        ttl = float(os.getenv("LLM_CACHE_TTL_S", "3600") or 3600)
+        entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512") or 512)
+    except ValueError:
+        ttl, entries = 3600.0, 512
+    try:
+        disk_mb = float(os.getenv("LLM_CACHE_DISK_MB", "64") or 64)
+    except ValueError:
+        disk_mb = 64
+    cache_dir = os.getenv("LLM_CACHE_DIR", os.path.join("cache", "llm")) or None
+    return LLMResponseCache(max_entries=entries, ttl_s=ttl, cache_dir=cache_dir,
+                            max_disk_bytes=int(disk_mb * 1024 * 1024))
@@ -1,27 +1,127 @@
 import os
+import re
 import time
-from typing import Generator, Tuple
-from groq import Groq
+from dataclasses import dataclass, field
+from typing import Generator, Optional, Tuple
 
+from .clients import get_groq_client
+from .llm_cache import LLMResponseCache, llm_cache_from_env
 
-def approx_tokens(text: str) -> int:
-    return max(1, int(len(text) / 4))
+
+_SENTENCE_END = re.compile(r"[\.\!\?]\s")
+
+
+@dataclass
+class LLMRequestRecord:
+    """Latency milestones of one LLM request, in ms since the request was sent."""
+    model: str = ""
+    cached: bool = False
+    headers_ms: Optional[float] = None
+    first_byte_ms: Optional[float] = None
+    first_token_ms: Optional[float] = None
+    first_sentence_ms: Optional[float] = None
+    last_token_ms: Optional[float] = None
+    tokens: int = 0
+    complete: bool = False
+    t_sent: float = field(default_factory=time.perf_counter)
+    _text: str = field(default="", repr=False)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.t_sent) * 1000
+
+    def on_chunk(self, delta: str):
+        now = self.elapsed_ms()
+        if self.first_byte_ms is None:
+            self.first_byte_ms = now
+        if not delta:
+            return
+        if self.first_token_ms is None:
+            self.first_token_ms = now
+        self.last_token_ms = now
+        self.tokens += 1
+        if self.first_sentence_ms is None:
+            # Same boundary rule as split_sentences; text is only kept until it fires
+            self._text += delta
+            if _SENTENCE_END.search(self._text):
+                self.first_sentence_ms = now
+                self._text = ""
+
+    def finish(self, usage=None):
+        self.complete = True
+        completion = getattr(usage, "completion_tokens", None)
+        if completion:
+            # Stream chunks are an approximation; prefer the provider's count
+            self.tokens = completion
+        if self.first_sentence_ms is None and self.last_token_ms is not None:
+            # A reply without a terminator is one sentence that ends with the stream
+            self.first_sentence_ms = self.last_token_ms
+        self._text = ""
+
+    @property
+    def tokens_per_sec(self) -> Optional[float]:
+        if not self.tokens or self.first_token_ms is None or self.last_token_ms is None:
+            return None
+        span = (self.last_token_ms - self.first_token_ms) / 1000.0
+        return (self.tokens - 1) / span if span > 0 and self.tokens > 1 else None
+
+    def as_dict(self) -> dict:
+        def r(v):
+            return None if v is None else round(v, 1)
+        return {
+            "model": self.model,
+            "cached": self.cached,
+            "complete": self.complete,
+            "headers_ms": r(self.headers_ms),
+            "first_byte_ms": r(self.first_byte_ms),
+            "first_token_ms": r(self.first_token_ms),
+            "first_sentence_ms": r(self.first_sentence_ms),
+            "last_token_ms": r(self.last_token_ms),
+            "tokens": self.tokens,
+            "tokens_per_sec": r(self.tokens_per_sec),
+        }
 
 
 class LLMClient:
-    def __init__(self, model: str | None = None, temperature: float = 0.4, max_tokens: int = 180):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    def __init__(self, model: str | None = None, temperature: float = 0.4, max_tokens: int = 180,
+                 client=None, cache: LLMResponseCache | None = None):
+        self.client = client or get_groq_client()
         self.model = model or os.getenv("GROQ_LLM_MODEL", "penai/gpt-oss-20b")
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.last_usage = None
+        self.cache = cache if cache is not None else llm_cache_from_env()
         seed_str = os.getenv("SEED", "")
         try:
             self.seed = int(seed_str) if seed_str.strip() != "" else None
         except Exception:
             self.seed = None
 
-    def stream_chat(self, messages: list) -> Tuple[Generator[str, None, None], float]:
-        t0 = time.perf_counter()
+    def _cache_key(self, messages: list, use_cache: bool):
+        if not use_cache or self.cache is None:
+            return None
+        return LLMResponseCache.make_key(self.model, self.temperature, self.seed, self.max_tokens, messages)
+
+    def stream_chat(self, messages: list, use_cache: bool = True,
+                    record: LLMRequestRecord | None = None) -> Tuple[Generator[str, None, None], LLMRequestRecord]:
+        """Start a streaming request; the returned record fills in as the generator is consumed."""
+        record = record or LLMRequestRecord()
+        record.model = self.model
+        record.t_sent = time.perf_counter()
+        key = self._cache_key(messages, use_cache)
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            record.cached = True
+            record.headers_ms = record.elapsed_ms()
+            # No API call was made, so there is no usage to report for this turn
+            self.last_usage = None
+
+            def replay():
+                # Replayed as a token generator so sentence splitting and TTS are unchanged
+                for tok in cached:
+                    record.on_chunk(tok)
+                    yield tok
+                record.finish()
+            return replay(), record
         stream = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
@@ -30,23 +130,44 @@ class LLMClient:
             seed=self.seed,
             stream=True,
         )
-        first_latency = None
+        # create() returns once response headers arrive; the body is still pending
+        record.headers_ms = record.elapsed_ms()
 
         def gen():
-            nonlocal first_latency
-            for chunk in stream:
-                try:
-                    delta = chunk.choices[0].delta.content or ""
-                except Exception:
-                    delta = ""
-                if delta and first_latency is None:
-                    first_latency = (time.perf_counter() - t0) * 1000
-                if delta:
-                    yield delta
-        return gen(), (first_latency or (time.perf_counter() - t0) * 1000)
-
-    def complete(self, messages: list) -> Tuple[str, float, dict | None]:
+            pieces = []
+            usage = None
+            try:
+                for chunk in stream:
+                    # Groq reports usage on the final chunk under x_groq
+                    usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+                    if usage is not None:
+                        self.last_usage = usage
+                    try:
+                        delta = chunk.choices[0].delta.content or ""
+                    except Exception:
+                        delta = ""
+                    record.on_chunk(delta)
+                    if delta:
+                        pieces.append(delta)
+                        yield delta
+                record.finish(usage)
+                # Only replies that streamed to completion are cached
+                if key and pieces:
+                    self.cache.put(key, pieces)
+            finally:
+                # Abandoning the generator (e.g. a cancelled speculation) closes the HTTP stream
+                close = getattr(stream, "close", None)
+                if close:
+                    close()
+        return gen(), record
+
+    def complete(self, messages: list, use_cache: bool = True) -> Tuple[str, float, dict | None]:
         t0 = time.perf_counter()
+        key = self._cache_key(messages, use_cache)
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            self.last_usage = None
+            return "".join(cached), (time.perf_counter() - t0) * 1000, None
         resp = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
@@ -58,4 +179,7 @@ class LLMClient:
         latency_ms = (time.perf_counter() - t0) * 1000
         txt = resp.choices[0].message.content
         usage = getattr(resp, "usage", None)
+        self.last_usage = usage
+        if key and txt:
+            self.cache.put(key, [txt])
         return txt, latency_ms, usage
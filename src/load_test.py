@@ -0,0 +1,361 @@
+"""
+Load generator for the voice session server.
+
+Simulated callers (session_server.simulate_caller) arrive as a Poisson
+process whose rate is ramped step by step. By default the server runs in
+a child process (so callers and server do not share a GIL), with mocked
+Groq backends and a CPU-bound stub (or the real Kokoro model). For every
+step the tool records
+throughput, client-side first-audio tail latency, thread counts, RSS, CPU
+per stage and event-loop lag. Together these show where CPU, Kokoro and the
+GIL cap the number of sessions per core.
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .mock_backends import DEFAULT_REPLY, MockChatCompletions, MockGroqClient, MockTranscriptions
+
+OUT_RATE = 24000
+
+
+class StageCPU:
+    """Thread CPU seconds spent inside instrumented calls, per stage."""
+
+    def __init__(self):
+        self.cpu: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, secs: float):
+        with self._lock:
+            self.cpu[stage] = self.cpu.get(stage, 0.0) + secs
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.cpu)
+
+    def timed(self, stage: str, fn):
+        def wrapper(*args, **kwargs):
+            t0 = time.thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.thread_time() - t0)
+        return wrapper
+
+    def timed_stream(self, stage: str, fn):
+        """Wrap stream_chat so CPU spent pulling tokens is charged to the stage too."""
+        def wrapper(*args, **kwargs):
+            t0 = time.thread_time()
+            gen, record = fn(*args, **kwargs)
+            self.add(stage, time.thread_time() - t0)
+
+            def pull():
+                it = iter(gen)
+                try:
+                    while True:
+                        t = time.thread_time()
+                        try:
+                            tok = next(it)
+                        except StopIteration:
+                            return
+                        finally:
+                            self.add(stage, time.thread_time() - t)
+                        yield tok
+                finally:
+                    close = getattr(gen, "close", None)
+                    if close:
+                        close()
+            return pull(), record
+        return wrapper
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        # Peak rather than current RSS where /proc is unavailable (kB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _os_threads() -> Optional[int]:
+    try:
+        return len(os.listdir("/proc/self/task"))
+    except OSError:
+        return None
+
+
+def _children_cpu() -> float:
+    """CPU seconds of live child processes (the TTS process pool), from /proc."""
+    total = 0.0
+    ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+    for child in multiprocessing.active_children():
+        try:
+            with open(f"/proc/{child.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            total += (int(fields[11]) + int(fields[12])) / ticks
+        except (OSError, IndexError, ValueError):
+            pass
+    return total
+
+
+class _LoopProbe:
+    """Runs inside the server loop: measures its thread's CPU and scheduling lag."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.cpu = 0.0
+        self.lags: List[float] = []
+        self._lock = threading.Lock()
+
+    async def run(self):
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - t0 - self.interval
+            with self._lock:
+                self.lags.append(lag * 1000)
+                self.cpu = time.thread_time()
+
+    def take(self):
+        with self._lock:
+            lags, self.lags = self.lags, []
+            return self.cpu, lags
+
+
+def start_mock_server(cpu: StageCPU, tts_workers: int = 1, asr_ms: float = 250.0, ttft_ms: float = 300.0,
+                      tokens_per_sec: float = 150.0, tts_rtf: float = 0.3, real_tts: bool = False):
+    """Start VoiceSessionServer on an ephemeral port in a background thread with instrumented backends."""
+    from .asr_module import ASRClient
+    from .llm_module import LLMClient
+    from .replay_bench import DEFAULT_SCRIPT, stub_tts_client
+    from .session_server import IN_RATE, SharedResources, VoiceSessionServer
+
+    groq = MockGroqClient(
+        transcriptions=MockTranscriptions(DEFAULT_SCRIPT, latency_ms=asr_ms),
+        chat=MockChatCompletions(default_reply=DEFAULT_REPLY, ttft_ms=ttft_ms, tokens_per_sec=tokens_per_sec),
+    )
+    if real_tts:
+        from .tts_module import KokoroTTSClient
+        tts = KokoroTTSClient()
+    else:
+        tts = stub_tts_client(rtf=tts_rtf, busy=True)
+    shared = SharedResources(asr=ASRClient(sample_rate=IN_RATE, incremental=False, client=groq),
+                             llm=LLMClient(client=groq), tts=tts)
+    shared.asr.transcribe_wav_bytes = cpu.timed("asr", shared.asr.transcribe_wav_bytes)
+    shared.llm.stream_chat = cpu.timed_stream("llm", shared.llm.stream_chat)
+    if shared.tts_service is None:
+        shared.tts.synthesize_pcm = cpu.timed("tts", shared.tts.synthesize_pcm)
+
+    server = VoiceSessionServer(port=0, tts_workers=tts_workers, max_sessions=10_000, shared=shared)
+    probe = _LoopProbe()
+
+    async def main():
+        asyncio.create_task(probe.run())
+        await server.serve_forever()
+
+    threading.Thread(target=lambda: asyncio.run(main()), name="server-loop", daemon=True).start()
+    if not server.listening.wait(30):
+        raise RuntimeError("server did not start")
+    return server, probe
+
+
+def server_metrics(cpu: StageCPU, probe: _LoopProbe) -> dict:
+    """Cumulative resource counters of the server process, plus loop lags since the last call."""
+    loop_cpu, lags = probe.take()
+    return {"proc_cpu": time.process_time(), "child_cpu": _children_cpu(), "stage": cpu.snapshot(),
+            "loop_cpu": loop_cpu, "lags": lags, "rss_mb": _rss_mb(),
+            "py_threads": threading.active_count(), "os_threads": _os_threads()}
+
+
+def _server_process(conn, kwargs: dict):
+    cpu = StageCPU()
+    server, probe = start_mock_server(cpu, **kwargs)
+    conn.send((server.host, server.port))
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        if msg != "metrics":
+            return
+        conn.send(server_metrics(cpu, probe))
+
+
+class MockServerProcess:
+    """start_mock_server in a child process; metrics() fetches its counters over a pipe."""
+
+    def __init__(self, start_timeout: float = 120.0, **kwargs):
+        ctx = multiprocessing.get_context("spawn")
+        self._conn, child = ctx.Pipe()
+        # Not a daemon: the server may start its own TTS worker processes
+        self._proc = ctx.Process(target=_server_process, args=(child, kwargs), name="load-server")
+        self._proc.start()
+        if not self._conn.poll(start_timeout):
+            self.close()
+            raise RuntimeError("server did not start")
+        self.host, self.port = self._conn.recv()
+
+    def metrics(self) -> dict:
+        self._conn.send("metrics")
+        return self._conn.recv()
+
+    def close(self):
+        try:
+            self._conn.send("stop")
+        except (OSError, ValueError):
+            pass
+        self._proc.join(5)
+        if self._proc.is_alive():
+            self._proc.terminate()
+            self._proc.join(5)
+
+
+def _pct(values, ps=(50, 90, 99)) -> dict:
+    if not len(values):
+        return {f"p{p}": None for p in ps}
+    return {f"p{p}": round(float(v), 1) for p, v in zip(ps, np.percentile(values, ps))}
+
+
+async def run_load(host: str, port: int, persona: str, utterances: List[bytes], rates: List[float],
+                   step_secs: float = 30.0, server: Optional[MockServerProcess] = None,
+                   seed: int = 0, drain_secs: float = 120.0) -> dict:
+    """Ramp caller arrivals through `rates` (callers/second), one step_secs window per rate.
+
+    Server-side CPU, RSS, threads and loop lag are only known for a server
+    started with MockServerProcess; against --target they are reported as None.
+    """
+    from .session_server import simulate_caller
+
+    rng = random.Random(seed)
+    done_turns: List[tuple] = []  # (finish time, step, turn result)
+    errors: List[tuple] = []
+    active = [0, 0]  # current, peak in step
+    tasks = []
+
+    async def caller(step: int):
+        active[0] += 1
+        active[1] = max(active[1], active[0])
+        try:
+            for t in await simulate_caller(host, port, persona, utterances):
+                done_turns.append((time.perf_counter(), step, t))
+        except Exception as e:
+            errors.append((step, repr(e)))
+        finally:
+            active[0] -= 1
+
+    steps = []
+    for i, rate in enumerate(rates):
+        m0 = await asyncio.to_thread(server.metrics) if server else None
+        t_start = time.perf_counter()
+        wall0, client0 = t_start, time.process_time()
+        started, active[1] = 0, active[0]
+        next_arrival = t_start + rng.expovariate(rate) if rate > 0 else float("inf")
+        while (now := time.perf_counter()) < t_start + step_secs:
+            if now >= next_arrival:
+                tasks.append(asyncio.create_task(caller(i)))
+                started += 1
+                next_arrival += rng.expovariate(rate)
+                continue
+            await asyncio.sleep(min(0.05, max(0.0, next_arrival - now)))
+        wall = time.perf_counter() - wall0
+        client_cpu = time.process_time() - client0
+        m1 = await asyncio.to_thread(server.metrics) if server else None
+        finished = [t for (ft, _, t) in done_turns if t_start <= ft < t_start + wall]
+        first_audio = [t["client_first_audio_ms"] for t in finished if t.get("client_first_audio_ms") is not None]
+        audio_secs = sum(t.get("audio_bytes", 0) for t in finished) / 2 / OUT_RATE
+        step = {
+            "rate_per_s": rate,
+            "callers_started": started,
+            "peak_active_sessions": active[1],
+            "turns_done": len(finished),
+            "throughput_turns_per_s": round(len(finished) / wall, 3),
+            "first_audio_ms": _pct(first_audio),
+            "errors": sum(1 for s, _ in errors if s == i),
+            "client_cpu_cores": round(client_cpu / wall, 2),
+            "rss_mb": None,
+            "py_threads": None,
+            "os_threads": None,
+            "cpu_cores_used": None,
+            "cpu_s": {},
+            "loop_lag_ms": _pct([]),
+            "audio_secs_out": round(audio_secs, 1),
+        }
+        if m1 is not None:
+            proc_cpu = m1["proc_cpu"] - m0["proc_cpu"]
+            child_cpu = m1["child_cpu"] - m0["child_cpu"]
+            stage = {k: v - m0["stage"].get(k, 0.0) for k, v in m1["stage"].items()}
+            step.update({
+                "rss_mb": round(m1["rss_mb"], 1),
+                "py_threads": m1["py_threads"],
+                "os_threads": m1["os_threads"],
+                "cpu_cores_used": round((proc_cpu + child_cpu) / wall, 2),
+                "cpu_s": {**{k: round(v, 2) for k, v in stage.items()},
+                          "event_loop": round(m1["loop_cpu"] - m0["loop_cpu"], 2),
+                          "tts_processes": round(child_cpu, 2), "process_total": round(proc_cpu, 2)},
+                "loop_lag_ms": _pct(m1["lags"]),
+            })
+        steps.append(step)
+    # Let callers that arrived in the last step finish, without counting them in its window
+    if tasks:
+        await asyncio.wait(tasks, timeout=drain_secs)
+    return {"steps": steps, "analysis": analyse(steps), "errors": [e for _, e in errors[:20]]}
+
+
+def analyse(steps: List[dict]) -> dict:
+    """Estimate sessions per core and where latency first degrades."""
+    cores = os.cpu_count() or 1
+    base = next((s["first_audio_ms"]["p90"] for s in steps if s["first_audio_ms"]["p90"] is not None), None)
+    knee = next((s["rate_per_s"] for s in steps if base and s["first_audio_ms"]["p90"] is not None
+                 and (s["first_audio_ms"]["p90"] > 2 * base or s["errors"])), None)
+    if not steps or not all(s["cpu_s"] for s in steps):
+        # Only client-side numbers against an external server
+        return {"cores_available": cores, "p90_first_audio_knee_rate": knee}
+    tts_cpu = sum(s["cpu_s"].get("tts", 0.0) + s["cpu_s"].get("tts_processes", 0.0) for s in steps)
+    total_cpu = sum(s["cpu_s"]["process_total"] + s["cpu_s"]["tts_processes"] for s in steps)
+    audio = sum(s["audio_secs_out"] for s in steps)
+    peak_cores = max((s["cpu_cores_used"] for s in steps), default=0.0)
+    out = {
+        "cores_available": cores,
+        "tts_cpu_share": round(tts_cpu / total_cpu, 3) if total_cpu else None,
+        # Seconds of reply audio one core can synthesise per second, i.e. sessions
+        # that can be speaking at once per core if TTS were the only cost
+        "speaking_sessions_per_core_tts": round(audio / tts_cpu, 2) if tts_cpu else None,
+        "speaking_sessions_per_core_all": round(audio / total_cpu, 2) if total_cpu else None,
+        "peak_cpu_cores_used": peak_cores,
+        "p90_first_audio_knee_rate": knee,
+    }
+    # In-process TTS that never gets past ~1 core while latency climbs is GIL-bound
+    out["gil_bound"] = bool(knee is not None and peak_cores < 1.3 and cores > 1 and
+                            not any(s["cpu_s"]["tts_processes"] for s in steps))
+    return out
+
+
+def format_report(result: dict) -> str:
+    head = (f"{'rate/s':>7}{'started':>8}{'active':>7}{'turns/s':>8}{'fa p50':>8}{'fa p90':>8}{'fa p99':>8}"
+            f"{'err':>5}{'rss MB':>8}{'thr':>5}{'cores':>6}{'asr s':>7}{'llm s':>7}{'tts s':>7}{'loop s':>7}{'lag p99':>8}")
+    lines = [head, "-" * len(head)]
+    for s in result["steps"]:
+        fa, c = s["first_audio_ms"], s["cpu_s"]
+        tts = round(c.get("tts", 0) + c["tts_processes"], 2) if c else None
+        lines.append(
+            f"{s['rate_per_s']:>7}{s['callers_started']:>8}{s['peak_active_sessions']:>7}"
+            f"{s['throughput_turns_per_s']:>8}{str(fa['p50']):>8}{str(fa['p90']):>8}{str(fa['p99']):>8}"
+            f"{s['errors']:>5}{str(s['rss_mb']):>8}{str(s['os_threads'] or s['py_threads']):>5}"
+            f"{str(s['cpu_cores_used']):>6}{str(c.get('asr')):>7}{str(c.get('llm')):>7}{str(tts):>7}"
+            f"{str(c.get('event_loop')):>7}{str(s['loop_lag_ms']['p99']):>8}")
+    lines.append("")
+    lines.extend(f"{k}: {v}" for k, v in result["analysis"].items())
+    return "\n".join(lines)
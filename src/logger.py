@@ -1,5 +1,8 @@
+import atexit
 import csv
 import os
+import queue
+import threading
 import time
 from loguru import logger
 
@@ -9,31 +12,189 @@ def init_logger():
     logger.add(lambda msg: print(msg, end=""))
 
 
+COLUMNS = [
+    "ts","turn","persona","asr_ms","llm_ms","tts_ms","total_ms",
+    "input_chars","output_chars","llm_tokens_in","llm_tokens_out",
+    "asr_secs","tts_chars","cost_est_usd","error",
+    "llm_first_byte_ms","llm_ttft_ms","llm_first_sentence_ms","llm_last_token_ms",
+    "llm_stream_tokens","llm_tokens_per_sec","llm_cached","first_audio_ms",
+]
+
+
+# Column types for the columnar sink; everything else is float64
+_INT_COLUMNS = {"ts", "turn", "input_chars", "output_chars", "llm_tokens_in", "llm_tokens_out",
+                "tts_chars", "llm_stream_tokens", "llm_cached"}
+_STR_COLUMNS = {"persona", "error"}
+_STOP = object()
+
+
+def _ms(v):
+    return None if v is None else round(v, 1)
+
+
+class _ParquetSink:
+    """Appends batches as row groups to one Parquet file per log segment."""
+
+    def __init__(self, directory: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa, self.pq = pa, pq
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.schema = pa.schema([
+            (c, pa.int64() if c in _INT_COLUMNS else pa.string() if c in _STR_COLUMNS else pa.float64())
+            for c in COLUMNS
+        ])
+        self._writer = None
+
+    def write(self, rows: list):
+        if self._writer is None:
+            path = os.path.join(self.directory, f"latency_{int(time.time() * 1000)}.parquet")
+            self._writer = self.pq.ParquetWriter(path, self.schema)
+        columns = list(zip(*rows))
+        self._writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(col, type=self.schema.field(i).type) for i, col in enumerate(columns)],
+            schema=self.schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
 class LatencyLogger:
-    def __init__(self, path: str):
+    """Turn metrics logger that never blocks the caller on file I/O.
+
+    log_turn() only formats a row and drops it on a bounded queue; a writer
+    thread appends rows in batches. The CSV is rotated by size and/or age,
+    and batches can also go to a Parquet sink (requires pyarrow). When the
+    queue is full rows are dropped and counted rather than stalling a turn.
+    """
+
+    def __init__(self, path: str, queue_size: int = 1024, batch_size: int = 64,
+                 flush_interval_s: float = 1.0, max_bytes: int | None = None,
+                 rotate_interval_s: float | None = None, parquet_dir: str | None = None):
         self.path = path
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_bytes = max_bytes
+        self.rotate_interval_s = rotate_interval_s
+        self.dropped = 0
+        self.written = 0
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
         self._ensure_header()
+        self._opened_at = time.time()
+        self._parquet = None
+        if parquet_dir:
+            try:
+                self._parquet = _ParquetSink(parquet_dir)
+            except ImportError:
+                logger.warning("pyarrow not installed; Parquet latency sink disabled")
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="latency-logger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls, path: str) -> "LatencyLogger":
+        max_mb = float(os.getenv("LATENCY_LOG_MAX_MB", "0") or 0)
+        rotate_h = float(os.getenv("LATENCY_LOG_ROTATE_HOURS", "0") or 0)
+        return cls(path,
+                   max_bytes=int(max_mb * 1024 * 1024) or None,
+                   rotate_interval_s=rotate_h * 3600 or None,
+                   parquet_dir=os.getenv("LATENCY_LOG_PARQUET_DIR", "").strip() or None)
 
     def _ensure_header(self):
-        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
-            with open(self.path, "w", newline="") as f:
-                w = csv.writer(f)
-                w.writerow([
-                    "ts","turn","persona","asr_ms","llm_ms","tts_ms","total_ms",
-                    "input_chars","output_chars","llm_tokens_in","llm_tokens_out",
-                    "asr_secs","tts_chars","cost_est_usd","error"
-                ])
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, newline="") as f:
+                header = next(csv.reader(f), [])
+            if header == COLUMNS:
+                return
+            # Older schema: keep it aside rather than appending mismatched rows
+            self._rotate()
+        with open(self.path, "w", newline="") as f:
+            csv.writer(f).writerow(COLUMNS)
+
+    def _rotate(self):
+        root, ext = os.path.splitext(self.path)
+        os.replace(self.path, f"{root}.{int(time.time() * 1000)}{ext}")
+
+    def _maybe_rotate(self):
+        too_big = self.max_bytes and os.path.getsize(self.path) >= self.max_bytes
+        too_old = self.rotate_interval_s and time.time() - self._opened_at >= self.rotate_interval_s
+        if too_big or too_old:
+            self._rotate()
+            self._ensure_header()
+            self._opened_at = time.time()
+            if self._parquet is not None:
+                self._parquet.close()
+
+    def _flush(self, rows: list):
+        try:
+            self._maybe_rotate()
+            with open(self.path, "a", newline="") as f:
+                csv.writer(f).writerows(rows)
+            if self._parquet is not None:
+                self._parquet.write(rows)
+            self.written += len(rows)
+        except Exception as e:
+            logger.error(f"Latency log write failed: {e}")
+
+    def _run(self):
+        rows = []
+        deadline = time.monotonic() + self.flush_interval_s
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            # A threading.Event is a flush() request, acknowledged once rows are written
+            urgent = item is _STOP or isinstance(item, threading.Event)
+            if isinstance(item, list):
+                rows.append(item)
+            if rows and (urgent or len(rows) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(rows)
+                rows = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval_s
+            if isinstance(item, threading.Event):
+                item.set()
+            if item is _STOP:
+                return
 
     def log_turn(self, turn: int, persona: str, asr_ms: float, llm_ms: float, tts_ms: float,
                  total_ms: float, input_chars: int, output_chars: int,
                  llm_tokens_in: int | None, llm_tokens_out: int | None,
                  asr_secs: float, tts_chars: int, cost_est_usd: float | None,
-                 error: str | None):
-        with open(self.path, "a", newline="") as f:
-            w = csv.writer(f)
-            w.writerow([
-                int(time.time()*1000), turn, persona, round(asr_ms,1), round(llm_ms,1), round(tts_ms,1), round(total_ms,1),
-                input_chars, output_chars, llm_tokens_in or "", llm_tokens_out or "",
-                round(asr_secs,2), tts_chars, (None if cost_est_usd is None else round(cost_est_usd,6)), error or ""
-            ])
+                 error: str | None, llm=None, first_audio_ms: float | None = None):
+        """`llm` is the LLMRequestRecord of the turn's streaming request, if any.
+
+        total_ms is wall time from end of user speech to end of the reply and
+        first_audio_ms is end of speech to the first audible reply sample.
+        """
+        row = [
+            int(time.time()*1000), turn, persona, round(asr_ms,1), round(llm_ms,1), round(tts_ms,1), round(total_ms,1),
+            input_chars, output_chars, llm_tokens_in or None, llm_tokens_out or None,
+            round(asr_secs,2), tts_chars, (None if cost_est_usd is None else round(cost_est_usd,6)), error or "",
+        ] + ([
+            _ms(llm.first_byte_ms), _ms(llm.first_token_ms), _ms(llm.first_sentence_ms), _ms(llm.last_token_ms),
+            llm.tokens, _ms(llm.tokens_per_sec), int(llm.cached),
+        ] if llm is not None else [None] * 7) + [_ms(first_audio_ms)]
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until every row logged so far has been written."""
+        if self._thread.is_alive():
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self._parquet is not None:
+            self._parquet.close()
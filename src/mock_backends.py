@@ -0,0 +1,278 @@
+"""
+Local stand-ins for the Groq endpoints used by ASRClient and LLMClient.
+They mimic the SDK call shapes so they can be passed as ``client=`` and
+count calls and bytes so latency features can be measured offline.
+"""
+import io
+import json
+import re
+import threading
+import time
+import wave
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+DEFAULT_REPLY = ("I understand how stressful that can be. Let me help you right away. "
+                 "Can you confirm the last 4 digits of your card number for security?")
+
+
+class MockTranscriptions:
+    """Returns the words of a fixed script that fall inside the uploaded clip.
+
+    Words are spoken at words_per_sec from the start of the utterance. A clip
+    uploaded inside ``with clip_offset(n)`` on the same thread starts n samples
+    into the utterance (mock_asr_client sets this for incremental windows);
+    any other clip starts at 0.
+    """
+
+    def __init__(self, script: str, words_per_sec: float = 2.5, latency_ms: float = 0.0,
+                 ms_per_audio_sec: float = 0.0):
+        self.words = script.split()
+        self.words_per_sec = words_per_sec
+        self.latency_ms = latency_ms
+        self.ms_per_audio_sec = ms_per_audio_sec
+        self.calls = 0
+        self.bytes_uploaded = 0
+        self._lock = threading.Lock()
+        # Per thread, since partial windows upload from ASRClient's worker thread
+        self._offset = threading.local()
+
+    @contextmanager
+    def clip_offset(self, samples: int):
+        """Treat clips uploaded from this thread as starting samples into the utterance."""
+        self._offset.samples = samples
+        try:
+            yield
+        finally:
+            self._offset.samples = 0
+
+    def create(self, model: str, file, response_format: str | None = None, **kwargs):
+        data = file.read()
+        with self._lock:
+            self.calls += 1
+            self.bytes_uploaded += len(data)
+        with wave.open(io.BytesIO(data), "rb") as wf:
+            rate = float(wf.getframerate())
+            duration = wf.getnframes() / rate
+        offset = getattr(self._offset, "samples", 0) / rate
+        time.sleep((self.latency_ms + self.ms_per_audio_sec * duration) / 1000.0)
+
+        first = min(len(self.words), int(offset * self.words_per_sec))
+        last = min(len(self.words), int((offset + duration) * self.words_per_sec))
+        words = self.words[first:last]
+        text = " ".join(words)
+        if response_format != "verbose_json":
+            return SimpleNamespace(text=text)
+        # One segment per six words, timed relative to the start of the clip
+        segments = []
+        per_word = 1.0 / self.words_per_sec
+        for i in range(0, len(words), 6):
+            chunk = words[i:i + 6]
+            start = (first + i) * per_word - offset
+            end = min(duration, (first + i + len(chunk)) * per_word - offset)
+            segments.append({"start": max(0.0, start), "end": end, "text": " ".join(chunk)})
+        return SimpleNamespace(text=text, segments=segments)
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.bytes_uploaded = 0
+
+
+class _MockStream:
+    def __init__(self, pieces, ttft_ms: float, token_interval_s: float):
+        self._pieces = pieces
+        self._ttft_ms = ttft_ms
+        self._interval = token_interval_s
+        self._closed = False
+
+    def __iter__(self):
+        time.sleep(self._ttft_ms / 1000.0)
+        for i, piece in enumerate(self._pieces):
+            if self._closed:
+                return
+            if i and self._interval:
+                time.sleep(self._interval)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    def close(self):
+        self._closed = True
+
+
+class MockChatCompletions:
+    """Deterministic chat endpoint with configurable time-to-first-token and token rate."""
+
+    def __init__(self, replies: dict | None = None, default_reply: str = DEFAULT_REPLY,
+                 ttft_ms: float = 0.0, tokens_per_sec: float = 0.0):
+        # replies maps a lowercase keyword in the last user message to a reply
+        self.replies = replies or {}
+        self.default_reply = default_reply
+        self.ttft_ms = ttft_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def reply_for(self, messages: list) -> str:
+        user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        for keyword, reply in self.replies.items():
+            if keyword in user.lower():
+                return reply
+        return self.default_reply
+
+    @staticmethod
+    def tokenize(text: str) -> list:
+        return re.findall(r"\S+\s*", text)
+
+    def create(self, model: str, messages: list, stream: bool = False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        text = self.reply_for(messages)
+        pieces = self.tokenize(text)
+        if stream:
+            interval = 1.0 / self.tokens_per_sec if self.tokens_per_sec else 0.0
+            return _MockStream(pieces, self.ttft_ms, interval)
+        time.sleep((self.ttft_ms + (len(pieces) / self.tokens_per_sec * 1000 if self.tokens_per_sec else 0)) / 1000.0)
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(pieces),
+                                total_tokens=prompt_tokens + len(pieces))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=usage)
+
+
+class MockGroqClient:
+    """Drop-in for ``Groq(...)`` exposing only the endpoints this repo calls."""
+
+    def __init__(self, transcriptions: MockTranscriptions | None = None,
+                 chat: MockChatCompletions | None = None):
+        self.audio = SimpleNamespace(transcriptions=transcriptions or MockTranscriptions(""))
+        self.chat = SimpleNamespace(completions=chat or MockChatCompletions())
+
+
+def mock_asr_client(groq: MockGroqClient, **kwargs):
+    """ASRClient on a MockGroqClient whose incremental windows tell the mock where they start."""
+    # Imported here: asr_module needs PortAudio, which the rest of this module does not
+    from .asr_module import ASRClient
+
+    transcriptions = groq.audio.transcriptions
+
+    class _WindowedASRClient(ASRClient):
+        def transcribe_window(self, wav_bytes, start: int):
+            with transcriptions.clip_offset(start):
+                return super().transcribe_window(wav_bytes, start)
+
+    return _WindowedASRClient(client=groq, **kwargs)
+
+
+def _multipart_file(body: bytes, content_type: str) -> bytes:
+    boundary = content_type.split("boundary=", 1)[1].strip('"').encode()
+    for part in body.split(b"--" + boundary):
+        head, _, data = part.partition(b"\r\n\r\n")
+        if b'name="file"' in head:
+            return data.rsplit(b"\r\n", 1)[0]
+    return b""
+
+
+class MockGroqServer:
+    """Local HTTP server speaking the Groq transcription and chat routes.
+
+    Point clients at it with GROQ_BASE_URL=server.base_url. ``connections``
+    counts TCP connections accepted, so connection reuse can be checked per turn.
+    """
+
+    def __init__(self, client: MockGroqClient | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.client = client or MockGroqClient()
+        self.connections = 0
+        self.requests = 0
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with mock._lock:
+                    mock.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_POST(self):
+                with mock._lock:
+                    mock.requests += 1
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.endswith("/audio/transcriptions"):
+                    wav = _multipart_file(body, self.headers.get("Content-Type", ""))
+                    fmt = b"verbose_json" if b"verbose_json" in body else None
+                    resp = mock.client.audio.transcriptions.create(
+                        model="mock", file=io.BytesIO(wav), response_format=fmt and fmt.decode())
+                    self._send_json(vars(resp))
+                elif self.path.endswith("/chat/completions"):
+                    req = json.loads(body or b"{}")
+                    chat = mock.client.chat.completions
+                    if req.get("stream"):
+                        self._send_stream(chat, req)
+                    else:
+                        resp = chat.create(model=req.get("model", "mock"), messages=req.get("messages", []))
+                        self._send_json({
+                            "id": "mock", "object": "chat.completion", "created": int(time.time()),
+                            "model": req.get("model", "mock"),
+                            "choices": [{"index": 0, "finish_reason": "stop",
+                                         "message": {"role": "assistant", "content": resp.choices[0].message.content}}],
+                            "usage": vars(resp.usage),
+                        })
+                else:
+                    self.send_error(404)
+
+            def _send_json(self, obj):
+                data = json.dumps(obj).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, chat, req):
+                # Build all events up front so Content-Length keeps the connection reusable,
+                # then write them with the configured token pacing
+                pieces = chat.tokenize(chat.reply_for(req.get("messages", [])))
+                events = []
+                for piece in pieces:
+                    chunk = {"id": "mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": req.get("model", "mock"),
+                             "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                    events.append(f"data: {json.dumps(chunk)}\n\n".encode())
+                events.append(b"data: [DONE]\n\n")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Content-Length", str(sum(len(e) for e in events)))
+                self.end_headers()
+                time.sleep(chat.ttft_ms / 1000.0)
+                interval = 1.0 / chat.tokens_per_sec if chat.tokens_per_sec else 0.0
+                for i, event in enumerate(events):
+                    if i and interval:
+                        time.sleep(interval)
+                    self.wfile.write(event)
+                    self.wfile.flush()
+
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-groq", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockGroqServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,89 @@
+"""
+Byte-stable prompt assembly so provider-side prefix caching can hit.
+
+A persona's system message is canonicalised once and the same message
+object is reused for every request, so its bytes never drift between
+turns. The SDK still serialises the request body itself; this module only
+keeps the prefix stable and reports how much of each request repeats the
+previous one.
+"""
+import hashlib
+import threading
+from typing import Dict, List, Tuple
+
+from .state_manager import ConversationState, approx_tokens
+
+
+def canonical_prompt(text: str) -> str:
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+class PromptPrefix:
+    def __init__(self, system_prompt: str):
+        self.text = canonical_prompt(system_prompt)
+        self.message = {"role": "system", "content": self.text}
+        self.digest = hashlib.sha256(self.text.encode("utf-8")).hexdigest()[:16]
+        self.tokens = approx_tokens(self.text)
+
+
+_prefixes: Dict[str, PromptPrefix] = {}
+_prefix_lock = threading.Lock()
+
+
+def get_prefix(system_prompt: str) -> PromptPrefix:
+    with _prefix_lock:
+        prefix = _prefixes.get(system_prompt)
+        if prefix is None:
+            prefix = _prefixes[system_prompt] = PromptPrefix(system_prompt)
+        return prefix
+
+
+class PromptAssembler:
+    """Builds request messages for one session and tracks the reusable prefix."""
+
+    def __init__(self, system_prompt: str):
+        self.prefix = get_prefix(system_prompt)
+        self._last: List[Tuple[str, str]] = []
+
+    def build(self, state: ConversationState, extra: List[Dict[str, str]] | None = None):
+        """Return (messages, info) where info describes prefix reuse against the last request."""
+        messages = state.as_messages(self.prefix.text) + (extra or [])
+        # Reuse the canonical system message object
+        messages[0] = self.prefix.message
+        current = [(m["role"], m["content"]) for m in messages]
+
+        reused = 0
+        for prev, cur in zip(self._last, current):
+            if prev != cur:
+                break
+            reused += 1
+        self._last = current
+        reused_tokens = sum(approx_tokens(m["content"]) for m in messages[:reused])
+        total_tokens = sum(approx_tokens(m["content"]) for m in messages)
+        return messages, {
+            "prefix_digest": self.prefix.digest,
+            "reused_messages": reused,
+            "reused_tokens": reused_tokens,
+            "new_tokens": total_tokens - reused_tokens,
+            "total_tokens": total_tokens,
+        }
+
+
+def cache_usage(usage) -> dict | None:
+    """Pull prompt-cache counters out of an API usage object when the provider reports them."""
+    if usage is None:
+        return None
+
+    def get(obj, name):
+        return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+    details = get(usage, "prompt_tokens_details")
+    cached = get(details, "cached_tokens") if details is not None else None
+    if cached is None:
+        cached = get(usage, "prompt_cache_hit_tokens")
+    return {
+        "prompt_tokens": get(usage, "prompt_tokens"),
+        "completion_tokens": get(usage, "completion_tokens"),
+        "cached_tokens": cached,
+    }
@@ -0,0 +1,353 @@
+"""
+Offline replay benchmark for VoiceClient.
+
+Recorded (or synthetic) utterances are fed through a fake sounddevice
+InputStream, Groq is replaced by the deterministic mocks in mock_backends,
+and Kokoro by a stub with a configurable real-time factor (or the real model
+with --real-tts). Playback goes to a fake OutputStream that drains at device
+pace, so the whole pipeline runs headless with no audio device or network.
+"""
+import contextlib
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import types
+import wave
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .mock_backends import DEFAULT_REPLY, MockChatCompletions, MockGroqClient, MockTranscriptions, mock_asr_client
+
+MIC_RATE = 16000
+DEFAULT_SCRIPT = ("Hi I just noticed my card is missing and I think I lost it yesterday "
+                  "at the grocery store can you please block it right away")
+METRICS = ["asr_ms", "llm_ttft_ms", "llm_ms", "tts_ms", "first_audio_ms", "total_ms"]
+
+
+def load_wav_int16(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != MIC_RATE:
+            raise ValueError(f"{path}: expected 16 kHz mono int16 WAV")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def synth_utterance(seconds: float = 2.5, f0: float = 120.0, seed: int = 0) -> np.ndarray:
+    """Voiced, syllable-modulated harmonic signal that webrtcvad classifies as speech."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * MIC_RATE)) / MIC_RATE
+    pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / MIC_RATE
+    # Harmonics weighted towards typical vowel formants (~500 Hz and ~1500 Hz)
+    sig = sum(np.sin(k * phase) * (np.exp(-((k * f0 - 500) / 300) ** 2) + 0.5 * np.exp(-((k * f0 - 1500) / 400) ** 2) + 0.05)
+              for k in range(1, 30))
+    envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4.0 * t) ** 2
+    sig = sig * envelope + 0.02 * rng.standard_normal(len(t))
+    return (sig / np.abs(sig).max() * 9000).astype(np.int16)
+
+
+class FakeMic:
+    """Shared audio source for fake input streams; silence whenever nothing is queued."""
+
+    def __init__(self):
+        self._pending: List[np.ndarray] = []
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def feed(self, pcm: np.ndarray):
+        with self._lock:
+            self._pending.append(np.asarray(pcm, dtype=np.int16))
+
+    def clear(self):
+        with self._lock:
+            self._pending = []
+            self._offset = 0
+
+    def take(self, frames: int) -> np.ndarray:
+        out = np.zeros(frames, dtype=np.int16)
+        filled = 0
+        with self._lock:
+            while filled < frames and self._pending:
+                head = self._pending[0]
+                n = min(frames - filled, len(head) - self._offset)
+                out[filled:filled + n] = head[self._offset:self._offset + n]
+                filled += n
+                self._offset += n
+                if self._offset >= len(head):
+                    self._pending.pop(0)
+                    self._offset = 0
+        return out
+
+
+class _DeviceClock:
+    """Paces a fake stream at samplerate * speed against the wall clock."""
+
+    def __init__(self, samplerate: int, speed: float):
+        self.samplerate = samplerate
+        self.speed = speed
+        self.t0 = time.perf_counter()
+        self.frames = 0
+        self._lock = threading.Lock()
+
+    def advance(self, frames: int):
+        with self._lock:
+            self.frames += frames
+            due = self.t0 + self.frames / self.samplerate / self.speed
+            now = time.perf_counter()
+            if due < now - 0.1:
+                # Nobody read for a while; a real device would have dropped that backlog
+                self.t0 = now - self.frames / self.samplerate / self.speed
+                due = now
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class FakeInputStream:
+    """sounddevice.InputStream stand-in reading from a FakeMic, in blocking or callback mode."""
+
+    def __init__(self, mic: FakeMic, speed: float, samplerate=MIC_RATE, channels=1, dtype="int16",
+                 blocksize=0, callback=None, **kwargs):
+        self.mic = mic
+        self.samplerate = int(samplerate)
+        self.blocksize = blocksize or int(self.samplerate * 0.03)
+        self.callback = callback
+        self.clock = _DeviceClock(self.samplerate, speed)
+        self._running = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.clock = _DeviceClock(self.samplerate, self.clock.speed)
+        self._running.set()
+        if self.callback is not None:
+            self._thread = threading.Thread(target=self._pump, name="fake-input", daemon=True)
+            self._thread.start()
+
+    def _pump(self):
+        while self._running.is_set():
+            self.clock.advance(self.blocksize)
+            block = self.mic.take(self.blocksize).reshape(-1, 1)
+            self.callback(block, self.blocksize, None, None)
+
+    def read(self, frames: int):
+        self.clock.advance(frames)
+        return self.mic.take(frames).reshape(-1, 1), False
+
+    def stop(self):
+        self._running.clear()
+
+    def abort(self):
+        self.stop()
+
+    def close(self):
+        self.stop()
+
+
+class FakeOutputStream:
+    """sounddevice.OutputStream stand-in that pulls from the callback at device pace and discards audio."""
+
+    def __init__(self, speed: float, samplerate=24000, channels=1, dtype="int16", blocksize=0, callback=None, **kwargs):
+        self.samplerate = int(samplerate)
+        self.blocksize = blocksize or int(self.samplerate * 0.02)
+        self.callback = callback
+        self.speed = speed
+        self._running = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._pump, name="fake-output", daemon=True)
+        self._thread.start()
+
+    def _pump(self):
+        clock = _DeviceClock(self.samplerate, self.speed)
+        out = np.zeros((self.blocksize, 1), dtype=np.int16)
+        info = SimpleNamespace(outputBufferDacTime=0.0, currentTime=0.0)
+        while self._running.is_set():
+            self.callback(out, self.blocksize, info, None)
+            clock.advance(self.blocksize)
+
+    def stop(self):
+        self._running.clear()
+
+    def abort(self):
+        self.stop()
+
+    def close(self):
+        self.stop()
+
+
+@contextlib.contextmanager
+def fake_audio_devices(mic: FakeMic, speed: float = 1.0):
+    """Point sounddevice's stream classes at the fakes; works even where PortAudio is missing."""
+    try:
+        import sounddevice as sd
+    except (ImportError, OSError):
+        sd = sys.modules["sounddevice"] = types.ModuleType("sounddevice")
+    saved = {name: getattr(sd, name, None) for name in ("InputStream", "OutputStream")}
+    sd.InputStream = lambda *a, **kw: FakeInputStream(mic, speed, *a, **kw)
+    sd.OutputStream = lambda *a, **kw: FakeOutputStream(speed, *a, **kw)
+    try:
+        yield sd
+    finally:
+        for name, value in saved.items():
+            if value is not None:
+                setattr(sd, name, value)
+
+
+def stub_tts_client(rtf: float = 0.3, chars_per_sec: float = 15.0, busy: bool = False):
+    """KokoroTTSClient stand-in: takes rtf x audio duration per sentence and yields silence.
+
+    With busy=True that time is spent spinning in Python while holding the GIL,
+    the worst case for threads sharing one interpreter; otherwise it sleeps.
+    """
+    from .tts_module import KokoroTTSClient, PlaybackController
+
+    class StubTTSClient(KokoroTTSClient):
+        def __init__(self):
+            # Skips KPipeline; everything speak_sentences needs is set here
+            self.voice, self.lang_code, self.speed = "stub", "a", 1.0
+            self.sample_rate = 24000
+            self.cache = None
+            self.allow_fallback = False
+            self.prefetch = max(1, int(os.getenv("TTS_PREFETCH", "2") or 2))
+            self.playback = PlaybackController()
+            self._infer_lock = threading.Lock()
+            self.live = threading.Event()
+            self.pipeline, self.use_kokoro = None, False
+            self.synth_secs = 0.0
+
+        def prime(self):
+            pass
+
+        def _render(self, text: str) -> np.ndarray:
+            audio_secs = max(0.2, len(text) / chars_per_sec)
+            t0 = time.perf_counter()
+            if busy:
+                deadline = t0 + audio_secs * rtf
+                while time.perf_counter() < deadline:
+                    pass
+            else:
+                time.sleep(audio_secs * rtf)
+            self.synth_secs += time.perf_counter() - t0
+            return np.zeros(int(audio_secs * self.sample_rate), dtype=np.int16)
+
+        def synthesize_pcm(self, text: str, stop_flag=lambda: False):
+            return None if stop_flag() else self._render(text)
+
+        def stream_pcm(self, text: str, stop_flag=lambda: False):
+            if not stop_flag():
+                yield self._render(text)
+
+    return StubTTSClient()
+
+
+class _NullLogger:
+    def log_turn(self, *args, **kwargs):
+        pass
+
+
+def load_personas(names: Optional[List[str]] = None) -> Dict[str, dict]:
+    personas = {}
+    for path in sorted(glob.glob(os.path.join("config", "personas", "*.json"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if names and name not in names:
+            continue
+        with open(path, "r") as f:
+            personas[name] = json.load(f)
+    return personas
+
+
+def run_persona(persona: dict, name: str, utterances: List[np.ndarray], turns: int, mic: FakeMic,
+                groq: MockGroqClient, tts, logger_obj=None) -> List[dict]:
+    from .llm_module import LLMClient
+    from .voice_client import VoiceClient
+
+    results: List[dict] = []
+    counter = [0]
+    lead_in = np.zeros(int(0.3 * MIC_RATE), dtype=np.int16)
+    tail = np.zeros(int(1.5 * MIC_RATE), dtype=np.int16)
+
+    def on_status(status):
+        # Each turn's utterance is queued as soon as the client starts listening
+        if status == "Listening":
+            pcm = utterances[counter[0] % len(utterances)]
+            counter[0] += 1
+            mic.feed(np.concatenate([lead_in, pcm, tail]))
+
+    def on_metrics(m):
+        llm = m.get("llm") or {}
+        results.append({"persona": name, "turn": m["turn"], "asr_ms": m["asr_ms"],
+                        "llm_ttft_ms": llm.get("first_token_ms"), "llm_ms": m["llm_ms"], "tts_ms": m["tts_ms"],
+                        "first_audio_ms": m.get("first_audio_ms"), "total_ms": m["total_ms"]})
+
+    vc = VoiceClient(persona=persona, session_id=f"bench-{name}-{int(time.time())}",
+                     callbacks={"status": on_status, "turn_metrics": on_metrics},
+                     asr=mock_asr_client(groq, sample_rate=MIC_RATE), llm=LLMClient(client=groq), tts=tts)
+    try:
+        vc.run(max_turns=turns, logger_obj=logger_obj or _NullLogger())
+    finally:
+        vc.request_stop()
+        vc.tts.playback.close_stream()
+    return results
+
+
+def summarize(rows: List[dict]) -> List[dict]:
+    out = []
+    for persona in sorted({r["persona"] for r in rows}):
+        sub = [r for r in rows if r["persona"] == persona]
+        for metric in METRICS:
+            values = np.array([r[metric] for r in sub if r.get(metric) is not None], dtype=np.float64)
+            if not len(values):
+                continue
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            out.append({"persona": persona, "metric": metric, "n": len(values), "mean": round(values.mean(), 1),
+                        "p50": round(p50, 1), "p90": round(p90, 1), "p99": round(p99, 1)})
+    return out
+
+
+def format_table(summary: List[dict]) -> str:
+    head = f"{'persona':<18}{'metric':<16}{'n':>4}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}"
+    lines = [head, "-" * len(head)]
+    for s in summary:
+        lines.append(f"{s['persona']:<18}{s['metric']:<16}{s['n']:>4}{s['mean']:>10}{s['p50']:>10}{s['p90']:>10}{s['p99']:>10}")
+    return "\n".join(lines)
+
+
+def run_benchmark(wav_paths: List[str], personas: Optional[List[str]] = None, turns: int = 5,
+                  speed: float = 1.0, asr_latency_ms: float = 250.0, ttft_ms: float = 300.0,
+                  tokens_per_sec: float = 150.0, tts_rtf: float = 0.3, real_tts: bool = False,
+                  log_path: Optional[str] = None) -> dict:
+    utterances = [load_wav_int16(p) for p in wav_paths] or [synth_utterance(2.5, seed=i) for i in range(3)]
+    groq = MockGroqClient(
+        transcriptions=MockTranscriptions(DEFAULT_SCRIPT, latency_ms=asr_latency_ms),
+        chat=MockChatCompletions(default_reply=DEFAULT_REPLY, ttft_ms=ttft_ms, tokens_per_sec=tokens_per_sec),
+    )
+    mic = FakeMic()
+    rows: List[dict] = []
+    logger_obj = None
+    if log_path:
+        from .logger import LatencyLogger
+        logger_obj = LatencyLogger(log_path)
+    with fake_audio_devices(mic, speed):
+        tts = None
+        if real_tts:
+            from .tts_module import KokoroTTSClient
+            tts = KokoroTTSClient()
+        for name, persona in load_personas(personas).items():
+            tts = tts if real_tts else stub_tts_client(rtf=tts_rtf)
+            mic.clear()
+            rows.extend(run_persona(persona, name, utterances, turns, mic, groq, tts, logger_obj))
+    if logger_obj is not None:
+        logger_obj.close()
+    return {
+        "config": {"turns": turns, "speed": speed, "asr_latency_ms": asr_latency_ms, "ttft_ms": ttft_ms,
+                   "tokens_per_sec": tokens_per_sec, "tts": "kokoro" if real_tts else f"stub rtf={tts_rtf}",
+                   "utterances": wav_paths or "synthetic"},
+        "turns": rows,
+        "summary": summarize(rows),
+    }
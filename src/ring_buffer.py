@@ -0,0 +1,197 @@
+import threading
+
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-size single-producer/single-consumer sample ring.
+
+    Positions are absolute sample counts, so readers can tell exactly how far
+    the stream has advanced. The audio callback side only ever takes the lock
+    briefly and never waits on it.
+    """
+
+    def __init__(self, capacity: int, dtype=np.int16):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=dtype)
+        self._read = 0
+        self._write = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    @property
+    def available(self) -> int:
+        return self._write - self._read
+
+    @property
+    def free(self) -> int:
+        return self.capacity - (self._write - self._read)
+
+    def write(self, data: np.ndarray, stop_event: threading.Event | None = None) -> int:
+        """Copy data in, blocking while the ring is full. Returns samples written."""
+        written = 0
+        total = len(data)
+        while written < total:
+            with self._cond:
+                while self.free == 0 and not self._closed and not (stop_event and stop_event.is_set()):
+                    self._cond.wait()
+                if self._closed or (stop_event and stop_event.is_set()):
+                    return written
+                n = min(self.free, total - written)
+                self._copy_in(data[written:written + n])
+                self._write += n
+                self._cond.notify_all()
+            written += n
+        return written
+
+    def _copy_in(self, data: np.ndarray):
+        start = self._write % self.capacity
+        first = min(len(data), self.capacity - start)
+        self._buf[start:start + first] = data[:first]
+        if first < len(data):
+            self._buf[:len(data) - first] = data[first:]
+
+    def read_into(self, out: np.ndarray) -> int:
+        """Copy up to len(out) samples out without blocking. Returns samples read."""
+        with self._cond:
+            n = min(len(out), self.available)
+            if n:
+                start = self._read % self.capacity
+                first = min(n, self.capacity - start)
+                out[:first] = self._buf[start:start + first]
+                if first < n:
+                    out[first:n] = self._buf[:n - first]
+                self._read += n
+                self._cond.notify_all()
+            return n
+
+    def wait_empty(self, stop_event: threading.Event | None = None, timeout: float | None = None) -> bool:
+        """Block until the reader has drained everything or stop_event is set."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self.available == 0 or self._closed or (stop_event is not None and stop_event.is_set()),
+                timeout,
+            )
+
+    def clear(self):
+        with self._cond:
+            self._read = self._write
+            self._cond.notify_all()
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class CaptureRing:
+    """Preallocated capture ring written straight from an input callback.
+
+    Unlike RingBuffer the producer never blocks: when the reader falls more
+    than a full buffer behind, the oldest samples are overwritten and counted
+    in `dropped`/`overflows`. Reads hand out memoryviews into the ring itself,
+    so a view is only valid until another `capacity` samples have been
+    captured. With the capacity a multiple of the read size reads never wrap,
+    and no copies are made.
+    """
+
+    def __init__(self, capacity: int, block: int = 1, dtype=np.int16):
+        block = max(1, int(block))
+        self.capacity = -(-int(capacity) // block) * block
+        self._buf = np.zeros(self.capacity, dtype=dtype)
+        self._read = 0
+        self._write = 0
+        self.overflows = 0
+        self.dropped = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    @property
+    def available(self) -> int:
+        return self._write - self._read
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def written(self) -> int:
+        return self._write
+
+    def write(self, data: np.ndarray):
+        """Copy one callback block in; never blocks."""
+        n = len(data)
+        with self._cond:
+            if n > self.capacity:
+                # Only the newest samples fit; the rest still advance the position
+                self._write += n - self.capacity
+                data = data[-self.capacity:]
+                n = self.capacity
+            start = self._write % self.capacity
+            first = min(n, self.capacity - start)
+            self._buf[start:start + first] = data[:first]
+            if first < n:
+                self._buf[:n - first] = data[first:]
+            self._write += n
+            behind = self._write - self._read - self.capacity
+            if behind > 0:
+                self.overflows += 1
+                self.dropped += behind
+                self._read += behind
+            self._cond.notify_all()
+
+    def _view(self, start: int, end: int) -> memoryview:
+        a, b = start % self.capacity, (end - 1) % self.capacity + 1
+        if end > start and a < b:
+            return memoryview(self._buf[a:b])
+        # Wraps the end of the ring: the only case that has to copy
+        return memoryview(np.concatenate([self._buf[a:], self._buf[:b]]))
+
+    def read(self, n: int, timeout: float | None = None) -> memoryview | None:
+        """Block until n samples are available and return them as a view, or None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.available >= n, timeout):
+                return None
+            view = self._view(self._read, self._read + n)
+            self._read += n
+            return view
+
+    def read_at(self, pos: int, n: int, timeout: float | None = None):
+        """Read n samples at absolute position pos for a reader keeping its own cursor.
+
+        Returns (view, next_pos, dropped); view is None on timeout or close. A
+        cursor that has been lapped skips to the oldest retained sample and the
+        skipped samples are reported as dropped.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._write - pos >= n or self._closed, timeout) \
+                    or self._write - pos < n:
+                return None, pos, 0
+            dropped = max(0, self._write - self.capacity - pos)
+            pos += dropped
+            return self._view(pos, pos + n), pos + n, dropped
+
+    def snapshot(self) -> memoryview:
+        """Everything captured since reset(), or the newest `capacity` samples if it overflowed."""
+        with self._cond:
+            start = max(0, self._write - self.capacity)
+            if start == self._write:
+                return memoryview(self._buf[:0])
+            return self._view(start, self._write)
+
+    def reset(self):
+        """Forget captured audio; positions restart at the front so recordings stay contiguous."""
+        with self._cond:
+            self._read = self._write = 0
+            self.overflows = self.dropped = 0
+            self._closed = False
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,453 @@
+"""
+Multi-session voice server: many callers in one process over a local TCP socket.
+
+Wire format, both directions: 1 byte frame type, 4 byte big-endian length,
+payload. Client -> server: H (hello JSON: persona, session_id), A (16 kHz
+mono int16 PCM), Q (quit). Server -> client: O (24 kHz mono int16 PCM),
+T (event JSON), D (reply done JSON with turn metrics).
+
+All sessions share one Kokoro model, one set of pooled Groq clients and a
+fair round-robin scheduler for TTS inference. Each session has bounded
+inbound/outbound buffering so a slow caller only stalls itself.
+"""
+import asyncio
+import glob
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+from loguru import logger
+
+from .asr_module import ASRClient, pcm16_to_wav_file
+from .async_pipeline import aiter_sync, asplit_sentences
+from .batch_vad import BatchVAD
+from .endpointing import AdaptiveEndpointer
+from .llm_module import LLMClient
+from .state_manager import ConversationState
+from .tracing import Tracer, export_from_env
+from .tts_cache import cache_from_env
+from .tts_module import KokoroTTSClient
+from .tts_service import PRIORITY_FIRST, PRIORITY_REST, TTSService
+from .warmup import persona_warm_phrases, start_warmup
+
+IN_RATE = 16000
+FRAME_MS = 30
+FRAME_BYTES = int(IN_RATE * FRAME_MS / 1000) * 2
+_HEADER = struct.Struct(">cI")
+
+
+def pack_frame(kind: bytes, payload: bytes) -> bytes:
+    return _HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    header = await reader.readexactly(_HEADER.size)
+    kind, length = _HEADER.unpack(header)
+    payload = await reader.readexactly(length) if length else b""
+    return kind, payload
+
+
+class FairScheduler:
+    """Runs blocking jobs on a small pool, taking one job per session in turn."""
+
+    def __init__(self, workers: int = 1):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fair-sched")
+        self._queues: Dict[str, deque] = {}
+        self._order: deque = deque()
+        self._cond: asyncio.Condition | None = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._cond = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, session_id: str, fn, *args):
+        fut = asyncio.get_running_loop().create_future()
+        async with self._cond:
+            q = self._queues.get(session_id)
+            if q is None:
+                q = self._queues[session_id] = deque()
+                self._order.append(session_id)
+            q.append((fn, args, fut))
+            self._cond.notify()
+        return await fut
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: bool(self._order))
+                session_id = self._order.popleft()
+                q = self._queues[session_id]
+                fn, args, fut = q.popleft()
+                if q:
+                    # Back of the line, so every session gets one job per round
+                    self._order.append(session_id)
+                else:
+                    del self._queues[session_id]
+            if fut.done():
+                continue
+            try:
+                result = await loop.run_in_executor(self._executor, fn, *args)
+                if not fut.done():
+                    fut.set_result(result)
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+
+    def stats(self) -> dict:
+        return {"sessions_waiting": len(self._order),
+                "queued_jobs": sum(len(q) for q in self._queues.values())}
+
+
+class SharedResources:
+    """Models and clients built once per process and shared by every session."""
+
+    def __init__(self, asr: ASRClient | None = None, llm: LLMClient | None = None,
+                 tts: KokoroTTSClient | None = None):
+        self.asr = asr or ASRClient(sample_rate=IN_RATE, incremental=False)
+        self.llm = llm or LLMClient()
+        self._tts = tts
+        self._lock = threading.Lock()
+        # Optional process pool; without it TTS runs on the fair scheduler's threads.
+        # The workers hold the models, so no in-process Kokoro is loaded alongside them.
+        workers = int(os.getenv("TTS_WORKERS", "0") or 0)
+        self.tts_service = None
+        if workers > 0:
+            self.tts_service = TTSService(workers=workers, cache=tts.cache if tts is not None else cache_from_env())
+        self._personas: Dict[str, dict] = {}
+
+    @property
+    def tts(self) -> KokoroTTSClient:
+        """In-process Kokoro client, loaded on first use."""
+        with self._lock:
+            if self._tts is None:
+                cache = self.tts_service.cache if self.tts_service is not None else None
+                self._tts = KokoroTTSClient(cache=cache)
+            return self._tts
+
+    def persona(self, name: str) -> dict:
+        with self._lock:
+            if name not in self._personas:
+                # The name comes from the caller, so it is looked up, never joined into a path
+                available = {os.path.splitext(os.path.basename(p))[0]: p
+                             for p in glob.glob(os.path.join("config", "personas", "*.json"))}
+                if name not in available:
+                    raise ValueError(f"unknown persona {name!r}")
+                with open(available[name], "r") as f:
+                    persona = self._personas[name] = json.load(f)
+            else:
+                return self._personas[name]
+        if self.tts_service is None:
+            start_warmup(self.tts, persona)
+        elif os.getenv("TTS_WARMUP", "1") == "1":
+            # Fills the shared cache through the workers, behind live requests
+            for phrase in persona_warm_phrases(persona):
+                self.tts_service.submit(phrase, PRIORITY_REST)
+        return persona
+
+
+class _Session:
+    def __init__(self, server: "VoiceSessionServer", session_id: str, persona: dict,
+                 writer: asyncio.StreamWriter):
+        self.server = server
+        self.id = session_id
+        self.persona = persona
+        self.writer = writer
+        self.state = ConversationState.from_env(session_id=session_id, persona_name=persona.get("name", "Customer"))
+        self.vad = BatchVAD.from_env(IN_RATE, FRAME_MS, 2)
+        self.endpointer = AdaptiveEndpointer.from_env()
+        self.inbound: asyncio.Queue = asyncio.Queue(server.inbound_frames)
+        self.utterances: asyncio.Queue = asyncio.Queue(1)
+        self.out_lock = asyncio.Lock()
+        self.reply: asyncio.Task | None = None
+        self.cancel = threading.Event()
+        self.t_endpoint = 0.0
+        self.t_last_voice = 0
+        # Server-side spans; "first_audio" here is when the first reply audio is sent
+        self.tracer = Tracer(session_id)
+
+    async def send(self, kind: bytes, payload: bytes):
+        async with self.out_lock:
+            self.writer.write(pack_frame(kind, payload))
+            # drain() blocks only this session when its caller reads slowly
+            await self.writer.drain()
+
+    async def send_event(self, kind: bytes, obj: dict):
+        await self.send(kind, json.dumps(obj).encode("utf-8"))
+
+    async def segment_audio(self):
+        """Frame inbound PCM, run VAD/endpointing and detect barge-in."""
+        pending = bytearray()
+        speech = bytearray()
+        started = False
+        voiced_ms = 0
+        streak = 0
+        recent: deque = deque(maxlen=5)
+        self.endpointer.reset()
+        while True:
+            chunk = await self.inbound.get()
+            if chunk is None:
+                return
+            pending.extend(chunk)
+            usable = len(pending) - len(pending) % FRAME_BYTES
+            if not usable:
+                continue
+            # Classify every whole frame of the chunk in one batch; frames below are views of block
+            block = bytes(pending[:usable])
+            del pending[:usable]
+            mask = self.vad.classify(np.frombuffer(block, dtype=np.int16))
+            view = memoryview(block)
+            for i, is_speech in enumerate(mask.tolist()):
+                frame = view[i * FRAME_BYTES:(i + 1) * FRAME_BYTES]
+                # Once barge-in has fired, later frames belong to the new utterance below
+                if self.reply is not None and not self.reply.done() and not self.cancel.is_set():
+                    streak = streak + 1 if is_speech else 0
+                    recent.append(frame)
+                    if streak >= 5:
+                        self.tracer.mark("barge_in")
+                        self.cancel.set()
+                        self.reply.cancel()
+                        await self.send_event(b"T", {"type": "barge_in"})
+                        # The interruption is the start of the next utterance
+                        speech.extend(b"".join(recent))
+                        voiced_ms = streak * FRAME_MS
+                        started = voiced_ms >= 200
+                    continue
+                recent.clear()
+                streak = 0
+                if is_speech:
+                    self.t_last_voice = time.perf_counter_ns()
+                if started and self.endpointer.update(is_speech):
+                    self.t_endpoint = time.perf_counter()
+                    await self.utterances.put(bytes(speech))
+                    speech.clear()
+                    started = False
+                    voiced_ms = 0
+                    self.endpointer.reset()
+                    continue
+                if is_speech:
+                    speech.extend(frame)
+                    voiced_ms += FRAME_MS
+                    if not started and voiced_ms >= 200:
+                        started = True
+                elif not started:
+                    voiced_ms = 0
+                    speech.clear()
+
+    async def turn_loop(self):
+        turn = 0
+        while True:
+            pcm = await self.utterances.get()
+            if pcm is None:
+                return
+            turn += 1
+            self.cancel.clear()
+            self.reply = asyncio.create_task(self.respond(turn, pcm))
+            try:
+                await self.reply
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+            except Exception as e:
+                logger.error(f"[{self.id}] turn {turn} failed: {e}")
+                await self.send_event(b"D", {"turn": turn, "error": str(e)})
+
+    async def respond(self, turn: int, pcm: bytes):
+        shared = self.server.shared
+        t_endpoint = self.t_endpoint
+        tracer = self.tracer
+        tracer.begin_turn(turn)
+        tracer.add("vad.endpoint", self.t_last_voice, int(t_endpoint * 1e9))
+        tracer.mark("speech_end", self.t_last_voice)
+        with tracer.span("asr.final", audio_bytes=len(pcm)):
+            user_text, asr_ms = await asyncio.to_thread(shared.asr.transcribe_wav_bytes, pcm16_to_wav_file(pcm, IN_RATE))
+        await self.send_event(b"T", {"type": "user_text", "text": user_text})
+        if not user_text.strip():
+            await self.send_event(b"D", {"turn": turn, "asr_ms": asr_ms, "empty": True})
+            return
+        self.state.add_turn("user", user_text)
+        messages = self.state.as_messages(self.persona.get("system_prompt", ""))
+        stream, llm_record = await asyncio.to_thread(shared.llm.stream_chat, messages, self.persona.get("llm_cache", True))
+
+        sentences: List[str] = []
+        # Sentences whose audio reached the caller; only these go into the history
+        sent: List[str] = []
+        first_audio_ms = None
+        tts_wait_ms = 0.0
+        try:
+            async for sentence in asplit_sentences(aiter_sync(stream, self.cancel)):
+                sentences.append(sentence)
+                await self.send_event(b"T", {"type": "assistant_sentence", "text": sentence})
+                span = tracer.start("tts.synth", chars=len(sentence))
+                if shared.tts_service is not None:
+                    # The first sentence decides time-to-first-audio, so it jumps the queue
+                    fut = shared.tts_service.submit(sentence, PRIORITY_FIRST if len(sentences) == 1 else PRIORITY_REST)
+                    audio = await asyncio.wrap_future(fut)
+                    tts_wait_ms += getattr(fut, "wait_ms", 0.0)
+                else:
+                    audio = await self.server.scheduler.submit(
+                        self.id, shared.tts.synthesize_pcm, sentence, self.cancel.is_set)
+                span.end()
+                if audio is None:
+                    continue
+                if first_audio_ms is None:
+                    first_audio_ms = (time.perf_counter() - t_endpoint) * 1000
+                    tracer.mark("first_audio")
+                await self.send(b"O", np.ascontiguousarray(audio).tobytes())
+                sent.append(sentence)
+        finally:
+            self.state.add_turn("assistant", " ".join(sent).strip(), interrupted=self.cancel.is_set())
+            tracer.add_llm_record(llm_record)
+            tracer.mark("turn_end")
+        await self.send_event(b"D", {"turn": turn, "asr_ms": asr_ms, "first_audio_ms": first_audio_ms,
+                                     "sentences": len(sentences), "tts_wait_ms": tts_wait_ms,
+                                     "llm": llm_record.as_dict(), "timing": tracer.turn_summary(),
+                                     "vad": self.vad.stats(),
+                                     "server": self.server.stats()})
+
+
+class VoiceSessionServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, tts_workers: int = 1,
+                 inbound_frames: int = 64, max_sessions: int = 64, shared: SharedResources | None = None):
+        self.host = host
+        self.port = port
+        self.inbound_frames = inbound_frames
+        self.max_sessions = max_sessions
+        self.shared = shared or SharedResources()
+        self.scheduler = FairScheduler(workers=tts_workers)
+        self.sessions: Dict[str, _Session] = {}
+        # Set once the socket is bound; port is updated when 0 asked for an ephemeral one
+        self.listening = threading.Event()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            kind, payload = await read_frame(reader)
+            if kind != b"H":
+                raise ValueError("expected hello frame")
+            hello = json.loads(payload or b"{}")
+            if len(self.sessions) >= self.max_sessions:
+                writer.write(pack_frame(b"T", json.dumps({"type": "error", "error": "server full"}).encode()))
+                await writer.drain()
+                writer.close()
+                return
+            persona = await asyncio.to_thread(self.shared.persona, hello.get("persona", "card_lost"))
+        except Exception as e:
+            logger.warning(f"Rejected connection: {e}")
+            writer.close()
+            return
+
+        session_id = str(hello.get("session_id") or uuid.uuid4())
+        if session_id in self.sessions:
+            # Ids key the scheduler queues and the traces, so a second caller never shares one
+            session_id = f"{session_id}-{uuid.uuid4().hex[:8]}"
+            logger.warning(f"Session id {hello['session_id']} already active; using {session_id}")
+        session = _Session(self, session_id, persona, writer)
+        self.sessions[session.id] = session
+        logger.info(f"Session {session.id} started ({persona.get('name')}), {len(self.sessions)} active")
+        tasks = [asyncio.create_task(session.segment_audio()), asyncio.create_task(session.turn_loop())]
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind == b"A":
+                    # Bounded queue: when full we stop reading and TCP pushes back on the caller
+                    await session.inbound.put(payload)
+                elif kind == b"Q":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            session.cancel.set()
+            for t in tasks:
+                t.cancel()
+            if session.reply is not None:
+                session.reply.cancel()
+            self.sessions.pop(session.id, None)
+            await asyncio.to_thread(export_from_env, session.tracer)
+            writer.close()
+            logger.info(f"Session {session.id} closed, {len(self.sessions)} active")
+
+    def stats(self) -> dict:
+        out = {"sessions": len(self.sessions), "scheduler": self.scheduler.stats()}
+        if self.shared.tts_service is not None:
+            out["tts_service"] = self.shared.tts_service.stats()
+        return out
+
+    async def serve_forever(self):
+        self.scheduler.start()
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        self.listening.set()
+        logger.info(f"Voice session server listening on {self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+
+def load_pcm16_wav(path: str) -> bytes:
+    with wave.open(path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != IN_RATE:
+            raise ValueError(f"{path}: expected 16 kHz mono int16 WAV")
+        return wf.readframes(wf.getnframes())
+
+
+async def simulate_caller(host: str, port: int, persona: str, utterances: List[bytes],
+                          realtime: bool = True, trailing_silence_ms: int = 1500,
+                          reply_timeout: float = 60.0) -> List[dict]:
+    """Play recorded utterances into the server like a phone caller and time each reply."""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(pack_frame(b"H", json.dumps({"persona": persona}).encode("utf-8")))
+    silence = b"\x00" * FRAME_BYTES
+    results = []
+    try:
+        for pcm in utterances:
+            frames = [pcm[i:i + FRAME_BYTES] for i in range(0, len(pcm), FRAME_BYTES)]
+            frames += [silence] * (trailing_silence_ms // FRAME_MS)
+            t_speech_end = None
+            for i, frame in enumerate(frames):
+                writer.write(pack_frame(b"A", frame))
+                await writer.drain()
+                if i == len(frames) - (trailing_silence_ms // FRAME_MS) - 1:
+                    t_speech_end = time.perf_counter()
+                if realtime:
+                    await asyncio.sleep(FRAME_MS / 1000)
+            t_first_audio = None
+            audio_bytes = 0
+            while True:
+                kind, payload = await asyncio.wait_for(read_frame(reader), reply_timeout)
+                if kind == b"O":
+                    audio_bytes += len(payload)
+                    if t_first_audio is None:
+                        t_first_audio = time.perf_counter()
+                elif kind == b"D":
+                    done = json.loads(payload)
+                    break
+            done["client_first_audio_ms"] = (t_first_audio - t_speech_end) * 1000 if t_first_audio else None
+            done["audio_bytes"] = audio_bytes
+            results.append(done)
+    finally:
+        writer.write(pack_frame(b"Q", b""))
+        writer.close()
+    return results
+
+
+async def run_callers(host: str, port: int, n: int, persona: str, utterances: List[bytes],
+                      realtime: bool = True) -> dict:
+    """Run n concurrent simulated callers and summarise first-audio latency."""
+    runs = await asyncio.gather(*(simulate_caller(host, port, persona, utterances, realtime) for _ in range(n)),
+                                return_exceptions=True)
+    errors = [r for r in runs if isinstance(r, Exception)]
+    turns = [t for r in runs if not isinstance(r, Exception) for t in r]
+    lat = np.array([t["client_first_audio_ms"] for t in turns if t.get("client_first_audio_ms") is not None])
+    summary = {"callers": n, "turns": len(turns), "errors": len(errors)}
+    if lat.size:
+        summary.update({f"first_audio_p{p}_ms": float(np.percentile(lat, p)) for p in (50, 90, 99)})
+    return summary
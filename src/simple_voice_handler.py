@@ -2,54 +2,61 @@
 Simple Voice Handler for manual recording control
 Provides start/stop recording interface for Streamlit UI
 """
-import queue
+import os
 import time
 import sounddevice as sd
-import numpy as np
 from loguru import logger
 
-from .asr_module import ASRClient, pcm16_to_wav_bytes
+from .asr_module import ASRClient, pcm16_to_wav_file
 from .llm_module import LLMClient
 from .tts_module import KokoroTTSClient
+from .prompt_cache import PromptAssembler, cache_usage
+from .ring_buffer import CaptureRing
 from .state_manager import ConversationState
+from .warmup import start_warmup
 
 
 class SimpleVoiceHandler:
     """
     Simplified voice handler with manual recording controls
     """
-    def __init__(self, persona: dict, callbacks: dict = None):
+    def __init__(self, persona: dict, callbacks: dict = None, asr_client: ASRClient = None,
+                 llm_client: LLMClient = None, tts_client: KokoroTTSClient = None):
         self.persona = persona
         self.callbacks = callbacks or {}
         
-        # Initialize components
-        self.asr_client = ASRClient()
-        self.llm_client = LLMClient()
-        self.tts_client = KokoroTTSClient()
+        # Initialize components (pass existing clients to share them across handlers)
+        self.asr_client = asr_client or ASRClient()
+        self.llm_client = llm_client or LLMClient()
+        self.tts_client = tts_client or KokoroTTSClient()
+        start_warmup(self.tts_client, persona)
         
         # State
-        self.state = ConversationState(
+        self.state = ConversationState.from_env(
             session_id="streamlit_session",
             persona_name=persona.get("name", "Assistant")
         )
         
+        self.prompts = PromptAssembler(persona.get("system_prompt", "You are a helpful assistant."))
+        
         # Recording
         self.sample_rate = 16000
-        self.audio_buffer = queue.Queue()
+        # Preallocated once; the callback writes into it and ASR uploads straight from it
+        max_secs = float(os.getenv("RECORD_MAX_SECS", "120") or 120)
+        self.audio_buffer = CaptureRing(int(self.sample_rate * max_secs))
         self.stream = None
         self.is_recording = False
         
     def _audio_callback(self, indata, frames, time_info, status):
         """Callback for audio input stream"""
         if self.is_recording:
-            self.audio_buffer.put(indata.copy())
+            self.audio_buffer.write(indata[:, 0])
     
     def start_recording(self):
         """Start recording audio"""
         try:
             # Clear buffer
-            while not self.audio_buffer.empty():
-                self.audio_buffer.get()
+            self.audio_buffer.reset()
             
             # Start stream
             self.is_recording = True
@@ -97,21 +104,18 @@ class SimpleVoiceHandler:
             if self.callbacks.get('status'):
                 self.callbacks['status']("🎯 Transcribing...")
             
-            audio_chunks = []
-            while not self.audio_buffer.empty():
-                audio_chunks.append(self.audio_buffer.get())
+            audio_data = self.audio_buffer.snapshot()
             
-            if not audio_chunks:
+            if not len(audio_data):
                 return {"error": "No audio recorded"}
-            
-            # Combine audio
-            audio_data = np.concatenate(audio_chunks, axis=0)
+            if self.audio_buffer.dropped:
+                logger.warning(f"Recording exceeded buffer; kept the last {len(audio_data) / self.sample_rate:.0f}s")
+            metrics['capture_dropped_samples'] = self.audio_buffer.dropped
             
             # ASR: Convert to text
             start_asr = time.time()
-            pcm_bytes = audio_data.flatten().tobytes()
-            wav_bytes = pcm16_to_wav_bytes(pcm_bytes, self.sample_rate)
-            user_text, asr_ms = self.asr_client.transcribe_wav_bytes(wav_bytes)
+            wav = pcm16_to_wav_file(audio_data, self.sample_rate)
+            user_text, asr_ms = self.asr_client.transcribe_wav_bytes(wav)
             metrics['asr_ms'] = asr_ms
             
             if not user_text or not user_text.strip():
@@ -134,11 +138,15 @@ class SimpleVoiceHandler:
                 self.callbacks['llm_start'](user_text)
             
             start_llm = time.time()
-            messages = self.state.as_messages(self.persona.get("system_prompt", "You are a helpful assistant."))
+            messages, prompt_info = self.prompts.build(self.state)
             
             # Generate LLM response
-            assistant_text, llm_ms, usage = self.llm_client.complete(messages)
+            assistant_text, llm_ms, usage = self.llm_client.complete(messages, use_cache=self.persona.get("llm_cache", True))
             metrics['llm_ms'] = llm_ms
+            metrics['prompt_reused_tokens'] = prompt_info['reused_tokens']
+            cached = cache_usage(usage)
+            if cached and cached['cached_tokens'] is not None:
+                metrics['prompt_cached_tokens'] = cached['cached_tokens']
             
             if not assistant_text.strip():
                 return {"error": "No response generated"}
@@ -166,6 +174,8 @@ class SimpleVoiceHandler:
                     self.tts_client.playback.play_wav(wav_bytes)
             tts_ms = (time.time() - start_tts) * 1000
             metrics['tts_ms'] = tts_ms
+            if self.tts_client.cache:
+                metrics['tts_cache_hit_rate'] = self.tts_client.cache.stats()['hit_rate']
             
             # Total time
             total_ms = (time.time() - start_total) * 1000
@@ -187,7 +197,7 @@ class SimpleVoiceHandler:
     
     def reset_conversation(self):
         """Reset conversation history"""
-        self.state.turns = []
+        self.state.reset()
         logger.info("Conversation reset")
     
     def cleanup(self):
@@ -197,4 +207,5 @@ class SimpleVoiceHandler:
             self.stream.close()
         # Stop any playback
         self.tts_client.playback.stop()
+        self.tts_client.playback.close_stream()
         logger.info("Cleanup complete")
@@ -0,0 +1,139 @@
+import queue
+import re
+import threading
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+
+BuildFn = Callable[[str], Tuple[List[dict], dict]]
+
+from .llm_module import LLMRequestRecord
+
+_END = object()
+
+
+def normalize_transcript(text: str) -> str:
+    text = re.sub(r"[^\w\s']", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class _Speculation:
+    def __init__(self, text: str):
+        self.text = text
+        self.key = normalize_transcript(text)
+        self.tokens: queue.Queue = queue.Queue()
+        self.cancel = threading.Event()
+        self.started_at = time.perf_counter()
+        self.record = LLMRequestRecord()
+        self.info: dict = {}
+
+    def consume(self) -> Iterator[str]:
+        while True:
+            item = self.tokens.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+class SpeculativeLLM:
+    """Starts the LLM on a stable ASR partial before the endpoint fires.
+
+    Call begin() before listening, feed every partial to on_partial(), then
+    resolve() with the final transcript. A matching speculation hands back its
+    already-running token stream, its record and the info the prompt builder
+    returned for the messages it sent; anything else is cancelled.
+    """
+
+    def __init__(self, llm, stable_ms: int = 500, use_cache: bool = True):
+        self.llm = llm
+        self.use_cache = use_cache
+        self.stable_ms = stable_ms
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self._build_messages: Optional[BuildFn] = None
+        self._current: Optional[_Speculation] = None
+        self._seen_key = ""
+        self._seen_since = 0.0
+        self._lock = threading.Lock()
+
+    def begin(self, build_messages: BuildFn):
+        """Arm for one utterance; build_messages(text) returns (messages, info) for a transcript."""
+        self.cancel()
+        self._build_messages = build_messages
+        self._seen_key = ""
+        self._seen_since = 0.0
+
+    def on_partial(self, text: str):
+        key = normalize_transcript(text)
+        if not key or self._build_messages is None:
+            return
+        now = time.perf_counter()
+        if key != self._seen_key:
+            self._seen_key = key
+            self._seen_since = now
+            return
+        if (now - self._seen_since) * 1000 < self.stable_ms:
+            return
+        with self._lock:
+            if self._current is not None and self._current.key == key:
+                return
+        self._start(text)
+
+    def _start(self, text: str):
+        self.cancel()
+        spec = _Speculation(text)
+        messages, spec.info = self._build_messages(text)
+
+        def run():
+            try:
+                stream, _ = self.llm.stream_chat(messages, use_cache=self.use_cache, record=spec.record)
+                try:
+                    for tok in stream:
+                        if spec.cancel.is_set():
+                            break
+                        spec.tokens.put(tok)
+                finally:
+                    stream.close()
+            except Exception as e:
+                spec.tokens.put(e)
+            finally:
+                spec.tokens.put(_END)
+
+        with self._lock:
+            self._current = spec
+            self.started += 1
+        threading.Thread(target=run, name="llm-speculative", daemon=True).start()
+
+    def cancel(self):
+        with self._lock:
+            spec, self._current = self._current, None
+        if spec is not None:
+            spec.cancel.set()
+
+    def resolve(self, final_text: str) -> Optional[Tuple[Iterator[str], LLMRequestRecord, dict]]:
+        """Return the speculative token stream, record and build info if it matches the final transcript."""
+        with self._lock:
+            spec, self._current = self._current, None
+        self._build_messages = None
+        if spec is None:
+            return None
+        if spec.key == normalize_transcript(final_text):
+            self.hits += 1
+            self.saved_ms += (time.perf_counter() - spec.started_at) * 1000
+            return spec.consume(), spec.record, spec.info
+        spec.cancel.set()
+        self.misses += 1
+        return None
+
+    def stats(self) -> dict:
+        resolved = self.hits + self.misses
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / resolved) if resolved else 0.0,
+            "head_start_ms_total": round(self.saved_ms, 1),
+        }
@@ -1,21 +1,124 @@
+import itertools
+import os
+import re
+from collections import deque
 from dataclasses import dataclass, field
-from typing import List, Dict, Any
+from typing import Deque, List, Dict, Any, Optional
+
+
+def approx_tokens(text: str) -> int:
+    return max(1, int(len(text) / 4))
 
 
 @dataclass
 class ConversationState:
     session_id: str
     persona_name: str
-    turns: List[Dict[str, Any]] = field(default_factory=list)
+    turns: Deque[Dict[str, Any]] = field(default_factory=deque)
     max_turns: int = 8
+    # When set, system prompt + summary + history are kept under this many tokens
+    # and max_turns no longer applies
+    token_budget: Optional[int] = None
+    summarize_evicted: bool = False
+    summary_max_tokens: int = 200
+    summary: str = ""
+    _history_tokens: int = field(default=0, init=False, repr=False)
+    _messages: Deque[Dict[str, str]] = field(default_factory=deque, init=False, repr=False)
+    _system: tuple = field(default=(None, None, 0), init=False, repr=False)
+
+    @classmethod
+    def from_env(cls, session_id: str, persona_name: str) -> "ConversationState":
+        budget = os.getenv("CONTEXT_TOKEN_BUDGET", "").strip()
+        return cls(session_id=session_id, persona_name=persona_name,
+                   token_budget=int(budget) if budget.isdigit() and int(budget) > 0 else None,
+                   summarize_evicted=os.getenv("CONTEXT_SUMMARY", "0") == "1")
+
+    def __post_init__(self):
+        turns = list(self.turns)
+        self.turns = deque()
+        for t in turns:
+            self.add_turn(t["role"], t["text"], t.get("interrupted", False))
+
+    def add_turn(self, role: str, text: str, interrupted: bool = False):
+        tokens = approx_tokens(text)
+        turn = {"role": role, "text": text, "tokens": tokens}
+        if interrupted:
+            # The reply was cut off by the caller; text is only the part that was played
+            turn["interrupted"] = True
+        self.turns.append(turn)
+        self._messages.append({"role": role, "content": text})
+        self._history_tokens += tokens
+        self.trim()
+
+    def trim(self, system_prompt: Optional[str] = None):
+        """Evict (and optionally summarise) the oldest turns until history fits.
 
-    def add_turn(self, role: str, text: str):
-        self.turns.append({"role": role, "text": text})
-        if len(self.turns) > self.max_turns:
-            self.turns = self.turns[-self.max_turns:]
+        Without a system_prompt the budget is checked against the one last
+        passed to as_messages().
+        """
+        if self.token_budget is None:
+            while len(self.turns) > self.max_turns:
+                self._evict_oldest()
+            return
+        sys_tokens = self._system_message(system_prompt)[1] if system_prompt is not None else self._system[2]
+        # Always keep the latest turn, even if it alone exceeds the budget
+        while len(self.turns) > 1 and (sys_tokens + self._summary_tokens() + self._history_tokens) > self.token_budget:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        turn = self.turns.popleft()
+        self._messages.popleft()
+        self._history_tokens -= turn["tokens"]
+        if self.summarize_evicted:
+            self._summarize(turn)
+
+    def _summarize(self, turn: Dict[str, Any]):
+        # Extractive: keep the first sentence of each evicted turn, oldest dropped first
+        first = re.split(r"(?<=[.!?])\s+", turn["text"].strip(), maxsplit=1)[0]
+        who = "Customer" if turn["role"] == "user" else "Agent"
+        lines = [l for l in self.summary.split("\n") if l]
+        lines.append(f"{who}: {first}")
+        limit = self.summary_max_tokens
+        if self.token_budget is not None:
+            # Never let the summary crowd out recent turns
+            limit = min(limit, self.token_budget // 4)
+        while len(lines) > 1 and approx_tokens("\n".join(lines)) > limit:
+            lines.pop(0)
+        self.summary = "\n".join(lines)
+
+    def history_tokens(self) -> int:
+        return self._history_tokens
+
+    def reset(self):
+        self.turns.clear()
+        self._messages.clear()
+        self._history_tokens = 0
+        self.summary = ""
+
+    def _system_message(self, system_prompt: str):
+        cached_prompt, msg, tokens = self._system
+        if cached_prompt != system_prompt:
+            msg = {"role": "system", "content": system_prompt}
+            tokens = approx_tokens(system_prompt)
+            self._system = (system_prompt, msg, tokens)
+        return msg, tokens
 
     def as_messages(self, system_prompt: str) -> List[Dict[str, str]]:
-        msgs = [{"role": "system", "content": system_prompt}]
-        for t in self.turns:
-            msgs.append({"role": t["role"], "content": t["text"]})
+        """Messages for a request; never changes the stored history."""
+        sys_msg, sys_tokens = self._system_message(system_prompt)
+        skip = 0
+        if self.token_budget is not None:
+            # add_turn() trims against the last system prompt; a larger one is
+            # handled here by leaving the oldest turns out of this request only
+            over = sys_tokens + self._summary_tokens() + self._history_tokens - self.token_budget
+            while over > 0 and skip < len(self.turns) - 1:
+                over -= self.turns[skip]["tokens"]
+                skip += 1
+        msgs = [sys_msg]
+        if self.summary:
+            msgs.append({"role": "system", "content": f"Earlier in this conversation:\n{self.summary}"})
+        msgs.extend(itertools.islice(self._messages, skip, None))
         return msgs
+
+    def _summary_tokens(self) -> int:
+        return approx_tokens(self.summary) + 8 if self.summary else 0
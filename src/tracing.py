@@ -0,0 +1,181 @@
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional
+
+_ids = itertools.count(1)
+
+
+def now_ns() -> int:
+    """Monotonic clock shared by every span (same clock as time.perf_counter)."""
+    return time.perf_counter_ns()
+
+
+class Span:
+    __slots__ = ("name", "turn", "start_ns", "end_ns", "attrs", "span_id", "thread")
+
+    def __init__(self, name: str, turn: Optional[int], start_ns: int, attrs: dict):
+        self.name = name
+        self.turn = turn
+        self.start_ns = start_ns
+        self.end_ns: Optional[int] = None
+        self.attrs = attrs
+        self.span_id = next(_ids)
+        self.thread = threading.current_thread().name
+
+    def end(self, t_ns: Optional[int] = None, **attrs) -> "Span":
+        if self.end_ns is None:
+            self.end_ns = t_ns or now_ns()
+        self.attrs.update(attrs)
+        return self
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e6
+
+
+class Tracer:
+    """Per-session span recorder on a monotonic clock.
+
+    Spans carry the session ID and the turn that was current when they
+    started, and can be exported as Chrome trace JSON (chrome://tracing,
+    Perfetto) or OpenTelemetry-style span records. Only the most recent
+    max_spans spans are kept. Marks are named per-turn instants (speech end,
+    first audio) that the turn summary is computed from.
+    """
+
+    def __init__(self, session_id: str, max_spans: int = 20000):
+        self.session_id = session_id
+        self.turn: Optional[int] = None
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+        self._marks: Dict[int, Dict[str, int]] = {}
+        # Offset from the monotonic clock to wall-clock time, for OTel export
+        self._epoch_offset_ns = time.time_ns() - now_ns()
+
+    def begin_turn(self, turn: int):
+        self.turn = turn
+        self._marks[turn] = {}
+        # Keep marks for recent turns only
+        for old in [t for t in self._marks if t < turn - 100]:
+            del self._marks[old]
+
+    def start(self, name: str, t_ns: Optional[int] = None, **attrs) -> Span:
+        span = Span(name, self.turn, t_ns or now_ns(), attrs)
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        s = self.start(name, **attrs)
+        try:
+            yield s
+        finally:
+            s.end()
+
+    def add(self, name: str, start_ns: int, end_ns: Optional[int], **attrs) -> Span:
+        """Record a span whose bounds were measured elsewhere."""
+        s = self.start(name, t_ns=start_ns, **attrs)
+        s.end_ns = end_ns
+        return s
+
+    def instant(self, name: str, t_ns: Optional[int] = None, **attrs) -> Span:
+        t = t_ns or now_ns()
+        return self.add(name, t, t, **attrs)
+
+    def mark(self, name: str, t_ns: Optional[int] = None, first: bool = True):
+        """Record a named instant for the current turn; with first=True later calls are ignored."""
+        marks = self._marks.setdefault(self.turn or 0, {})
+        if first and name in marks:
+            return
+        marks[name] = t_ns or now_ns()
+        self.instant(name, marks[name])
+
+    def marks(self, turn: Optional[int] = None) -> Dict[str, int]:
+        return dict(self._marks.get((self.turn or 0) if turn is None else turn, {}))
+
+    def add_llm_record(self, record, name: str = "llm.request"):
+        """Turn an LLMRequestRecord's milestones into a span plus instants."""
+        t0 = int(record.t_sent * 1e9)
+
+        def at(ms):
+            return None if ms is None else t0 + int(ms * 1e6)
+        end = at(record.last_token_ms) or now_ns()
+        self.add(name, t0, end, cached=record.cached, tokens=record.tokens, complete=record.complete)
+        for label, ms in (("llm.first_byte", record.first_byte_ms), ("llm.first_token", record.first_token_ms),
+                          ("llm.first_sentence", record.first_sentence_ms)):
+            if ms is not None:
+                self.instant(label, at(ms))
+
+    def turn_summary(self, turn: Optional[int] = None) -> dict:
+        """Milliseconds from end of user speech to first audible sample and to end of reply."""
+        m = self.marks(turn)
+        origin = m.get("speech_end")
+
+        def since(name):
+            t = m.get(name)
+            return None if origin is None or t is None else round((t - origin) / 1e6, 1)
+        return {
+            "first_audio_ms": since("first_audio"),
+            "turn_ms": since("turn_end"),
+            "barge_in_ms": since("barge_in"),
+        }
+
+    def to_chrome(self) -> dict:
+        events = []
+        pid = int(hashlib.sha1(self.session_id.encode()).hexdigest()[:6], 16)
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"session {self.session_id}"}})
+        for s in list(self.spans):
+            ev = {
+                "name": s.name, "cat": s.name.split(".")[0], "pid": pid, "tid": s.thread,
+                "ts": s.start_ns / 1000.0, "args": dict(s.attrs, turn=s.turn),
+            }
+            if s.end_ns is None or s.end_ns == s.start_ns:
+                ev.update(ph="i", s="t")
+            else:
+                ev.update(ph="X", dur=(s.end_ns - s.start_ns) / 1000.0)
+            events.append(ev)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def _trace_id(self, turn: Optional[int]) -> str:
+        return hashlib.sha256(f"{self.session_id}:{turn}".encode()).hexdigest()[:32]
+
+    def to_otel(self) -> List[dict]:
+        records = []
+        for s in list(self.spans):
+            end = s.end_ns if s.end_ns is not None else s.start_ns
+            records.append({
+                "trace_id": self._trace_id(s.turn),
+                "span_id": f"{s.span_id:016x}",
+                "name": s.name,
+                "start_time_unix_nano": s.start_ns + self._epoch_offset_ns,
+                "end_time_unix_nano": end + self._epoch_offset_ns,
+                "attributes": dict(s.attrs, **{"session.id": self.session_id, "turn": s.turn, "thread.name": s.thread}),
+            })
+        return records
+
+    def export(self, directory: str) -> str:
+        """Write <session>.trace.json and <session>.otel.jsonl; returns the Chrome trace path."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.session_id)
+        with open(f"{base}.trace.json", "w") as f:
+            json.dump(self.to_chrome(), f)
+        with open(f"{base}.otel.jsonl", "w") as f:
+            for rec in self.to_otel():
+                f.write(json.dumps(rec) + "\n")
+        return f"{base}.trace.json"
+
+
+def export_from_env(tracer: Optional[Tracer]) -> Optional[str]:
+    directory = os.getenv("TRACE_DIR", "").strip()
+    if tracer is None or not directory:
+        return None
+    try:
+        return tracer.export(directory)
+    except OSError as e:
+        print(f"Trace export failed: {e}")
+        return None
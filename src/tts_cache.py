@@ -0,0 +1,175 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TTSAudioCache:
+    """Two-tier cache of synthesized int16 PCM.
+
+    Tier one is an in-memory LRU bounded by total bytes. Tier two is a
+    content-addressed directory of .npy files that are memory-mapped on read,
+    so a disk hit costs a page-in rather than a Kokoro inference. The directory
+    is capped at max_disk_bytes; least recently used files (by mtime, which a
+    hit refreshes) are deleted once it grows past the cap.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_mem_bytes: int = 64 * 1024 * 1024,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_mem_bytes = max_mem_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._mem: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._mem_bytes = 0
+        self._lock = threading.Lock()
+        self.mem_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+        self._disk_bytes = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+    @staticmethod
+    def make_key(text: str, voice: str, lang_code: str, speed: float, sample_rate: int) -> str:
+        raw = "\x1f".join([normalize_text(text), voice, lang_code, f"{speed:.3f}", str(sample_rate)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def _disk_files(self):
+        """(path, size, mtime) of every cached file."""
+        out = []
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".npy"):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    out.append((entry.path, st.st_size, st.st_mtime))
+        return out
+
+    def _evict_disk(self):
+        # Trim to 90% of the cap so a full cache does not rescan on every put
+        target = int(self.max_disk_bytes * 0.9)
+        files = sorted(self._disk_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.disk_evictions += 1
+        with self._lock:
+            self._disk_bytes = total
+
+    def _remember(self, key: str, pcm: np.ndarray):
+        if pcm.nbytes > self.max_mem_bytes:
+            return
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= old.nbytes
+        self._mem[key] = pcm
+        self._mem_bytes += pcm.nbytes
+        while self._mem_bytes > self.max_mem_bytes and self._mem:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_bytes -= evicted.nbytes
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            pcm = self._mem.get(key)
+            if pcm is not None:
+                self._mem.move_to_end(key)
+                self.mem_hits += 1
+                return pcm
+        if self.cache_dir:
+            path = self._path(key)
+            if os.path.exists(path):
+                try:
+                    pcm = np.load(path, mmap_mode="r")
+                except Exception:
+                    pcm = None
+                if pcm is not None:
+                    try:
+                        # Marks the file as recently used for disk eviction
+                        os.utime(path)
+                    except OSError:
+                        pass
+                    with self._lock:
+                        self.disk_hits += 1
+                        self._remember(key, pcm)
+                    return pcm
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, pcm: np.ndarray):
+        pcm = np.ascontiguousarray(pcm, dtype=np.int16)
+        with self._lock:
+            self._remember(key, pcm)
+        if self.cache_dir:
+            path = self._path(key)
+            if os.path.exists(path):
+                return
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write then rename so readers never map a partial file
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    np.save(f, pcm)
+                os.replace(tmp, path)
+            except Exception as e:
+                print(f"TTS cache write failed: {e}")
+                return
+            with self._lock:
+                self._disk_bytes += os.path.getsize(path)
+                over = self.max_disk_bytes > 0 and self._disk_bytes > self.max_disk_bytes
+            if over:
+                self._evict_disk()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.mem_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "mem_hits": self.mem_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (hits / total) if total else 0.0,
+                "mem_entries": len(self._mem),
+                "mem_bytes": self._mem_bytes,
+                "disk_bytes": self._disk_bytes,
+                "disk_evictions": self.disk_evictions,
+            }
+
+
+def cache_from_env() -> Optional[TTSAudioCache]:
+    if os.getenv("TTS_CACHE", "1") != "1":
+        return None
+    cache_dir = os.getenv("TTS_CACHE_DIR", os.path.join("cache", "tts")) or None
+    try:
+        mem_mb = float(os.getenv("TTS_CACHE_MEM_MB", "64") or 64)
+    except ValueError:
+        mem_mb = 64
+    try:
+        disk_mb = float(os.getenv("TTS_CACHE_DISK_MB", "512") or 512)
+    except ValueError:
+        disk_mb = 512
+    return TTSAudioCache(cache_dir=cache_dir, max_mem_bytes=int(mem_mb * 1024 * 1024),
+                         max_disk_bytes=int(disk_mb * 1024 * 1024))
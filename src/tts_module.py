@@ -1,13 +1,18 @@
 import io
 import os
+import queue
+import threading
 import time
 import wave
-from typing import Iterable, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 import numpy as np
-import simpleaudio as sa
+import sounddevice as sd
 from kokoro import KPipeline
 
+from .ring_buffer import RingBuffer
+from .tts_cache import TTSAudioCache, cache_from_env
+
 
 def _read_wav_params(wav_bytes: bytes):
     bio = io.BytesIO(wav_bytes)
@@ -17,50 +22,206 @@ def _read_wav_params(wav_bytes: bytes):
         return params, frames
 
 
+def _to_int16(audio) -> np.ndarray:
+    # Kokoro yields float32 torch tensors in [-1, 1]
+    if hasattr(audio, "numpy"):
+        audio = audio.numpy()
+    scaled = np.asarray(audio, dtype=np.float32) * 32767
+    np.clip(scaled, -32768, 32767, out=scaled)
+    return scaled.astype(np.int16)
+
+
+_END = object()
+
+
 class PlaybackController:
-    def __init__(self):
-        self._current: Optional[sa.PlayObject] = None
+    """Plays int16 PCM through one long-lived callback-driven output stream.
 
-    def stop(self):
-        if self._current is not None:
+    Producers append audio to a ring buffer; the PortAudio callback drains it
+    block by block and checks stop_event on every block, so stop() silences
+    output within one buffer period without any polling loop.
+    """
+
+    def __init__(self, block_ms: int = 20, buffer_ms: int = 2000, on_progress=None):
+        self.block_ms = block_ms
+        self.buffer_ms = buffer_ms
+        # Called from the audio callback with samples played so far; keep it cheap
+        self.on_progress = on_progress
+        self.stop_event = threading.Event()
+        self._stream: Optional[sd.OutputStream] = None
+        self._stream_rate = 0
+        self._ring: Optional[RingBuffer] = None
+        self._queued = 0
+        self._played = 0
+        self._segments: List[Tuple[int, int, str, int]] = []
+        self._next_segment = 0
+        self._lock = threading.Lock()
+        # perf_counter_ns estimates of when the first/last sample since reset() reach the DAC
+        self.first_audio_ns: Optional[int] = None
+        self.last_audio_ns: Optional[int] = None
+
+    def _callback(self, outdata, frames, time_info, status):
+        out = outdata[:, 0]
+        ring = self._ring
+        if ring is None or self.stop_event.is_set():
+            out.fill(0)
+            if ring is not None:
+                ring.clear()
+            return
+        n = ring.read_into(out)
+        if n < frames:
+            out[n:] = 0
+        if n:
+            t = time.perf_counter_ns()
             try:
-                self._current.stop()
+                # Add the device's output latency so the timestamp is when it becomes audible
+                lead = time_info.outputBufferDacTime - time_info.currentTime
+                if 0 < lead < 1:
+                    t += int(lead * 1e9)
             except Exception:
                 pass
-            self._current = None
+            if self.first_audio_ns is None:
+                self.first_audio_ns = t
+            self.last_audio_ns = t + int(n * 1e9 / self._stream_rate)
+            self._played += n
+            if self.on_progress:
+                self.on_progress(self._played)
+
+    def open_stream(self, sample_rate: int):
+        if self._stream is not None and self._stream_rate == sample_rate:
+            return
+        self.close_stream()
+        self._ring = RingBuffer(int(sample_rate * self.buffer_ms / 1000))
+        self._stream = sd.OutputStream(
+            samplerate=sample_rate, channels=1, dtype="int16",
+            blocksize=max(1, int(sample_rate * self.block_ms / 1000)),
+            callback=self._callback,
+        )
+        self._stream_rate = sample_rate
+        self._stream.start()
+
+    def close_stream(self):
+        stream, self._stream = self._stream, None
+        if self._ring is not None:
+            self._ring.close()
+        if stream is None:
+            return
+        try:
+            stream.abort()
+            stream.close()
+        except Exception:
+            pass
+
+    def reset(self):
+        """Clear a previous stop and start a fresh progress record."""
+        self.stop_event.clear()
+        with self._lock:
+            self._segments = []
+            self._queued = self._played = 0
+        self.first_audio_ns = self.last_audio_ns = None
+        if self._ring is not None:
+            self._ring.clear()
+
+    def stop(self):
+        self.stop_event.set()
+        if self._ring is not None:
+            self._ring.wake()
+
+    def new_segment(self) -> int:
+        """Id for a group of enqueue() calls that make up one labelled span, e.g. one sentence."""
+        with self._lock:
+            self._next_segment += 1
+            return self._next_segment
+
+    def enqueue(self, pcm: np.ndarray, label: str = "", segment: Optional[int] = None) -> bool:
+        """Append int16 PCM for playback; blocks while the ring is full. False if stopped.
+
+        Consecutive calls with the same segment id extend one span, so a
+        sentence enqueued chunk by chunk is tracked as a whole.
+        """
+        if self.stop_event.is_set():
+            return False
+        if segment is None:
+            segment = self.new_segment()
+        written = self._ring.write(pcm, self.stop_event)
+        with self._lock:
+            start = self._queued
+            self._queued += written
+            if written:
+                if self._segments and self._segments[-1][3] == segment:
+                    first, _, label, _ = self._segments[-1]
+                    self._segments[-1] = (first, self._queued, label, segment)
+                else:
+                    self._segments.append((start, self._queued, label, segment))
+        return written == len(pcm)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued has been handed to the device or playback stops."""
+        if self._ring is None:
+            return True
+        return self._ring.wait_empty(self.stop_event, timeout)
+
+    def progress(self) -> dict:
+        with self._lock:
+            played = self._played
+            segments = list(self._segments)
+        heard = []
+        for start, end, label, _ in segments:
+            if played <= start:
+                break
+            heard.append((label, min(1.0, (played - start) / max(1, end - start))))
+        return {
+            "samples_played": played,
+            "ms_played": played * 1000.0 / self._stream_rate if self._stream_rate else 0.0,
+            "heard": heard,
+        }
+
+    def heard_text(self) -> str:
+        """Text the listener actually heard; a cut-off sentence is truncated by word."""
+        parts = []
+        for label, frac in self.progress()["heard"]:
+            if not label:
+                continue
+            if frac < 1.0:
+                words = label.split()
+                label = " ".join(words[:int(len(words) * frac)])
+            if label:
+                parts.append(label)
+        return " ".join(parts)
 
     def play_wav(self, wav_bytes: bytes):
         params, frames = _read_wav_params(wav_bytes)
-        play = sa.play_buffer(frames, params.nchannels, params.sampwidth, params.framerate)
-        self._current = play
-        play.wait_done()
-        self._current = None
-    
+        self.reset()
+        self.open_stream(params.framerate)
+        self.enqueue(np.frombuffer(frames, dtype=np.int16))
+        self.wait_idle()
+
     def play_wav_interruptible(self, wav_bytes: bytes, stop_flag) -> None:
+        # stop_flag is still honoured for callers that cannot call stop()
         params, frames = _read_wav_params(wav_bytes)
-        play = sa.play_buffer(frames, params.nchannels, params.sampwidth, params.framerate)
-        self._current = play
-        try:
-            # Poll for stop signal to support barge-in mid-sentence
-            while play.is_playing():
-                if stop_flag():
-                    try:
-                        play.stop()
-                    except Exception:
-                        pass
-                    break
-                time.sleep(0.02)
-        finally:
-            self._current = None
+        self.reset()
+        self.open_stream(params.framerate)
+        self.enqueue(np.frombuffer(frames, dtype=np.int16))
+        while not self.wait_idle(0.1):
+            if stop_flag():
+                self.stop()
 
 
 class KokoroTTSClient:
-    def __init__(self):
+    def __init__(self, cache: Optional[TTSAudioCache] = None):
         self.voice = os.getenv("KOKORO_VOICE", "af_sky")
         self.lang_code = os.getenv("KOKORO_LANG_CODE", "a")  # 'a' = American English
+        self.speed = 1.0
         self.sample_rate = 24000  # Kokoro outputs at 24kHz
+        self.cache = cache if cache is not None else cache_from_env()
         self.allow_fallback = os.getenv("ALLOW_FALLBACK_TTS", "0") == "1"
+        # How many synthesized audio chunks may wait ahead of the player
+        self.prefetch = max(1, int(os.getenv("TTS_PREFETCH", "2") or 2))
         self.playback = PlaybackController()
+        # KPipeline is shared by the playback worker and warm-up threads
+        self._infer_lock = threading.Lock()
+        # Set by the first live synthesis; background warm-up gives way from then on
+        self.live = threading.Event()
         
         # Initialize Kokoro pipeline
         try:
@@ -71,38 +232,81 @@ class KokoroTTSClient:
             self.pipeline = None
             self.use_kokoro = False
 
+    def _kokoro_chunks(self, text: str):
+        # Hold the lock per chunk, not across yields, so a paused consumer
+        # does not starve other callers of the pipeline
+        generator = self.pipeline(text, voice=self.voice, speed=self.speed)
+        while True:
+            with self._infer_lock:
+                try:
+                    gs, ps, audio = next(generator)
+                except StopIteration:
+                    return
+            yield audio
+
+    def prime(self):
+        """Load the voice tensor and run one tiny inference so the first turn is warm."""
+        if not (self.use_kokoro and self.pipeline):
+            return
+        with self._infer_lock:
+            self.pipeline.load_voice(self.voice)
+        for _ in self._kokoro_chunks("Hello."):
+            pass
+
+    def cache_key(self, text: str) -> str:
+        return TTSAudioCache.make_key(text, self.voice, self.lang_code, self.speed, self.sample_rate)
+
+    def synthesize_pcm(self, text: str, stop_flag=lambda: False) -> Optional[np.ndarray]:
+        """Return mono int16 PCM from the cache or Kokoro, or None if interrupted or unavailable."""
+        self.live.set()
+        return self._synthesize_pcm(text, stop_flag)
+
+    def synthesize_background(self, text: str) -> Optional[np.ndarray]:
+        """synthesize_pcm for cache filling: None once live synthesis has started."""
+        if self.live.is_set():
+            return None
+        return self._synthesize_pcm(text, self.live.is_set)
+
+    def _synthesize_pcm(self, text: str, stop_flag) -> Optional[np.ndarray]:
+        key = None
+        if self.cache is not None:
+            key = self.cache_key(text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if not (self.use_kokoro and self.pipeline):
+            return None
+        audio_chunks = []
+        for audio in self._kokoro_chunks(text):
+            # Barge-in cancels the remaining chunks of this sentence
+            if stop_flag():
+                return None
+            audio_chunks.append(_to_int16(audio))
+        if not audio_chunks:
+            return None
+        pcm = np.concatenate(audio_chunks)
+        if key is not None:
+            self.cache.put(key, pcm)
+        return pcm
+
     def synthesize_sentence(self, text: str) -> bytes:
-        if self.use_kokoro and self.pipeline:
-            try:
-                # Generate audio using Kokoro pipeline
-                generator = self.pipeline(text, voice=self.voice, speed=1.0)
-                
-                # Collect all audio chunks from generator
-                audio_chunks = []
-                for gs, ps, audio in generator:
-                    audio_chunks.append(audio)
+        try:
+            audio_int16 = self.synthesize_pcm(text)
+            if audio_int16 is not None:
+                # Create WAV bytes
+                wav_io = io.BytesIO()
+                with wave.open(wav_io, "wb") as wf:
+                    wf.setnchannels(1)
+                    wf.setsampwidth(2)
+                    wf.setframerate(self.sample_rate)
+                    wf.writeframes(audio_int16.tobytes())
                 
-                # Concatenate all audio
-                if audio_chunks:
-                    full_audio = np.concatenate(audio_chunks)
-                    
-                    # Convert float32 audio to int16 PCM
-                    audio_int16 = (full_audio * 32767).astype(np.int16)
-                    
-                    # Create WAV bytes
-                    wav_io = io.BytesIO()
-                    with wave.open(wav_io, "wb") as wf:
-                        wf.setnchannels(1)
-                        wf.setsampwidth(2)
-                        wf.setframerate(self.sample_rate)
-                        wf.writeframes(audio_int16.tobytes())
-                    
-                    wav_io.seek(0)
-                    return wav_io.read()
-            except Exception as e:
-                print(f"Kokoro TTS error: {e}")
-                if not self.allow_fallback:
-                    raise
+                wav_io.seek(0)
+                return wav_io.read()
+        except Exception as e:
+            print(f"Kokoro TTS error: {e}")
+            if not self.allow_fallback:
+                raise
         
         # Fallback to macOS 'say' command
         if self.allow_fallback:
@@ -119,13 +323,111 @@ class KokoroTTSClient:
         
         raise RuntimeError("Kokoro TTS not configured and fallback disabled")
 
-    def speak_sentences(self, sentences: Iterable[str], stop_flag) -> float:
+    def stream_pcm(self, text: str, stop_flag=lambda: False) -> Iterator[np.ndarray]:
+        """Yield int16 PCM per Kokoro chunk as soon as each one is produced."""
+        self.live.set()
+        key = None
+        if self.cache is not None:
+            key = self.cache_key(text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        if self.use_kokoro and self.pipeline:
+            try:
+                chunks = []
+                for audio in self._kokoro_chunks(text):
+                    if stop_flag():
+                        return
+                    pcm = _to_int16(audio)
+                    chunks.append(pcm)
+                    yield pcm
+                # Only complete sentences are cached
+                if key is not None and chunks:
+                    self.cache.put(key, np.concatenate(chunks))
+                return
+            except Exception as e:
+                print(f"Kokoro TTS error: {e}")
+                if not self.allow_fallback:
+                    raise
+        _, frames = _read_wav_params(self.synthesize_sentence(text))
+        yield np.frombuffer(frames, dtype=np.int16)
+
+    def speak_sentences(self, sentences: Iterable[str], stop_flag, tracer=None) -> float:
+        """Synthesize and play sentences, running synthesis ahead of playback.
+
+        A worker thread pulls sentences and fills a bounded queue with Kokoro
+        chunks as they are produced, while the caller's thread feeds them to the
+        playback ring, so sentence N+1 is synthesized while sentence N is
+        audible. Calling playback.stop() (or raising stop_flag) cancels both.
+        """
         t0 = time.perf_counter()
-        for s in sentences:
-            if stop_flag():
-                break
-            wav = self.synthesize_sentence(s)
+        ready: queue.Queue = queue.Queue(maxsize=self.prefetch)
+        cancel = threading.Event()
+        self.playback.reset()
+        stop_event = self.playback.stop_event
+
+        def cancelled():
+            return cancel.is_set() or stop_event.is_set() or stop_flag()
+
+        def put(item) -> bool:
+            while not cancelled():
+                try:
+                    ready.put(item, timeout=0.05)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for s in sentences:
+                    if cancelled():
+                        break
+                    segment = self.playback.new_segment()
+                    span = tracer.start("tts.synth", chars=len(s)) if tracer is not None else None
+                    try:
+                        for pcm in self.stream_pcm(s, cancelled):
+                            if not put((segment, s, pcm)):
+                                break
+                    finally:
+                        if span is not None:
+                            span.end()
+            except Exception as e:
+                put(e)
+            finally:
+                # The sentinel must get through even when the queue is full
+                while True:
+                    try:
+                        ready.put(_END, timeout=0.05)
+                        break
+                    except queue.Full:
+                        if cancelled():
+                            break
+
+        worker = threading.Thread(target=produce, daemon=True)
+        worker.start()
+        self.playback.open_stream(self.sample_rate)
+        try:
+            while not cancelled():
+                try:
+                    item = ready.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if item is _END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                segment, sentence, pcm = item
+                if not self.playback.enqueue(pcm, label=sentence, segment=segment):
+                    break
+            # Let the tail play out; stop_flag is only a fallback for callers
+            # that do not call playback.stop() themselves
+            while not self.playback.wait_idle(0.1):
+                if stop_flag():
+                    self.playback.stop()
+        finally:
+            cancel.set()
             if stop_flag():
-                break
-            self.playback.play_wav_interruptible(wav, stop_flag)
+                self.playback.stop()
         return (time.perf_counter() - t0) * 1000
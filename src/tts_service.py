@@ -0,0 +1,257 @@
+"""
+Process pool for Kokoro inference shared by many sessions.
+
+Each worker process holds its own KPipeline. Requests are ordered by
+priority (first sentence of a reply ahead of later ones), then arrival.
+Consecutive short sentences are sent to a worker as one micro-batch, which
+saves IPC round trips and keeps that worker busy between requests. Kokoro
+has no batched-inference API, so a batch still runs sentence by sentence.
+"""
+import heapq
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional
+
+import numpy as np
+
+from .tts_cache import TTSAudioCache, cache_from_env
+
+PRIORITY_FIRST = 0
+PRIORITY_REST = 1
+
+
+def _worker_main(index: int, requests, results, lang_code: str, voice: str, speed: float):
+    from kokoro import KPipeline
+    from .tts_module import _to_int16
+
+    pipeline = KPipeline(lang_code=lang_code)
+    pipeline.load_voice(voice)
+    results.put(("ready", index, None, None))
+    while True:
+        batch = requests.get()
+        if batch is None:
+            return
+        batch_id, items = batch
+        for req_id, text in items:
+            try:
+                chunks = [_to_int16(audio) for _, _, audio in pipeline(text, voice=voice, speed=speed)]
+                pcm = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)
+                results.put(("result", req_id, pcm.tobytes(), None))
+            except Exception as e:
+                results.put(("result", req_id, None, repr(e)))
+        results.put(("done", index, batch_id, None))
+
+
+class _Request:
+    __slots__ = ("id", "text", "priority", "future", "submitted", "dispatched", "key")
+
+    def __init__(self, req_id: int, text: str, priority: int, key: Optional[str]):
+        self.id = req_id
+        self.text = text
+        self.priority = priority
+        self.future: Future = Future()
+        self.submitted = time.perf_counter()
+        self.dispatched = 0.0
+        self.key = key
+
+
+class TTSService:
+    def __init__(self, workers: int | None = None, batch_max: int = 4, batch_chars: int = 80,
+                 batch_window_ms: float = 5.0, cache: Optional[TTSAudioCache] = None, worker_target=None):
+        self.workers = workers or int(os.getenv("TTS_WORKERS", "2") or 2)
+        self.batch_max = batch_max
+        self.batch_chars = batch_chars
+        self.batch_window_ms = batch_window_ms
+        self.voice = os.getenv("KOKORO_VOICE", "af_sky")
+        self.lang_code = os.getenv("KOKORO_LANG_CODE", "a")
+        self.speed = 1.0
+        self.sample_rate = 24000
+        self.cache = cache if cache is not None else cache_from_env()
+        # Process entry point, same signature as _worker_main; tests swap in a fake model
+        self._worker_target = worker_target or _worker_main
+
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._inflight: dict = {}
+        self._batches: dict = {}
+        # Each worker has its own request queue, so a dead worker's batch is known
+        self._assigned: dict = {}
+        self._idle: list = []
+        self.respawns = 0
+        self._closed = False
+        self._waits: deque = deque(maxlen=1000)
+        self.batches = 0
+        self.batched_requests = 0
+
+        self._ctx = mp.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._queues: list = [None] * self.workers
+        self._procs: list = [None] * self.workers
+        for i in range(self.workers):
+            self._spawn(i)
+        threading.Thread(target=self._collect, name="tts-collect", daemon=True).start()
+        threading.Thread(target=self._dispatch, name="tts-dispatch", daemon=True).start()
+
+    def _spawn(self, index: int):
+        self._queues[index] = self._ctx.Queue()
+        self._procs[index] = self._ctx.Process(
+            target=self._worker_target,
+            args=(index, self._queues[index], self._results, self.lang_code, self.voice, self.speed),
+            daemon=True, name=f"tts-worker-{index}")
+        self._procs[index].start()
+
+    def submit(self, text: str, priority: int = PRIORITY_REST) -> Future:
+        key = None
+        if self.cache is not None:
+            key = TTSAudioCache.make_key(text, self.voice, self.lang_code, self.speed, self.sample_rate)
+            cached = self.cache.get(key)
+            if cached is not None:
+                fut: Future = Future()
+                fut.set_result(cached)
+                return fut
+        with self._cond:
+            req = _Request(next(self._seq), text, priority, key)
+            heapq.heappush(self._heap, (priority, req.id, req))
+            self._cond.notify_all()
+        return req.future
+
+    def synthesize_pcm(self, text: str, stop_flag=lambda: False, priority: int = PRIORITY_REST) -> Optional[np.ndarray]:
+        """Blocking helper with the same contract as KokoroTTSClient.synthesize_pcm."""
+        fut = self.submit(text, priority)
+        while True:
+            try:
+                return fut.result(timeout=0.05)
+            except TimeoutError:
+                if stop_flag():
+                    fut.cancel()
+                    return None
+
+    def _take_batch(self) -> list:
+        batch = []
+        while self._heap and len(batch) < self.batch_max:
+            _, _, req = self._heap[0]
+            if batch and (len(req.text) > self.batch_chars or len(batch[0].text) > self.batch_chars):
+                break
+            heapq.heappop(self._heap)
+            # Skips requests cancelled while queued
+            if req.future.set_running_or_notify_cancel():
+                batch.append(req)
+        return batch
+
+    def _dispatch(self):
+        batch_ids = itertools.count()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or (self._heap and self._idle))
+                if self._closed:
+                    return
+                if len(self._heap) == 1 and len(self._heap[0][2].text) <= self.batch_chars:
+                    # Give other sessions a moment to add short sentences to this batch
+                    self._cond.wait(self.batch_window_ms / 1000)
+                    # The wait released the lock; _reap may have taken the idle worker or close() run
+                    if self._closed:
+                        return
+                    if not self._idle:
+                        continue
+                batch = self._take_batch()
+                if not batch:
+                    continue
+                worker = self._idle.pop()
+                batch_id = next(batch_ids)
+                now = time.perf_counter()
+                for req in batch:
+                    req.dispatched = now
+                    wait_ms = (now - req.submitted) * 1000
+                    # Exposed to callers for per-request accounting
+                    req.future.wait_ms = wait_ms
+                    self._waits.append(wait_ms)
+                    self._inflight[req.id] = req
+                self._batches[batch_id] = [r.id for r in batch]
+                self._assigned[worker] = batch_id
+                self.batches += 1
+                self.batched_requests += len(batch)
+                requests = self._queues[worker]
+            requests.put((batch_id, [(r.id, r.text) for r in batch]))
+
+    def _reap(self):
+        """Fail the batch of any worker that died and start a replacement."""
+        failed = []
+        with self._cond:
+            if self._closed:
+                return
+            for i, proc in enumerate(self._procs):
+                if proc.is_alive():
+                    continue
+                batch_id = self._assigned.pop(i, None)
+                for req_id in self._batches.pop(batch_id, []):
+                    req = self._inflight.pop(req_id, None)
+                    if req is not None:
+                        failed.append((req, proc.exitcode))
+                if i in self._idle:
+                    self._idle.remove(i)
+                self.respawns += 1
+                self._spawn(i)
+            self._cond.notify_all()
+        for req, code in failed:
+            req.future.set_exception(RuntimeError(f"Kokoro worker exited with code {code}"))
+
+    def _collect(self):
+        last_reap = time.monotonic()
+        while True:
+            if time.monotonic() - last_reap >= 0.5:
+                self._reap()
+                last_reap = time.monotonic()
+            try:
+                kind, ident, payload, error = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._cond:
+                if kind == "ready" or kind == "done":
+                    if kind == "done":
+                        self._batches.pop(payload, None)
+                        self._assigned.pop(ident, None)
+                    if ident not in self._idle:
+                        self._idle.append(ident)
+                    self._cond.notify_all()
+                    continue
+                req = self._inflight.pop(ident, None)
+            if req is None:
+                continue
+            if error is not None:
+                req.future.set_exception(RuntimeError(f"Kokoro worker error: {error}"))
+                continue
+            pcm = np.frombuffer(payload, dtype=np.int16)
+            if self.cache is not None and req.key is not None and pcm.size:
+                self.cache.put(req.key, pcm)
+            req.future.set_result(pcm)
+
+    def stats(self) -> dict:
+        with self._cond:
+            waits = np.fromiter(self._waits, dtype=float) if self._waits else np.zeros(0)
+            return {
+                "workers": self.workers,
+                "idle_workers": len(self._idle),
+                "respawns": self.respawns,
+                "queue_depth": len(self._heap),
+                "in_flight": len(self._inflight),
+                "batches": self.batches,
+                "avg_batch_size": (self.batched_requests / self.batches) if self.batches else 0.0,
+                "wait_ms_avg": float(waits.mean()) if waits.size else 0.0,
+                "wait_ms_p95": float(np.percentile(waits, 95)) if waits.size else 0.0,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for q in self._queues:
+            q.put(None)
+        for p in self._procs:
+            p.join(timeout=5)
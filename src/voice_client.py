@@ -1,36 +1,24 @@
+import asyncio
 import os
-import queue
 import re
 import threading
 import time
 from typing import List
 
-import sounddevice as sd
 from loguru import logger
 
-from .asr_module import ASRClient, VADStream, pcm16_to_wav_bytes
-from .llm_module import LLMClient, approx_tokens
+from .asr_module import ASRClient, VADStream
+from .capture_hub import CaptureHub, CaptureStopped
+from .endpointing import AdaptiveEndpointer
+from .llm_module import LLMClient, LLMRequestRecord
 from .tts_module import KokoroTTSClient
-from .state_manager import ConversationState
+from .prompt_cache import PromptAssembler, cache_usage
+from .speculation import SpeculativeLLM
+from .state_manager import ConversationState, approx_tokens
+from .tracing import Tracer, export_from_env
+from .warmup import start_warmup
 
 
-class AudioCapture:
-    def __init__(self, sample_rate=16000, frame_ms=30):
-        self.sample_rate = sample_rate
-        self.blocksize = int(sample_rate * (frame_ms / 1000.0))
-        self.q = queue.Queue()
-        self.stream = None
-
-    def _cb(self, indata, frames, time_info, status):
-        self.q.put(indata.copy())
-
-    def start(self):
-        self.stream = sd.InputStream(samplerate=self.sample_rate, channels=1, dtype="int16", blocksize=self.blocksize, callback=self._cb)
-        self.stream.start()
-
-    def read(self):
-        return self.q.get()
-
 def split_sentences(text_stream, stop_flag=lambda: False, on_partial=None):
     buf = ""
     for tok in text_stream:
@@ -51,17 +39,33 @@ def split_sentences(text_stream, stop_flag=lambda: False, on_partial=None):
 
 
 class VoiceClient:
-    def __init__(self, persona: dict, session_id: str, callbacks: dict | None = None):
+    def __init__(self, persona: dict, session_id: str, callbacks: dict | None = None,
+                 asr: ASRClient | None = None, llm: LLMClient | None = None,
+                 tts: KokoroTTSClient | None = None):
         self.sample_rate = 16000
         self.persona = persona
-        self.state = ConversationState(session_id=session_id, persona_name=persona.get("name", "Customer"))
-        self.asr = ASRClient(sample_rate=self.sample_rate)
-        self.llm = LLMClient()
-        self.tts = KokoroTTSClient()
+        self.state = ConversationState.from_env(session_id=session_id, persona_name=persona.get("name", "Customer"))
+        # Clients may be shared between sessions; the Kokoro model is the expensive one
+        self.asr = asr or ASRClient(sample_rate=self.sample_rate)
+        self.llm = llm or LLMClient()
+        self.tts = tts or KokoroTTSClient()
+        # Canonical persona prefix, serialised once per persona
+        self.prompts = PromptAssembler(persona.get("system_prompt", ""))
+        self.prompt_info: dict = {}
         self.vad_stream = VADStream(sample_rate=self.sample_rate)
+        # One input stream; listening and barge-in detection each read it through their own cursor
+        self.capture = CaptureHub(sample_rate=self.sample_rate)
+        self._barge_in_pos = None
         self.barge_in_flag = threading.Event()
         self.stop_event = threading.Event()
         self.callbacks = callbacks or {}
+        self.tracer = Tracer(session_id)
+        # One endpointer per session so it learns this speaker's pauses
+        self.endpointer = AdaptiveEndpointer.from_env() if os.getenv("ENDPOINT_ADAPTIVE", "0") == "1" else None
+        self.speculator = None
+        if os.getenv("LLM_SPECULATIVE", "0") == "1":
+            self.speculator = SpeculativeLLM(self.llm, stable_ms=int(os.getenv("LLM_SPECULATIVE_STABLE_MS", "500") or 500),
+                                             use_cache=persona.get("llm_cache", True))
 
     def emit(self, name: str, *args, **kwargs):
         cb = self.callbacks.get(name)
@@ -72,59 +76,96 @@ class VoiceClient:
                 pass
 
     def start(self):
-        self.vad_stream.start()
+        start_warmup(self.tts, self.persona)
+        self.capture.start()
+        self.vad_stream.stream = self.capture.subscribe("listen")
 
     def listen_once(self) -> tuple[str, float, float]:
         partial_last = [0.0]
         def on_partial(text):
+            if self.speculator:
+                self.speculator.on_partial(text)
             now = time.perf_counter()
             if (now - partial_last[0]) * 1000 >= 400:
                 print(f"ASR partial: {text}")
                 partial_last[0] = now
                 self.emit("asr_partial", text)
-        final_text, asr_ms, asr_secs = self.asr.streaming_listen(self.vad_stream, on_partial=on_partial)
+        listen = self.vad_stream.stream
+        last_audio_ns = self.tts.playback.last_audio_ns
+        if self._barge_in_pos is not None:
+            # Start from the speech that triggered the barge-in instead of losing it
+            listen.seek(self._barge_in_pos)
+            self._barge_in_pos = None
+        elif last_audio_ns is not None:
+            # Audio captured while the assistant was speaking is its own echo; speech
+            # from the moment playback ended on is kept, even if logging ran meanwhile
+            listen.seek(self.capture.position_at(last_audio_ns))
+        else:
+            listen.seek_live(int(self.sample_rate * 0.3))
+        final_text, asr_ms, asr_secs = self.asr.streaming_listen(self.vad_stream, on_partial=on_partial,
+                                                                 endpointer=self.endpointer, tracer=self.tracer)
         self.emit("asr_final", final_text)
         return final_text, asr_ms, asr_secs
 
     def monitor_barge_in(self):
         self.barge_in_flag.clear()
+        self._barge_in_pos = None
+        sub = self.capture.subscribe("barge_in")
         def run():
             vad = self.vad_stream.vad
-            frame_bytes = self.vad_stream.frame_bytes
             streak = 0
             threshold_frames = 5  # ~150ms at 30ms per frame
-            while not self.barge_in_flag.is_set():
-                data = self.vad_stream.stream.read(int(frame_bytes/2))[0].tobytes()
-                if len(data) < frame_bytes:
-                    continue
-                if vad.is_speech(data, self.sample_rate):
-                    streak += 1
-                else:
-                    streak = 0
-                if streak >= threshold_frames:
-                    self.barge_in_flag.set()
-                    break
+            try:
+                while not self.barge_in_flag.is_set():
+                    frame = sub.read_frame(timeout=0.1)
+                    if frame is None:
+                        if self.capture.ring.closed:
+                            break
+                        continue
+                    if vad.is_speech(frame.cast("B"), self.sample_rate):
+                        streak += 1
+                    else:
+                        streak = 0
+                    if streak >= threshold_frames:
+                        self.tracer.mark("barge_in")
+                        self._barge_in_pos = sub.pos - streak * self.capture.blocksize
+                        self.barge_in_flag.set()
+                        # Silences output within one audio block
+                        self.tts.playback.stop()
+                        break
+            finally:
+                sub.close()
         th = threading.Thread(target=run, daemon=True)
         th.start()
 
     def stop_barge_in_monitor(self):
         self.barge_in_flag.set()
 
-    def run_turn(self, system_prompt: str, turn_idx: int, logger_obj, live_hints=None):
+    def _start_llm(self, user_text: str):
+        """Return (token stream, request record, speculative_hit) for the user turn just added to state."""
+        resolved = self.speculator.resolve(user_text) if self.speculator else None
+        if resolved is not None:
+            # The speculative request already went out, built from these messages
+            stream, record, self.prompt_info = resolved
+            return stream, record, True
+        msgs, self.prompt_info = self.prompts.build(self.state)
+        stream, record = self.llm.stream_chat(msgs, use_cache=self.persona.get("llm_cache", True))
+        return stream, record, False
+
+    def _begin_listen(self, turn_idx: int):
+        self.tracer.begin_turn(turn_idx)
         logger.info("Listening...")
         self.emit("status", "Listening")
+        if self.speculator:
+            self.speculator.begin(lambda text: self.prompts.build(self.state, [{"role": "user", "content": text}]))
+
+    def run_turn(self, system_prompt: str, turn_idx: int, logger_obj, live_hints=None):
+        self._begin_listen(turn_idx)
         user_text, asr_ms, asr_secs = self.listen_once()
         print(f"You: {user_text}")
         self.state.add_turn("user", user_text)
 
-        msgs = self.state.as_messages(system_prompt)
-        stream, _ = self.llm.stream_chat(msgs)
-        t0_llm = time.perf_counter()
-        llm_done_time = [None]
-        def token_stream_with_done():
-            for tok in stream:
-                yield tok
-            llm_done_time[0] = time.perf_counter()
+        stream, llm_record, speculative_hit = self._start_llm(user_text)
 
         self.monitor_barge_in()
         print("Customer (streaming): ", end="", flush=True)
@@ -132,7 +173,7 @@ class VoiceClient:
         def on_llm_partial(tok: str):
             print(tok, end="", flush=True)
             self.emit("llm_partial", tok)
-        sentences = split_sentences(token_stream_with_done(), stop_flag=lambda: self.barge_in_flag.is_set(), on_partial=on_llm_partial)
+        sentences = split_sentences(stream, stop_flag=lambda: self.barge_in_flag.is_set(), on_partial=on_llm_partial)
         def sentences_with_capture():
             for s in sentences:
                 output_sents.append(s)
@@ -141,20 +182,42 @@ class VoiceClient:
         def stop_flag():
             return self.barge_in_flag.is_set()
         self.emit("status", "Speaking")
-        tts_ms = self.tts.speak_sentences(sentences_with_capture(), stop_flag)
+        tts_ms = self.tts.speak_sentences(sentences_with_capture(), stop_flag, tracer=self.tracer)
+        interrupted = self.barge_in_flag.is_set()
         print("")
         self.stop_barge_in_monitor()
-        end_ref = llm_done_time[0] or time.perf_counter()
-        llm_ms = (end_ref - t0_llm) * 1000
 
+        self._finish_turn(turn_idx, logger_obj, user_text, asr_ms, asr_secs,
+                          llm_record, tts_ms, output_sents, interrupted, speculative_hit)
+
+    def _finish_turn(self, turn_idx: int, logger_obj, user_text: str,
+                     asr_ms: float, asr_secs: float, llm_record: LLMRequestRecord, tts_ms: float,
+                     output_sents: List[str], interrupted: bool, speculative_hit: bool):
+        # Time from request sent to last token, as the stream was actually consumed
+        llm_ms = llm_record.last_token_ms or llm_record.elapsed_ms()
+        tracer = self.tracer
+        tracer.mark("turn_end")
+        tracer.add_llm_record(llm_record)
+        playback = self.tts.playback
+        if playback.first_audio_ns is not None:
+            tracer.mark("first_audio", playback.first_audio_ns)
+            tracer.add("playback", playback.first_audio_ns, playback.last_audio_ns or playback.first_audio_ns,
+                       interrupted=interrupted)
+        timing = tracer.turn_summary()
         output_text = " ".join(output_sents).strip()
-        self.state.add_turn("assistant", output_text)
+        if interrupted and output_text:
+            # Only keep what the user actually heard before interrupting
+            progress = self.tts.playback.progress()
+            output_text = self.tts.playback.heard_text()
+            self.emit("playback_progress", progress)
+        self.state.add_turn("assistant", output_text, interrupted=interrupted)
         if output_text:
             print(f"Customer (final): {output_text}")
             self.emit("assistant_final", output_text)
 
         cost_est = None
-        tokens_in = approx_tokens(user_text + "\n" + system_prompt)
+        # Whole request as sent: system prompt, summary, history and this turn
+        tokens_in = self.prompt_info["total_tokens"]
         tokens_out = approx_tokens(output_text)
         # Optional simple cost estimation if env prices are provided (USD per 1K tokens)
         try:
@@ -163,15 +226,20 @@ class VoiceClient:
             cost_est = (tokens_in / 1000.0) * price_in + (tokens_out / 1000.0) * price_out
         except Exception:
             cost_est = None
-        total_ms = asr_ms + llm_ms + tts_ms
+        # LLM and TTS overlap, so the turn is measured end to end rather than summed
+        total_ms = timing["turn_ms"] if timing["turn_ms"] is not None else asr_ms + llm_ms + tts_ms
         logger_obj.log_turn(turn_idx, self.persona.get("name","Customer"), asr_ms, llm_ms, tts_ms, total_ms,
-                             len(user_text), len(output_text), tokens_in, tokens_out, asr_secs, len(output_text), cost_est, None)
+                             len(user_text), len(output_text), tokens_in, tokens_out, asr_secs, len(output_text), cost_est, None,
+                             llm=llm_record, first_audio_ms=timing["first_audio_ms"])
         self.emit("turn_metrics", {
             "turn": turn_idx,
             "asr_ms": asr_ms,
             "llm_ms": llm_ms,
+            "llm": llm_record.as_dict(),
             "tts_ms": tts_ms,
             "total_ms": total_ms,
+            "first_audio_ms": timing["first_audio_ms"],
+            "barge_in_ms": timing["barge_in_ms"],
             "input_chars": len(user_text),
             "output_chars": len(output_text),
             "tokens_in": tokens_in,
@@ -179,19 +247,42 @@ class VoiceClient:
             "asr_secs": asr_secs,
             "tts_chars": len(output_text),
             "cost_est": cost_est,
+            "tts_cache": self.tts.cache.stats() if self.tts.cache else None,
+            "endpoint": self.endpointer.stats() if self.endpointer else None,
+            "prompt": self.prompt_info,
+            "prompt_cache": cache_usage(self.llm.last_usage),
+            "speculative_hit": speculative_hit,
+            "speculation": self.speculator.stats() if self.speculator else None,
         })
 
     def run(self, max_turns: int, logger_obj, feedback=None):
         self.start()
         system_prompt = self.persona.get("system_prompt", "")
-        for i in range(1, max_turns+1):
-            if self.stop_event.is_set():
-                break
-            self.run_turn(system_prompt, i, logger_obj)
+        try:
+            for i in range(1, max_turns+1):
+                if self.stop_event.is_set():
+                    break
+                try:
+                    self.run_turn(system_prompt, i, logger_obj)
+                except CaptureStopped:
+                    # request_stop() closed the microphone mid-listen
+                    if self.stop_event.is_set():
+                        break
+                    raise
+        finally:
+            self.capture.stop()
+            export_from_env(self.tracer)
         if feedback:
             fb = feedback.evaluate(self.state)
             print(fb)
 
+    def run_async(self, max_turns: int, logger_obj, feedback=None):
+        from .async_pipeline import AsyncVoicePipeline
+        asyncio.run(AsyncVoicePipeline(self).run(max_turns, logger_obj, feedback))
+
     def request_stop(self):
         self.stop_event.set()
         self.barge_in_flag.set()
+        self.tts.playback.stop()
+        # Unblocks a listen loop waiting on the microphone
+        self.capture.stop()
@@ -0,0 +1,75 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from loguru import logger
+
+_EXAMPLE_RE = re.compile(r"Example:\s*['\"](.+)['\"]\s*$", re.S)
+
+
+def _sentences(text: str) -> List[str]:
+    # Same boundaries the live pipeline uses, so cache keys line up
+    return [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()]
+
+
+def persona_warm_phrases(persona: dict) -> List[str]:
+    """Collect likely agent utterances for a persona, sentence by sentence."""
+    candidates = []
+    greeting = persona.get("greeting")
+    if greeting:
+        candidates.append(greeting)
+    m = _EXAMPLE_RE.search(persona.get("system_prompt", ""))
+    if m:
+        candidates.append(m.group(1))
+    candidates.extend(persona.get("warm_phrases", []))
+
+    phrases = []
+    seen = set()
+    for c in candidates:
+        for s in _sentences(c):
+            if s not in seen:
+                seen.add(s)
+                phrases.append(s)
+    return phrases
+
+
+def warm_up_tts(tts, persona: dict, workers: int | None = None) -> dict:
+    """Prime the Kokoro pipeline and pre-synthesize persona phrases into the TTS cache.
+
+    Gives up on the remaining phrases once the client starts live synthesis,
+    so a turn never queues behind warm-up for the Kokoro pipeline.
+    """
+    t0 = time.perf_counter()
+    workers = workers or int(os.getenv("TTS_WARMUP_WORKERS", "2") or 2)
+    if not tts.live.is_set():
+        tts.prime()
+    phrases = persona_warm_phrases(persona)
+    done = 0
+    if tts.cache is not None and phrases:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="tts-warmup") as pool:
+            for ok in pool.map(lambda p: tts.synthesize_background(p) is not None, phrases):
+                done += int(ok)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    abandoned = tts.live.is_set() and done < len(phrases)
+    logger.info(f"TTS warm-up: {done}/{len(phrases)} phrases in {elapsed_ms:.0f}ms"
+                + (" (stopped for live synthesis)" if abandoned else ""))
+    return {"phrases": len(phrases), "synthesized": done, "warmup_ms": elapsed_ms, "abandoned": abandoned}
+
+
+def start_warmup(tts, persona: dict) -> threading.Thread | None:
+    """Run warm_up_tts on a daemon thread unless TTS_WARMUP=0."""
+    if os.getenv("TTS_WARMUP", "1") != "1":
+        return None
+
+    def run():
+        try:
+            warm_up_tts(tts, persona)
+        except Exception as e:
+            logger.warning(f"TTS warm-up failed: {e}")
+
+    th = threading.Thread(target=run, name="tts-warmup", daemon=True)
+    th.start()
+    return th
@@ -85,11 +85,15 @@ def create_callbacks():
 
 
 def initialize_voice_handler(persona):
+    clients = {}
     if st.session_state.voice_handler:
-        st.session_state.voice_handler.cleanup()
+        old = st.session_state.voice_handler
+        old.cleanup()
+        # Reuse the loaded Kokoro model and Groq clients across persona switches
+        clients = {"asr_client": old.asr_client, "llm_client": old.llm_client, "tts_client": old.tts_client}
     
     callbacks = create_callbacks()
-    st.session_state.voice_handler = SimpleVoiceHandler(persona, callbacks)
+    st.session_state.voice_handler = SimpleVoiceHandler(persona, callbacks, **clients)
     st.session_state.selected_persona = persona
     st.session_state.status = "Ready"
 
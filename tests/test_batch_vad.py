@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("webrtcvad")
+
+from src.batch_vad import BatchVAD
+
+
+@pytest.fixture
+def vad():
+    return BatchVAD(sample_rate=16000, frame_ms=30)
+
+
+def _mask(bits: str) -> np.ndarray:
+    return np.array([b == "1" for b in bits])
+
+
+def test_segments_bridges_short_gaps(vad):
+    # 30 ms frames: a 2-frame gap (60 ms) is under max_silence_ms and is bridged
+    segs = vad.segments(_mask("0111110011111000"), min_speech_ms=60, max_silence_ms=300)
+    assert segs == [(1 * 480, 12 * 480 + 480)]
+
+
+def test_segments_splits_on_long_silence(vad):
+    mask = _mask("1111" + "0" * 20 + "1111")
+    segs = vad.segments(mask, min_speech_ms=60, max_silence_ms=300)
+    assert segs == [(0, 3 * 480 + 480), (24 * 480, 27 * 480 + 480)]
+
+
+def test_segments_drop_short_bursts(vad):
+    mask = _mask("1" + "0" * 20 + "1111111")
+    segs = vad.segments(mask, min_speech_ms=200, max_silence_ms=300)
+    assert segs == [(21 * 480, 27 * 480 + 480)]
+
+
+def test_segments_empty_mask(vad):
+    assert vad.segments(np.zeros(10, dtype=bool)) == []
+
+
+def test_pre_gate_rejects_silence_without_calling_vad(vad):
+    frames = vad.frame(np.zeros(480 * 10, dtype=np.int16))
+    assert frames.shape == (10, 480)
+    assert not vad.gate(frames).any()
+    assert not vad.classify(np.zeros(480 * 10, dtype=np.int16)).any()
+    assert vad.stats()["gated"] == 10
@@ -0,0 +1,57 @@
+import threading
+
+import numpy as np
+
+from src.ring_buffer import CaptureRing
+
+
+def test_capture_ring_read_returns_views_in_order():
+    ring = CaptureRing(8, block=4)
+    ring.write(np.arange(8, dtype=np.int16))
+    first = ring.read(4, timeout=0)
+    assert np.asarray(first).tolist() == [0, 1, 2, 3]
+    assert ring.read(8, timeout=0) is None
+
+
+def test_capture_ring_overwrites_oldest_and_counts_drops():
+    ring = CaptureRing(8, block=4)
+    ring.write(np.arange(12, dtype=np.int16))
+    assert ring.dropped == 4
+    assert ring.overflows == 1
+    assert np.asarray(ring.read(4, timeout=0)).tolist() == [4, 5, 6, 7]
+
+
+def test_capture_ring_independent_cursors():
+    ring = CaptureRing(16, block=4)
+    ring.write(np.arange(8, dtype=np.int16))
+    a, pos_a, _ = ring.read_at(0, 4, timeout=0)
+    b, pos_b, _ = ring.read_at(0, 4, timeout=0)
+    assert np.asarray(a).tolist() == np.asarray(b).tolist() == [0, 1, 2, 3]
+    assert pos_a == pos_b == 4
+    view, pos, dropped = ring.read_at(8, 4, timeout=0)
+    assert view is None and pos == 8 and dropped == 0
+
+
+def test_capture_ring_read_at_skips_lapped_cursor():
+    ring = CaptureRing(8, block=4)
+    ring.write(np.arange(20, dtype=np.int16))
+    view, pos, dropped = ring.read_at(0, 4, timeout=0)
+    # Only the newest 8 samples (12..19) are retained
+    assert dropped == 12
+    assert np.asarray(view).tolist() == [12, 13, 14, 15]
+    assert pos == 16
+
+
+def test_capture_ring_close_wakes_reader():
+    ring = CaptureRing(8, block=4)
+    result = []
+
+    def reader():
+        result.append(ring.read_at(0, 4, timeout=5))
+
+    th = threading.Thread(target=reader)
+    th.start()
+    ring.close()
+    th.join(1.0)
+    assert not th.is_alive()
+    assert result[0][0] is None
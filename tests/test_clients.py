@@ -0,0 +1,55 @@
+import io
+import wave
+
+import pytest
+
+pytest.importorskip("groq")
+pytest.importorskip("httpx")
+
+from src.clients import close_clients, get_groq_client
+from src.mock_backends import MockChatCompletions, MockGroqClient, MockGroqServer, MockTranscriptions
+
+
+def _wav(seconds: float = 1.0, rate: int = 16000) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buf.getvalue()
+
+
+@pytest.fixture
+def server():
+    close_clients()
+    srv = MockGroqServer(MockGroqClient(transcriptions=MockTranscriptions("hello there how are you"),
+                                       chat=MockChatCompletions(default_reply="Sure. I can help with that.")))
+    srv.start()
+    yield srv
+    srv.stop()
+    close_clients()
+
+
+def test_turns_reuse_one_connection(server):
+    client = get_groq_client(api_key="test", base_url=server.base_url)
+    turns = 3
+    for _ in range(turns):
+        wav = io.BytesIO(_wav())
+        wav.name = "audio.wav"
+        text = client.audio.transcriptions.create(model="whisper", file=wav).text
+        assert text == "hello there"
+        stream = client.chat.completions.create(model="llm", messages=[{"role": "user", "content": text}],
+                                                stream=True)
+        reply = "".join(chunk.choices[0].delta.content or "" for chunk in stream)
+        assert reply == "Sure. I can help with that."
+    assert server.requests == 2 * turns
+    assert server.connections == 1
+
+
+def test_registry_returns_one_client_per_base_url(server):
+    a = get_groq_client(api_key="test", base_url=server.base_url)
+    b = get_groq_client(api_key="test", base_url=server.base_url)
+    c = get_groq_client(api_key="test", base_url=server.base_url + "/other")
+    assert a is b
+    assert c is not a
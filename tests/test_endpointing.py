@@ -0,0 +1,55 @@
+from src.endpointing import AdaptiveEndpointer
+
+
+def _silence_until_end(ep: AdaptiveEndpointer, limit: int = 100) -> int:
+    """Feed silent frames until the endpointer fires; returns the silence in ms."""
+    for _ in range(limit):
+        if ep.update(False):
+            return ep.silence_ms
+    raise AssertionError("endpoint never fired")
+
+
+def test_base_threshold_before_pauses_are_learned():
+    ep = AdaptiveEndpointer(base_ms=600)
+    ep.update(True)
+    assert _silence_until_end(ep) == 600
+    assert ep.stats()["decision_latency_ms"] == 600
+
+
+def test_learns_speaker_pauses():
+    ep = AdaptiveEndpointer(base_ms=600, margin_ms=120)
+    for _ in range(6):
+        # A 150 ms pause inside the utterance, then more speech
+        for _ in range(5):
+            ep.update(False)
+        ep.update(True)
+    assert ep.stats()["pauses_observed"] == 6
+    assert ep.learned_ms() == 270
+    assert _silence_until_end(ep) == 270
+
+
+def test_partial_text_moves_the_threshold():
+    ep = AdaptiveEndpointer(base_ms=600, question_ms=350, mid_sentence_ms=900, min_ms=250, max_ms=1200)
+    ep.set_context("Can you block my card?")
+    assert ep.threshold_ms() == 350
+    ep.set_context("I lost it.")
+    assert ep.threshold_ms() == 480
+    ep.set_context("I lost it and")
+    assert ep.threshold_ms() == 900
+    ep.reset()
+    assert ep.threshold_ms() == 600
+
+
+def test_threshold_is_clamped():
+    ep = AdaptiveEndpointer(base_ms=600, question_ms=100, min_ms=250, max_ms=800, mid_sentence_ms=2000)
+    ep.set_context("Really?")
+    assert ep.threshold_ms() == 250
+    ep.set_context("so, um")
+    assert ep.threshold_ms() == 800
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("ENDPOINT_BASE_MS", "700")
+    monkeypatch.setenv("ENDPOINT_MIN_MS", "bad")
+    ep = AdaptiveEndpointer.from_env()
+    assert ep.base_ms == 700 and ep.min_ms == 250
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+try:
+    from src.asr_module import IncrementalTranscriber
+    from src.mock_backends import MockGroqClient, MockTranscriptions, mock_asr_client
+except (ImportError, OSError) as e:  # sounddevice needs PortAudio
+    pytest.skip(f"ASR dependencies unavailable: {e}", allow_module_level=True)
+
+RATE = 16000
+SCRIPT = " ".join(f"w{i}" for i in range(40))
+
+
+def _segments(*spans):
+    return [{"start": s, "end": e, "text": t} for s, e, t in spans]
+
+
+def test_segment_commits_once_two_hypotheses_agree():
+    inc = IncrementalTranscriber(RATE, overlap_ms=500)
+    segs = _segments((0.0, 1.0, "hello there"), (1.0, 1.9, "how are"))
+    assert inc.accept("hello there how are", segs, 0, 2 * RATE) == "hello there how are"
+    assert inc.committed == []
+    inc.accept("hello there how are", segs, 0, 2 * RATE)
+    # The second segment ends inside the overlap at the window edge, so it stays tentative
+    assert inc.committed == ["hello", "there"]
+    assert inc.commit_sample == RATE
+    assert inc.window(3 * RATE) == (RATE - RATE // 2, 3 * RATE)
+
+
+def test_overlap_words_are_not_repeated():
+    inc = IncrementalTranscriber(RATE)
+    inc.committed = ["my", "card", "is"]
+    assert inc._merge(["card", "is", "missing"]) == ["missing"]
+    assert inc._merge(["lost"]) == ["lost"]
+
+
+def test_nothing_commits_without_segment_timings():
+    inc = IncrementalTranscriber(RATE)
+    for _ in range(3):
+        assert inc.accept("hello there", [], 0, RATE) == "hello there"
+    assert inc.committed == []
+
+
+def test_growing_windows_transcribe_whole_utterance():
+    groq = MockGroqClient(transcriptions=MockTranscriptions(SCRIPT))
+    asr = mock_asr_client(groq, sample_rate=RATE, incremental=True)
+    inc = IncrementalTranscriber(RATE, asr.overlap_ms)
+    buf = bytearray()
+    for _ in range(9):
+        buf.extend(np.zeros(RATE, dtype=np.int16).tobytes())
+        text, _ = asr._transcribe_window(buf, inc)
+    # 2.5 words/s over 9 s, and later windows only upload past the committed point
+    assert text.split() == SCRIPT.split()[:22]
+    assert inc.commit_sample > 0
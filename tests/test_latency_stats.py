@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from src.latency_stats import LatencyHistograms, compare
+
+
+def _frame(n: int, scale: float = 1.0, persona: str = "card_lost", seed: int = 0) -> "pd.DataFrame":
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "ts": 1_699_999_200_000 + np.arange(n) * 60_000,  # starts on the hour
+        "persona": persona,
+        "total_ms": rng.lognormal(7, 0.5, n) * scale,
+        "asr_ms": rng.lognormal(5, 0.3, n) * scale,
+    })
+
+
+def test_percentiles_are_within_one_bin():
+    df = _frame(5000)
+    hist = LatencyHistograms()
+    hist.add_frame(df)
+    row = hist.report().set_index("stage").loc["total_ms"]
+    for q in (50, 90, 99):
+        exact = np.percentile(df["total_ms"], q)
+        assert exact <= row[f"p{q}"] <= exact * 1.011
+    assert row["n"] == 5000
+
+
+def test_files_are_streamed_in_chunks_across_schemas(tmp_path):
+    new = _frame(300)
+    new["llm_ttft_ms"] = 150.0
+    new.to_csv(tmp_path / "latency_log.csv", index=False)
+    # A rotated file from before llm_ttft_ms existed
+    _frame(200, seed=1).to_csv(tmp_path / "latency_log.1700000000000.csv", index=False)
+    hist = LatencyHistograms().add_files([str(tmp_path / "latency_log*.csv")], chunksize=64)
+    report = hist.report().set_index("stage")
+    assert hist.rows == 500
+    assert report.loc["total_ms", "n"] == 500
+    assert report.loc["llm_ttft_ms", "n"] == 300
+    with pytest.raises(FileNotFoundError):
+        LatencyHistograms().add_files([str(tmp_path / "missing.csv")])
+
+
+def test_window_groups_rows_by_time():
+    hist = LatencyHistograms(window="1h")
+    hist.add_frame(_frame(180))  # one row a minute for three hours
+    report = hist.report()
+    assert sorted(report[report["stage"] == "total_ms"]["n"]) == [60, 60, 60]
+
+
+def test_compare_flags_regressions_with_enough_samples():
+    base, cur = LatencyHistograms(), LatencyHistograms()
+    base.add_frame(_frame(500))
+    cur.add_frame(_frame(500, scale=1.3))
+    result = compare(base.report(), cur.report()).set_index("stage")
+    assert result.loc["total_ms", "regression"]
+    assert result.loc["total_ms", "p50_change"] == pytest.approx(0.3, abs=0.03)
+    assert not compare(base.report(), base.report())["regression"].any()
@@ -0,0 +1,73 @@
+import os
+import time
+
+from src.llm_cache import LLMResponseCache
+
+
+def _key(text: str) -> str:
+    return LLMResponseCache.make_key("m", 0.4, None, 100, [{"role": "user", "content": text}])
+
+
+def test_key_ignores_whitespace_differences():
+    assert _key("hello  there ") == _key("hello there")
+    assert _key("hello there") != _key("hello world")
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LLMResponseCache(max_entries=2)
+    cache.put("a", ["A"])
+    cache.put("b", ["B"])
+    assert cache.get("a") == ["A"]
+    cache.put("c", ["C"])
+    assert cache.get("b") is None
+    assert cache.get("a") == ["A"]
+    assert cache.get("c") == ["C"]
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.llm_cache.time.time", lambda: now[0])
+    cache = LLMResponseCache(ttl_s=10)
+    cache.put("a", ["A"])
+    now[0] += 9
+    assert cache.get("a") == ["A"]
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_tier_survives_restart_and_expires(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.llm_cache.time.time", lambda: now[0])
+    LLMResponseCache(cache_dir=str(tmp_path), ttl_s=10).put("a", ["A", "B"])
+    fresh = LLMResponseCache(cache_dir=str(tmp_path), ttl_s=10)
+    assert fresh.get("a") == ["A", "B"]
+    now[0] += 20
+    assert LLMResponseCache(cache_dir=str(tmp_path), ttl_s=10).get("a") is None
+
+
+def test_disk_cap_evicts_least_recently_used_file(tmp_path):
+    cache = LLMResponseCache(cache_dir=str(tmp_path), max_disk_bytes=400)
+    cache.put("a", ["x" * 100])
+    cache.put("b", ["x" * 100])
+    t0 = time.time() - 100
+    os.utime(cache._path("a"), (t0, t0))
+    os.utime(cache._path("b"), (t0 + 1, t0 + 1))
+    # A disk hit refreshes a's mtime, so b is now the least recently used
+    cache = LLMResponseCache(cache_dir=str(tmp_path), max_disk_bytes=400)
+    assert cache.get("a") == ["x" * 100]
+    cache.put("c", ["x" * 100])
+    assert not os.path.exists(cache._path("b"))
+    assert os.path.exists(cache._path("a")) and os.path.exists(cache._path("c"))
+    assert cache.stats()["disk_evictions"] == 1
+    assert cache.stats()["disk_bytes"] <= 400
+
+
+def test_expired_files_are_removed_on_start(tmp_path):
+    LLMResponseCache(cache_dir=str(tmp_path), ttl_s=10).put("a", ["A"])
+    path = LLMResponseCache(cache_dir=str(tmp_path))._path("a")
+    old = time.time() - 20
+    os.utime(path, (old, old))
+    cache = LLMResponseCache(cache_dir=str(tmp_path), ttl_s=10)
+    assert not os.path.exists(path)
+    assert cache.stats()["disk_bytes"] == 0
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from src.llm_cache import LLMResponseCache
+from src.llm_module import LLMClient, LLMRequestRecord
+from src.mock_backends import MockChatCompletions, MockGroqClient
+
+MESSAGES = [{"role": "user", "content": "My card is gone"}]
+
+
+def _client(cache=None, **chat) -> LLMClient:
+    chat = MockChatCompletions(default_reply="Sure. I can block it now.", **chat)
+    return LLMClient(client=MockGroqClient(chat=chat), cache=cache or LLMResponseCache(max_entries=0))
+
+
+def test_record_fills_in_as_the_stream_is_consumed():
+    stream, record = _client(ttft_ms=50, tokens_per_sec=200).stream_chat(MESSAGES, use_cache=False)
+    assert record.first_token_ms is None and not record.complete
+    text = "".join(stream)
+    assert text == "Sure. I can block it now."
+    assert record.complete
+    assert record.tokens == 6
+    assert record.first_token_ms >= 50
+    assert record.first_token_ms <= record.first_sentence_ms < record.last_token_ms
+    assert record.tokens_per_sec is not None
+    assert set(record.as_dict()) >= {"headers_ms", "first_byte_ms", "first_token_ms", "first_sentence_ms"}
+
+
+def test_provider_token_count_wins():
+    record = LLMRequestRecord()
+    for tok in ["a ", "b ", "c"]:
+        record.on_chunk(tok)
+    record.finish(SimpleNamespace(completion_tokens=7))
+    assert record.tokens == 7
+    # No sentence terminator: the whole reply is the first sentence
+    assert record.first_sentence_ms == record.last_token_ms
+
+
+def test_cached_replay_produces_a_record(tmp_path):
+    client = _client(cache=LLMResponseCache(cache_dir=str(tmp_path)))
+    "".join(client.stream_chat(MESSAGES)[0])
+    stream, record = client.stream_chat(MESSAGES)
+    assert "".join(stream) == "Sure. I can block it now."
+    assert record.cached and record.complete
+    assert record.tokens == 6
+    assert client.last_usage is None
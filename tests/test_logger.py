@@ -0,0 +1,62 @@
+import csv
+import glob
+import os
+
+from src.llm_module import LLMRequestRecord
+from src.logger import COLUMNS, LatencyLogger
+
+
+def _log(lg: LatencyLogger, turn: int, llm=None):
+    lg.log_turn(turn, "card_lost", 100.0, 200.0, 300.0, 650.0, 10, 20, 30, 40, 1.5, 20, None, None,
+                llm=llm, first_audio_ms=420.04)
+
+
+def _rows(path: str) -> list:
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_rows_are_written_in_the_background(tmp_path):
+    path = str(tmp_path / "logs" / "latency.csv")
+    lg = LatencyLogger(path, flush_interval_s=60)
+    _log(lg, 1)
+    _log(lg, 2, llm=LLMRequestRecord(first_token_ms=123.45, tokens=7, cached=True))
+    lg.flush()
+    rows = _rows(path)
+    assert [r["turn"] for r in rows] == ["1", "2"]
+    assert rows[0]["llm_ttft_ms"] == "" and rows[1]["llm_ttft_ms"] == "123.5"
+    assert rows[1]["llm_cached"] == "1" and rows[1]["first_audio_ms"] == "420.0"
+    lg.close()
+    assert lg.written == 2 and lg.dropped == 0
+
+
+def test_rotates_by_size(tmp_path):
+    path = str(tmp_path / "latency.csv")
+    LatencyLogger(path).close()
+    header_bytes = os.path.getsize(path)
+    lg = LatencyLogger(path, flush_interval_s=60, max_bytes=header_bytes + 10)
+    _log(lg, 1)
+    lg.flush()
+    _log(lg, 2)
+    lg.close()
+    rotated = glob.glob(str(tmp_path / "latency.*.csv"))
+    assert len(rotated) == 1
+    assert [r["turn"] for r in _rows(rotated[0])] == ["1"]
+    assert [r["turn"] for r in _rows(path)] == ["2"]
+
+
+def test_older_header_is_moved_aside(tmp_path):
+    path = tmp_path / "latency.csv"
+    path.write_text("ts,turn,persona\n1,1,x\n")
+    LatencyLogger(str(path)).close()
+    with open(path, newline="") as f:
+        assert next(csv.reader(f)) == COLUMNS
+    assert len(glob.glob(str(tmp_path / "latency.*.csv"))) == 1
+
+
+def test_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("LATENCY_LOG_MAX_MB", "1")
+    monkeypatch.setenv("LATENCY_LOG_ROTATE_HOURS", "0")
+    lg = LatencyLogger.from_env(str(tmp_path / "latency.csv"))
+    assert lg.max_bytes == 1024 * 1024 and lg.rotate_interval_s is None
+    lg.close()
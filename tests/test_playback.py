@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+try:
+    from src.ring_buffer import RingBuffer
+    from src.tts_module import PlaybackController
+except (ImportError, OSError) as e:  # sounddevice needs PortAudio, Kokoro may be missing
+    pytest.skip(f"TTS dependencies unavailable: {e}", allow_module_level=True)
+
+RATE = 1000
+TIME_INFO = SimpleNamespace(outputBufferDacTime=0.0, currentTime=0.0)
+
+
+def _controller(seconds: float = 5.0) -> PlaybackController:
+    # Stands in for open_stream(): the callback is driven by hand instead of PortAudio
+    pc = PlaybackController()
+    pc._ring = RingBuffer(int(RATE * seconds))
+    pc._stream_rate = RATE
+    return pc
+
+
+def _play(pc: PlaybackController, n: int) -> np.ndarray:
+    out = np.ones((n, 1), dtype=np.int16)
+    pc._callback(out, n, TIME_INFO, None)
+    return out[:, 0]
+
+
+def test_chunks_of_one_segment_are_heard_as_one_sentence():
+    pc = _controller()
+    seg = pc.new_segment()
+    pc.enqueue(np.ones(500, dtype=np.int16), "one two three four", seg)
+    pc.enqueue(np.ones(500, dtype=np.int16), "one two three four", seg)
+    pc.enqueue(np.ones(1000, dtype=np.int16), "five six")
+    _play(pc, 1500)
+    assert pc.progress()["heard"] == [("one two three four", 1.0), ("five six", 0.5)]
+    assert pc.heard_text() == "one two three four five"
+
+
+def test_cut_off_sentence_is_truncated_by_word():
+    pc = _controller()
+    pc.enqueue(np.ones(1000, dtype=np.int16), " ".join(f"w{i}" for i in range(10)))
+    _play(pc, 600)
+    assert pc.heard_text() == "w0 w1 w2 w3 w4 w5"
+    assert pc.first_audio_ns is not None and pc.last_audio_ns > pc.first_audio_ns
+
+
+def test_stop_silences_output_and_rejects_audio():
+    pc = _controller()
+    pc.enqueue(np.ones(1000, dtype=np.int16), "hello")
+    pc.stop()
+    assert not _play(pc, 100).any()
+    assert pc._ring.available == 0
+    assert pc.enqueue(np.ones(10, dtype=np.int16), "again") is False
+    pc.reset()
+    assert pc.progress()["heard"] == []
+    assert pc.enqueue(np.ones(10, dtype=np.int16), "again") is True
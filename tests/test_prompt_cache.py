@@ -0,0 +1,39 @@
+from src.prompt_cache import PromptAssembler, cache_usage, canonical_prompt, get_prefix
+from src.state_manager import ConversationState
+
+
+def test_prefix_is_canonical_and_shared():
+    assert canonical_prompt("You are Sam.  \r\nBe brief.\n\n") == "You are Sam.\nBe brief."
+    assert get_prefix("You are Sam.") is get_prefix("You are Sam.")
+
+
+def test_build_reports_reuse_of_the_previous_request():
+    state = ConversationState(session_id="s", persona_name="p")
+    prompts = PromptAssembler("You are Sam.  ")
+    state.add_turn("user", "My card is gone.")
+    first, info = prompts.build(state)
+    assert first[0] is prompts.prefix.message
+    assert info["reused_messages"] == 0
+    assert info["total_tokens"] == sum(max(1, len(m["content"]) // 4) for m in first)
+
+    state.add_turn("assistant", "I can block it for you.")
+    state.add_turn("user", "Yes please.")
+    second, info = prompts.build(state)
+    assert info["reused_messages"] == 2
+    assert info["reused_tokens"] + info["new_tokens"] == info["total_tokens"]
+    assert info["prefix_digest"] == prompts.prefix.digest
+
+
+def test_extra_messages_are_appended_without_touching_state():
+    state = ConversationState(session_id="s", persona_name="p")
+    prompts = PromptAssembler("You are Sam.")
+    messages, _ = prompts.build(state, [{"role": "user", "content": "hello"}])
+    assert messages[-1] == {"role": "user", "content": "hello"}
+    assert len(state.turns) == 0
+
+
+def test_cache_usage_reads_both_provider_shapes():
+    assert cache_usage({"prompt_tokens": 100, "completion_tokens": 5,
+                        "prompt_tokens_details": {"cached_tokens": 80}})["cached_tokens"] == 80
+    assert cache_usage({"prompt_tokens": 100, "prompt_cache_hit_tokens": 64})["cached_tokens"] == 64
+    assert cache_usage(None) is None
@@ -0,0 +1,46 @@
+import threading
+
+import numpy as np
+
+from src.ring_buffer import RingBuffer
+
+
+def test_ring_buffer_round_trip_across_wrap():
+    ring = RingBuffer(8)
+    out = np.zeros(8, dtype=np.int16)
+    assert ring.write(np.arange(6, dtype=np.int16)) == 6
+    assert ring.read_into(out[:4]) == 4
+    assert ring.write(np.arange(6, 12, dtype=np.int16)) == 6
+    n = ring.read_into(out)
+    assert n == 8
+    assert out.tolist() == list(range(4, 12))
+    assert ring.available == 0
+
+
+def test_ring_buffer_write_blocks_until_space():
+    ring = RingBuffer(4)
+    ring.write(np.arange(4, dtype=np.int16))
+    done = threading.Event()
+
+    def writer():
+        ring.write(np.arange(4, 6, dtype=np.int16))
+        done.set()
+
+    threading.Thread(target=writer, daemon=True).start()
+    assert not done.wait(0.1)
+    ring.read_into(np.zeros(2, dtype=np.int16))
+    assert done.wait(1.0)
+    out = np.zeros(4, dtype=np.int16)
+    assert ring.read_into(out) == 4
+    assert out.tolist() == [2, 3, 4, 5]
+
+
+def test_ring_buffer_stop_event_and_close_unblock():
+    ring = RingBuffer(2)
+    ring.write(np.zeros(2, dtype=np.int16))
+    stop = threading.Event()
+    stop.set()
+    assert ring.write(np.zeros(2, dtype=np.int16), stop) == 0
+    ring.close()
+    assert ring.write(np.zeros(2, dtype=np.int16)) == 0
+    assert ring.wait_empty(timeout=0.1)
@@ -0,0 +1,60 @@
+from src.llm_module import LLMRequestRecord
+from src.speculation import SpeculativeLLM, normalize_transcript
+
+
+class _FakeLLM:
+    def __init__(self):
+        self.requests = []
+
+    def stream_chat(self, messages, use_cache=True, record=None):
+        self.requests.append(messages)
+
+        def stream():
+            yield from ["Sure", ", ", "one moment."]
+        return stream(), record or LLMRequestRecord()
+
+
+def _build(text):
+    return [{"role": "user", "content": text}], {"total_tokens": len(text) // 4}
+
+
+def test_normalize_ignores_case_and_punctuation():
+    assert normalize_transcript("I lost my card!") == normalize_transcript("i lost  my card")
+
+
+def test_matching_final_reuses_the_running_stream():
+    llm = _FakeLLM()
+    spec = SpeculativeLLM(llm, stable_ms=0)
+    spec.begin(_build)
+    spec.on_partial("I lost my card")
+    assert spec.stats()["started"] == 0
+    spec.on_partial("I lost my card")
+    resolved = spec.resolve("I lost my card.")
+    assert resolved is not None
+    stream, record, info = resolved
+    assert "".join(stream) == "Sure, one moment."
+    assert isinstance(record, LLMRequestRecord)
+    assert info == {"total_tokens": 3}
+    assert llm.requests == [[{"role": "user", "content": "I lost my card"}]]
+    assert spec.stats()["hits"] == 1
+
+
+def test_different_final_is_a_miss():
+    spec = SpeculativeLLM(_FakeLLM(), stable_ms=0)
+    spec.begin(_build)
+    spec.on_partial("I lost my")
+    spec.on_partial("I lost my")
+    assert spec.resolve("I lost my card") is None
+    assert spec.stats()["misses"] == 1
+
+
+def test_changing_partial_does_not_start():
+    llm = _FakeLLM()
+    spec = SpeculativeLLM(llm, stable_ms=10_000)
+    spec.begin(_build)
+    spec.on_partial("I lost")
+    spec.on_partial("I lost")
+    spec.on_partial("I lost my card")
+    assert spec.stats()["started"] == 0
+    assert spec.resolve("I lost my card") is None
+    assert llm.requests == []
@@ -0,0 +1,66 @@
+from src.state_manager import ConversationState, approx_tokens
+
+
+def _state(**kwargs) -> ConversationState:
+    return ConversationState(session_id="s", persona_name="p", **kwargs)
+
+
+def test_max_turns_applies_without_a_budget():
+    state = _state(max_turns=3)
+    for i in range(5):
+        state.add_turn("user", f"turn {i}")
+    assert [t["text"] for t in state.turns] == ["turn 2", "turn 3", "turn 4"]
+
+
+def test_token_budget_evicts_oldest_turns():
+    state = _state(token_budget=30)
+    state.as_messages("x" * 40)  # 10 token system prompt
+    for i in range(6):
+        state.add_turn("user", f"{i}" * 20)  # 5 tokens each
+    assert len(state.turns) == 4
+    assert state.history_tokens() == 20
+    assert state.turns[0]["text"] == "2" * 20
+
+
+def test_latest_turn_is_kept_even_over_budget():
+    state = _state(token_budget=10)
+    state.add_turn("user", "a" * 200)
+    assert len(state.turns) == 1
+
+
+def test_as_messages_does_not_change_history():
+    state = _state(token_budget=45)
+    for i in range(4):
+        state.add_turn("user", f"{i}" * 40)  # 10 tokens each
+    msgs = state.as_messages("y" * 80)  # 20 tokens leaves room for two turns
+    assert [m["content"] for m in msgs[1:]] == ["2" * 40, "3" * 40]
+    assert len(state.turns) == 4
+    assert len(state.as_messages("")) == 5
+
+
+def test_evicted_turns_are_summarised():
+    state = _state(max_turns=1, summarize_evicted=True)
+    state.add_turn("user", "My card is gone. It was in my bag.")
+    state.add_turn("assistant", "I can block it. Which card?")
+    state.add_turn("user", "The debit one.")
+    assert state.summary == "Customer: My card is gone.\nAgent: I can block it."
+    msgs = state.as_messages("sys")
+    assert msgs[1]["content"].startswith("Earlier in this conversation:\nCustomer: My card is gone.")
+    assert msgs[-1]["content"] == "The debit one."
+
+
+def test_summary_is_bounded():
+    state = _state(max_turns=1, summarize_evicted=True, summary_max_tokens=20)
+    for i in range(10):
+        state.add_turn("user", f"Sentence number {i} is here.")
+    assert approx_tokens(state.summary) <= 20
+    assert state.summary.endswith("Sentence number 8 is here.")
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("CONTEXT_TOKEN_BUDGET", "500")
+    monkeypatch.setenv("CONTEXT_SUMMARY", "1")
+    state = ConversationState.from_env("s", "p")
+    assert state.token_budget == 500 and state.summarize_evicted
+    monkeypatch.setenv("CONTEXT_TOKEN_BUDGET", "")
+    assert ConversationState.from_env("s", "p").token_budget is None
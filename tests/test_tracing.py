@@ -0,0 +1,64 @@
+import json
+
+from src.llm_module import LLMRequestRecord
+from src.tracing import Tracer, export_from_env
+
+
+def _traced_turn() -> Tracer:
+    tracer = Tracer("sess-1")
+    tracer.begin_turn(1)
+    tracer.mark("speech_end", 1_000_000_000)
+    with tracer.span("asr.final", audio_bytes=10):
+        pass
+    tracer.mark("first_audio", 1_250_000_000)
+    tracer.mark("first_audio", 1_900_000_000)  # only the first one counts
+    tracer.mark("turn_end", 2_000_000_000)
+    return tracer
+
+
+def test_turn_summary_is_relative_to_speech_end():
+    summary = _traced_turn().turn_summary()
+    assert summary == {"first_audio_ms": 250.0, "turn_ms": 1000.0, "barge_in_ms": None}
+
+
+def test_chrome_export_has_complete_and_instant_events():
+    events = _traced_turn().to_chrome()["traceEvents"]
+    assert events[0]["ph"] == "M"
+    by_name = {e["name"]: e for e in events[1:]}
+    assert by_name["asr.final"]["ph"] == "X" and by_name["asr.final"]["args"] == {"audio_bytes": 10, "turn": 1}
+    assert by_name["speech_end"]["ph"] == "i"
+    assert len({e["pid"] for e in events}) == 1
+
+
+def test_otel_records_share_a_trace_id_per_turn():
+    tracer = _traced_turn()
+    tracer.begin_turn(2)
+    tracer.instant("speech_end")
+    records = tracer.to_otel()
+    ids = {r["attributes"]["turn"]: r["trace_id"] for r in records}
+    assert ids[1] != ids[2]
+    assert all(r["attributes"]["session.id"] == "sess-1" for r in records)
+    assert all(r["end_time_unix_nano"] >= r["start_time_unix_nano"] for r in records)
+
+
+def test_llm_record_becomes_span_and_instants():
+    tracer = Tracer("s")
+    tracer.begin_turn(1)
+    record = LLMRequestRecord(first_byte_ms=100.0, first_token_ms=120.0, last_token_ms=400.0, tokens=5)
+    tracer.add_llm_record(record)
+    spans = {s.name: s for s in tracer.spans}
+    assert spans["llm.request"].duration_ms == 400.0
+    assert spans["llm.first_token"].start_ns - spans["llm.request"].start_ns == 120_000_000
+    assert "llm.first_sentence" not in spans
+
+
+def test_export_from_env(tmp_path, monkeypatch):
+    tracer = _traced_turn()
+    monkeypatch.delenv("TRACE_DIR", raising=False)
+    assert export_from_env(tracer) is None
+    monkeypatch.setenv("TRACE_DIR", str(tmp_path))
+    path = export_from_env(tracer)
+    with open(path) as f:
+        assert json.load(f)["traceEvents"]
+    lines = (tmp_path / "sess-1.otel.jsonl").read_text().splitlines()
+    assert len(lines) == len(tracer.spans)
@@ -0,0 +1,49 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from src.tts_service import PRIORITY_FIRST, PRIORITY_REST, TTSService
+
+
+def _fake_worker(index, requests, results, lang_code, voice, speed):
+    # Stands in for Kokoro: each result is the order in which the worker ran it
+    time.sleep(0.3)
+    results.put(("ready", index, None, None))
+    done = 0
+    while True:
+        batch = requests.get()
+        if batch is None:
+            return
+        batch_id, items = batch
+        for req_id, text in items:
+            if text == "crash":
+                os._exit(3)
+            results.put(("result", req_id, np.array([done], dtype=np.int16).tobytes(), None))
+            done += 1
+        results.put(("done", index, batch_id, None))
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("TTS_CACHE", "0")
+    svc = TTSService(workers=1, batch_max=1, worker_target=_fake_worker)
+    yield svc
+    svc.close()
+
+
+def test_first_sentences_jump_the_queue(service):
+    # All three are queued before the worker reports ready
+    rest_a = service.submit("later one", PRIORITY_REST)
+    rest_b = service.submit("later two", PRIORITY_REST)
+    first = service.submit("first", PRIORITY_FIRST)
+    order = [int(f.result(timeout=10)[0]) for f in (first, rest_a, rest_b)]
+    assert order == [0, 1, 2]
+
+
+def test_dead_worker_fails_its_batch_and_is_replaced(service):
+    with pytest.raises(RuntimeError, match="code 3"):
+        service.submit("crash").result(timeout=10)
+    assert service.submit("hello").result(timeout=10).size == 1
+    assert service.stats()["respawns"] == 1
@@ -0,0 +1,51 @@
+import threading
+
+import numpy as np
+
+from src.warmup import persona_warm_phrases, warm_up_tts
+
+
+class _FakeTTS:
+    def __init__(self, live_after: int):
+        self.cache = {}
+        self.live = threading.Event()
+        self.primed = False
+        self.synthesized = []
+        self.live_after = live_after
+
+    def prime(self):
+        self.primed = True
+
+    def synthesize_background(self, text):
+        if self.live.is_set():
+            return None
+        self.synthesized.append(text)
+        if len(self.synthesized) == self.live_after:
+            # A turn starts speaking while warm-up is running
+            self.live.set()
+        return np.zeros(10, dtype=np.int16)
+
+
+PERSONA = {
+    "greeting": "Hello. I need help.",
+    "system_prompt": "You are a caller. Example: 'I need help. My card is gone.'",
+    "warm_phrases": ["Thank you.", "Okay.", "Bye."],
+}
+
+
+def test_phrases_are_split_and_deduplicated():
+    assert persona_warm_phrases(PERSONA) == ["Hello.", "I need help.", "My card is gone.", "Thank you.", "Okay.", "Bye."]
+
+
+def test_warmup_runs_every_phrase_when_idle():
+    tts = _FakeTTS(live_after=0)
+    result = warm_up_tts(tts, PERSONA, workers=1)
+    assert tts.primed
+    assert result["synthesized"] == 6 and not result["abandoned"]
+
+
+def test_warmup_stops_once_live_synthesis_starts():
+    tts = _FakeTTS(live_after=2)
+    result = warm_up_tts(tts, PERSONA, workers=1)
+    assert tts.synthesized == ["Hello.", "I need help."]
+    assert result["synthesized"] == 2 and result["abandoned"]